@@ -0,0 +1,86 @@
+"""
+Cached Firebase App Check verification.
+
+A device reuses the same App Check token for every sync until the token
+expires (an hour by default), but `app_check.verify_token` re-checks the
+JWT signature and claims on every call — and fetches Google's signing keys
+when its own key cache is cold. Results are cached per token instead:
+
+  • keyed by the SHA-256 digest of the token, so raw tokens aren't kept
+  • a verified token is cached until its own `exp` claim (less a small clock
+    skew margin), never longer than APP_CHECK_CACHE_MAX_TTL_S
+  • the cache is LRU-bounded at APP_CHECK_CACHE_SIZE entries
+  • a failed verification is cached for APP_CHECK_NEGATIVE_TTL_S, so a client
+    replaying a bad token gets a cheap 401 instead of hammering the verifier
+"""
+import hashlib
+import threading
+import time
+from typing import Callable, Optional
+
+from cache import TTLCache
+
+
+class AppCheckError(Exception):
+    """The request's App Check token is missing or did not verify."""
+
+
+class CachedVerifier:
+    """Wraps a `verify(token) -> claims` callable with an expiry-aware cache."""
+
+    def __init__(
+        self,
+        verify: Callable[[str], dict],
+        max_size: int = 10000,
+        max_ttl_s: float = 3600.0,
+        negative_ttl_s: float = 10.0,
+        skew_s: float = 30.0,
+    ):
+        self._verify = verify
+        self._cache = TTLCache(max_size, max_ttl_s)
+        self._max_ttl_s = max_ttl_s
+        self._negative_ttl_s = negative_ttl_s
+        self._skew_s = skew_s
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, token: Optional[str]) -> dict:
+        """Claims of a valid *token*; AppCheckError otherwise."""
+        if not token:
+            raise AppCheckError("Missing App Check token.")
+        key = hashlib.sha256(token.encode()).digest()
+
+        cached = self._cache.get(key)
+        with self._stats_lock:
+            if cached is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if cached is not None:
+            ok, value = cached
+            if ok:
+                return value
+            raise AppCheckError(value)
+
+        try:
+            claims = self._verify(token)
+        except Exception as e:
+            self._cache.set(key, (False, str(e)), ttl_s=self._negative_ttl_s)
+            raise AppCheckError(str(e)) from e
+
+        # No exp claim → nothing safe to cache against; set() ignores ttl <= 0.
+        exp = claims.get('exp')
+        ttl = min(self._max_ttl_s, exp - time.time() - self._skew_s) if exp else 0
+        self._cache.set(key, (True, claims), ttl_s=ttl)
+        return claims
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._cache),
+            }
@@ -0,0 +1,79 @@
+"""
+App Check verification with and without the per-token cache, against the
+local stub verifier.
+
+Simulates a shift of syncs: --devices phones, each reusing its own token,
+with request counts skewed towards the busiest devices, plus a client
+replaying a forged token every --bad-every requests.
+
+  • "uncached" – every request calls verify_token
+  • "cached"   – requests go through appcheck.CachedVerifier
+
+Reports verifier calls, cache hit rate and per-request p50/p99 latency.
+
+Usage (from backend/sync-stream):
+    python bench/bench_appcheck.py --requests 5000 --devices 40 --verify-ms 4
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from appcheck import AppCheckError, CachedVerifier  # noqa: E402
+from bench.fake_appcheck import StubVerifier  # noqa: E402
+
+
+def _traffic(stub: StubVerifier, requests: int, devices: int, bad_every: int) -> list[str]:
+    tokens = [stub.issue() for _ in range(devices)]
+    weights = [1 / (i + 1) for i in range(devices)]
+    forged = "forged-" + "x" * 60
+    return [
+        forged if bad_every and i % bad_every == 0 else random.choices(tokens, weights)[0]
+        for i in range(1, requests + 1)
+    ]
+
+
+def _run(label: str, verify, traffic: list[str], stub: StubVerifier) -> None:
+    calls_before = stub.calls
+    latencies = []
+    rejected = 0
+    for token in traffic:
+        t0 = time.perf_counter()
+        try:
+            verify(token)
+        except (AppCheckError, ValueError):
+            rejected += 1
+        latencies.append((time.perf_counter() - t0) * 1000)
+    latencies.sort()
+    print(
+        f"{label:9} verifier calls={stub.calls - calls_before:6}  rejected={rejected:4}  "
+        f"p50={statistics.median(latencies):6.3f}ms  p99={latencies[int(len(latencies) * 0.99) - 1]:6.3f}ms  "
+        f"total={sum(latencies) / 1000:6.2f}s"
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=5000)
+    ap.add_argument("--devices", type=int, default=40)
+    ap.add_argument("--bad-every", type=int, default=50)
+    ap.add_argument("--verify-ms", type=float, default=4.0)
+    ap.add_argument("--negative-ttl-s", type=float, default=10.0)
+    args = ap.parse_args()
+
+    stub = StubVerifier(verify_s=args.verify_ms / 1000)
+    traffic = _traffic(stub, args.requests, args.devices, args.bad_every)
+
+    _run("uncached", stub.verify_token, traffic, stub)
+    cached = CachedVerifier(stub.verify_token, negative_ttl_s=args.negative_ttl_s)
+    _run("cached", cached.verify, traffic, stub)
+    s = cached.stats()
+    print(f"cache: hit rate {s['hit_rate']:.1%} ({s['hits']} hits, {s['misses']} misses), {s['size']} entries")
+
+
+if __name__ == "__main__":
+    main()
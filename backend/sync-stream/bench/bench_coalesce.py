@@ -0,0 +1,117 @@
+"""
+Cross-request coalescing under load: many devices each sending tiny payloads
+concurrently, written through a pool of fake connections.
+
+  • "off" – every request borrows a pooled connection and runs its own
+            INSERT + MERGE (the handler without COALESCE_WINDOW_MS)
+  • "on"  – requests go through the Coalescer; each window's rows are
+            written as one batch
+
+The fake warehouse runs --warehouse-concurrency statements at a time and
+queues the rest, as a real warehouse does. Reports end-to-end rows/sec and
+per-request p50/p99 latency for both.
+
+Usage (from backend/sync-stream):
+    python bench/bench_coalesce.py --clients 64 --requests 20 --window-ms 20
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench.fake_snowflake import FakeConnector  # noqa: E402
+from coalescer import Coalescer  # noqa: E402
+from ingest import WriteGroup, write_batch  # noqa: E402
+from pool import SnowflakePool  # noqa: E402
+
+
+def _group(max_rows: int) -> WriteGroup:
+    pid = str(30000000 + random.randrange(85))
+    return WriteGroup(
+        scanned_items=[
+            {"pid": pid, "sn": f"SN{random.getrandbits(40)}", "name": "BFGRD LEAN 454YF",
+             "best_before_date": 1778000000000, "net_kg": 1.4, "count": 6}
+            for _ in range(random.randint(1, max_rows))
+        ],
+        sales_floor=[{"pid": pid, "name": "BFGRD LEAN 454YF", "count": 3}],
+    )
+
+
+def _run(label: str, send, clients: int, requests: int, max_rows: int, connector: FakeConnector) -> None:
+    latencies: list[float] = []
+    rows = 0
+    lock = threading.Lock()
+
+    def client():
+        nonlocal rows
+        for _ in range(requests):
+            group = _group(max_rows)
+            t0 = time.perf_counter()
+            send(group)
+            elapsed = time.perf_counter() - t0
+            with lock:
+                latencies.append(elapsed)
+                rows += len(group.scanned_items)
+
+    trips_before = connector.stats.roundtrips
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    t_start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t_start
+
+    ms = sorted(s * 1000 for s in latencies)
+    print(
+        f"coalescer {label:3}  {rows / wall:8.0f} rows/s  "
+        f"p50={statistics.median(ms):7.1f}ms  p99={ms[int(len(ms) * 0.99) - 1]:7.1f}ms  "
+        f"round trips={connector.stats.roundtrips - trips_before}"
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--clients", type=int, default=64)
+    ap.add_argument("--requests", type=int, default=20, help="requests per client")
+    ap.add_argument("--rows", type=int, default=5, help="max scanned rows per request (1..N)")
+    ap.add_argument("--pool-size", type=int, default=4)
+    ap.add_argument("--roundtrip-ms", type=float, default=40.0)
+    ap.add_argument("--warehouse-concurrency", type=int, default=8)
+    ap.add_argument("--window-ms", type=float, default=20.0)
+    ap.add_argument("--max-batch-rows", type=int, default=2000)
+    args = ap.parse_args()
+    logging.disable(logging.WARNING)
+
+    connector = FakeConnector(
+        connect_s=0, roundtrip_s=args.roundtrip_ms / 1000, max_concurrency=args.warehouse_concurrency,
+    )
+    pool = SnowflakePool(connector.connect, max_size=args.pool_size)
+
+    def write_one(group: WriteGroup) -> dict:
+        with pool.connection() as conn:
+            return write_batch(conn.cursor(), group.scanned_items, group.sales_floor)
+
+    def write_groups(groups: list[WriteGroup]) -> list[dict]:
+        with pool.connection() as conn:
+            write_batch(
+                conn.cursor(),
+                [r for g in groups for r in g.scanned_items],
+                [r for g in groups for r in g.sales_floor],
+            )
+        return [g.result() for g in groups]
+
+    coalescer = Coalescer(write_groups, window_s=args.window_ms / 1000, max_rows=args.max_batch_rows)
+
+    _run("off", write_one, args.clients, args.requests, args.rows, connector)
+    _run("on", coalescer.submit, args.clients, args.requests, args.rows, connector)
+
+
+if __name__ == "__main__":
+    main()
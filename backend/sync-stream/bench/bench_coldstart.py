@@ -0,0 +1,129 @@
+"""
+Cold-start benchmark: fresh interpreter → `import main` → first sync request,
+repeated in new processes so every run is a true cold start.
+
+Each run reports
+  • interpreter – process spawn + Python startup (outside our control)
+  • import      – loading main.py and everything it imports
+  • first req   – the first request, including the lazy snowflake.connector
+                  import, against the fake connector
+With --eager the child first imports snowflake.connector and firebase_admin
+and initialises Firebase, as main.py did before those loads were deferred,
+for comparison. With --max-import-ms the run exits non-zero if the median
+import time exceeds the budget, so boot-latency regressions fail CI.
+--profile prints the STARTUP_PROFILE report from the first run.
+
+Usage (from backend/sync-stream):
+    python bench/bench_coldstart.py --runs 10 --max-import-ms 400
+"""
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_ROOT = os.path.dirname(_HERE)
+
+
+def _child(eager: bool) -> None:
+    t_start = time.perf_counter()
+    sys.path.insert(0, _ROOT)
+    if eager:
+        # Imported only to time them, as main.py used to at module level.
+        import firebase_admin
+        importlib.import_module("snowflake.connector")
+        importlib.import_module("firebase_admin.app_check")
+        firebase_admin.initialize_app()
+    import main
+    t_imported = time.perf_counter()
+
+    # Timed as part of the first request: with lazy loading this is where the
+    # connector import is paid (connect_snowflake would import it anyway).
+    import snowflake.connector
+    from flask import Flask
+
+    from bench.fake_snowflake import FakeConnector
+    snowflake.connector.connect = FakeConnector(connect_s=0, roundtrip_s=0).connect
+    body = json.dumps({
+        "scanned_items": [{"pid": "30231908", "sn": "1", "name": "BFGRD LEAN 454YF",
+                           "best_before_date": 1778000000000, "count": 6}],
+        "sales_floor": [{"pid": "30231908", "name": "BFGRD LEAN 454YF", "count": 3}],
+    })
+    app = Flask(__name__)
+    with app.test_request_context("/", method="POST", data=body, content_type="application/json"):
+        from flask import request
+        _, status = main.stream_to_snowflake(request)
+        t_done = time.perf_counter()
+    assert status == 200, status
+    print(json.dumps({
+        "import_ms": (t_imported - t_start) * 1000,
+        "first_request_ms": (t_done - t_imported) * 1000,
+    }))
+
+
+def _run(eager: bool, profile: bool, tmp: str) -> tuple[dict, str]:
+    env = dict(
+        os.environ,
+        SNOWFLAKE_USER="bench", SNOWFLAKE_ACCOUNT="bench", SNOWFLAKE_PASS_SECRET="bench",
+        SPOOL_PATH=os.path.join(tmp, "spool.db"),
+        STARTUP_PROFILE="1" if profile else "0",
+        PYTHONDONTWRITEBYTECODE="",
+    )
+    cmd = [sys.executable, __file__, "--child"] + (["--eager"] if eager else [])
+    t0 = time.perf_counter()
+    out = subprocess.run(cmd, env=env, check=True, capture_output=True, text=True)
+    wall = (time.perf_counter() - t0) * 1000
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["interpreter_ms"] = wall - result["import_ms"] - result["first_request_ms"]
+    result["total_ms"] = wall
+    return result, out.stderr
+
+
+def _summary(runs: list[dict]) -> dict:
+    keys = ("interpreter_ms", "import_ms", "first_request_ms", "total_ms")
+    return {k: {"median": round(statistics.median(r[k] for r in runs), 1),
+                "max": round(max(r[k] for r in runs), 1)} for k in keys}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--eager", action="store_true", help="also measure the eager-import baseline")
+    ap.add_argument("--profile", action="store_true")
+    ap.add_argument("--max-import-ms", type=float, default=None)
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        _child(args.eager)
+        return
+
+    # One untimed run so .pyc files exist — Cloud Functions deploys ship them warm too.
+    with tempfile.TemporaryDirectory() as tmp:
+        _run(False, False, tmp)
+        modes = [("lazy", False)] + ([("eager", True)] if args.eager else [])
+        summary = {}
+        for label, eager in modes:
+            runs = []
+            for i in range(args.runs):
+                result, stderr = _run(eager, args.profile and i == 0 and not eager, tmp)
+                runs.append(result)
+                if args.profile and i == 0 and not eager:
+                    for line in stderr.splitlines():
+                        if "startup profile:" in line:
+                            print(json.dumps(json.loads(line.split("startup profile:", 1)[1]), indent=2))
+            summary[label] = _summary(runs)
+    print(json.dumps(summary, indent=2))
+
+    if args.max_import_ms is not None and summary["lazy"]["import_ms"]["median"] > args.max_import_ms:
+        print(f"FAIL: median import time above {args.max_import_ms} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Row conversion at scale: the previous per-row path (a Python function call
+per row, ms_to_timestamp per date field per row, KeyError on the first bad
+row) vs. convert.py's column-wise NumPy conversion and validation.
+
+Runs on clean rows (outputs must match exactly) and again with --bad-pct of
+rows malformed, where the per-row path can't finish and the columnar path
+reports the bad rows' indices.
+
+Usage (from backend/sync-stream):
+    python bench/bench_convert.py --rows 100000 --bad-pct 1
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from columnar import ColumnarTable  # noqa: E402
+from convert import convert_scanned_items  # noqa: E402
+
+_DAY_MS = 86_400_000
+
+
+def _ms_to_timestamp(ms):
+    if ms is None or ms == 0:
+        return None
+    return datetime.fromtimestamp(ms / 1000.0, tz=timezone.utc).replace(tzinfo=None)
+
+
+def _per_row(rows: list[dict]) -> list[tuple]:
+    """What ingest did before convert.py."""
+    return [
+        (
+            row['pid'],
+            row['sn'],
+            row['name'],
+            _ms_to_timestamp(row.get('best_before_date')),
+            _ms_to_timestamp(row.get('packed_on_date')),
+            row.get('net_kg'),
+            row.get('count'),
+        )
+        for row in rows
+    ]
+
+
+def _rows(n: int) -> list[dict]:
+    out = []
+    for i in range(n):
+        packed = 1_777_000_000_000 + random.randint(0, 30) * _DAY_MS
+        out.append({
+            "pid": str(30231900 + i % 85), "sn": f"{random.getrandbits(40):013d}",
+            "name": "BFGRD LEAN 454YF",
+            "best_before_date": packed + random.randint(5, 21) * _DAY_MS,
+            "packed_on_date": packed if i % 10 else 0,
+            "net_kg": round(random.uniform(0.8, 12.0), 2), "count": random.randint(1, 24),
+        })
+    return out
+
+
+def _break(rows: list[dict], pct: float) -> list[int]:
+    """Corrupt ~pct% of rows in the ways phones actually get it wrong."""
+    bad = sorted(random.sample(range(len(rows)), int(len(rows) * pct / 100)))
+    for i in bad:
+        fault = random.choice(("no_sn", "null_pid", "text_date", "text_kg"))
+        if fault == "no_sn":
+            del rows[i]["sn"]
+        elif fault == "null_pid":
+            rows[i]["pid"] = None
+        elif fault == "text_date":
+            rows[i]["best_before_date"] = "2026-05-01"
+        else:
+            rows[i]["net_kg"] = "heavy"
+    return bad
+
+
+def _columnar(rows: list[dict]) -> ColumnarTable:
+    names = ("pid", "sn", "name", "best_before_date", "packed_on_date", "net_kg", "count")
+    return ColumnarTable(len(rows), {n: [r.get(n) for r in rows] for n in names})
+
+
+def _time(fn, arg, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--bad-pct", type=float, default=1.0)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    rows = _rows(args.rows)
+    table = _columnar(rows)
+    assert convert_scanned_items(rows).rows == _per_row(rows), "columnar conversion differs from per-row"
+
+    per_row = _time(_per_row, rows, args.repeat)
+    dicts = _time(convert_scanned_items, rows, args.repeat)
+    cols = _time(convert_scanned_items, table, args.repeat)
+    print(f"{args.rows:,} clean rows")
+    print(f"  per-row                 {per_row:8.1f} ms")
+    print(f"  convert (row dicts)     {dicts:8.1f} ms   {per_row / dicts:5.1f}x")
+    print(f"  convert (columnar)      {cols:8.1f} ms   {per_row / cols:5.1f}x")
+
+    bad = _break(rows, args.bad_pct)
+    try:
+        _per_row(rows)
+        outcome = "completed"
+    except (KeyError, TypeError) as e:
+        outcome = f"{type(e).__name__}: {e} — whole batch fails"
+    converted = convert_scanned_items(rows)
+    assert [i for i, _ in converted.rejected] == bad, "rejected indices don't match the corrupted rows"
+    print(f"\nwith {len(bad):,} malformed rows ({args.bad_pct}%)")
+    print(f"  per-row                 {outcome}")
+    print(f"  convert (row dicts)     {_time(convert_scanned_items, rows, args.repeat):8.1f} ms   "
+          f"{len(converted.rows):,} written, {len(converted.rejected):,} rejected "
+          f"(first: {converted.report('scanned_items')[:1]})")
+
+
+if __name__ == "__main__":
+    main()
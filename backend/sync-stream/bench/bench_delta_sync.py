@@ -0,0 +1,350 @@
+"""
+Delta sync (WatermelonDB pull/push) vs. re-sending whole tables, against a
+real SQL engine: delta_sync.py runs unchanged on the SQLite stand-in.
+
+--devices phones share one store. Each round every phone creates, edits and
+deletes a few records, then syncs:
+
+  • "full"  – POSTs its whole scanned_items + sales_floor tables, as the app
+              does today; every row is written again
+  • "delta" – pulls changes since its last pull, then pushes only its own
+              local changes (retrying after a pull on conflict)
+
+Reports bytes on the wire and rows written per mode, and checks that every
+phone ends up with exactly the server's live records and that a stale push
+is rejected with SyncConflict. Phones stamp created_at / updated_at on their
+own clock; pulled records must carry those stamps back, and only fields the
+app's schema defines. SQLite stores 2.5 in any numeric column, so the mirror
+DDL is also checked for the types Snowflake needs to keep it.
+
+The clock advances one PULL_OVERLAP_MS per pull or push, so each pull
+re-reads about one earlier step. A second check runs a push on its own
+connection that commits after another device's pull: the next pull must
+still deliver it, a push that runs past the overlap must be refused, and the
+other device must not silently overwrite that late commit.
+A third runs on DuckDB with SCANNED_ITEMS / SALES_FLOOR and the rollup:
+pushed deletes must remove their warehouse rows, except rows whose key
+another live record still holds, and leave the rollup without drift.
+
+Usage (from backend/sync-stream):
+    python bench/bench_delta_sync.py --records 5000 --devices 3 --rounds 10 --edits 20
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+from functools import partial
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import delta_sync  # noqa: E402
+from bench.duckdb_warehouse import DuckdbWarehouse  # noqa: E402
+from bench.sqlite_warehouse import SqliteWarehouse  # noqa: E402
+from delta_sync import SYNC_TABLES, SyncConflict, ensure_tables, pull, push  # noqa: E402
+from fingerprint import SalesFloorFingerprints  # noqa: E402
+from ingest import delete_rows, write_rows  # noqa: E402
+from rollup import InventoryRollup  # noqa: E402
+
+_clock = itertools.count(1_778_000_000_000, delta_sync.PULL_OVERLAP_MS)
+_device_clock = itertools.count(1_700_000_000_000)
+
+# Columns of vizcount-app/db/schema.ts, besides WatermelonDB's own id.
+APP_SCHEMA = {
+    'scanned_items': {'pid', 'sn', 'name', 'best_before_date', 'net_kg', 'count', 'created_at', 'updated_at'},
+    'sales_floor': {'pid', 'name', 'count', 'weight', 'expiry_date', 'created_at', 'updated_at'},
+}
+
+
+def _scanned(i: str) -> dict:
+    return {"id": i, "pid": str(30_000_000 + random.randrange(500)), "sn": f"SN{random.getrandbits(32)}",
+            "name": "BFGRD LEAN 454YF", "best_before_date": 1778000000000 + random.randrange(10**9),
+            "net_kg": round(random.uniform(0.5, 9), 2), "count": random.randrange(1, 48)}
+
+
+def _floor(i: str, pid: int) -> dict:
+    return {"id": i, "pid": str(pid), "name": "BFGRD LEAN 454YF", "count": random.randrange(60),
+            "weight": round(random.uniform(1, 40), 2), "expiry_date": 1778000000000}
+
+
+class Device:
+    """Just enough of a WatermelonDB client: records plus per-record dirty state."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.records = {t: {} for t in SYNC_TABLES}
+        self.dirty = {t: {} for t in SYNC_TABLES}      # id → 'created' | 'updated' | 'deleted'
+        self.last_pulled_at = None
+        self._ids = itertools.count()
+
+    def new_id(self) -> str:
+        return f"{self.name}-{next(self._ids)}"
+
+    def create(self, table: str, record: dict) -> None:
+        stamp = next(_device_clock)
+        record = {**record, "created_at": stamp, "updated_at": stamp}
+        self.records[table][record["id"]] = record
+        self.dirty[table][record["id"]] = 'created'
+
+    def update(self, table: str, rec_id: str, **values) -> None:
+        self.records[table][rec_id].update(values, updated_at=next(_device_clock))
+        self.dirty[table].setdefault(rec_id, 'updated')
+
+    def delete(self, table: str, rec_id: str) -> None:
+        del self.records[table][rec_id]
+        if self.dirty[table].get(rec_id) == 'created':
+            del self.dirty[table][rec_id]
+        else:
+            self.dirty[table][rec_id] = 'deleted'
+
+    def edit(self, n: int) -> None:
+        for _ in range(n):
+            self.create('scanned_items', _scanned(self.new_id()))
+        floor = list(self.records['sales_floor'])
+        for rec_id in random.sample(floor, min(n, len(floor))):
+            self.update('sales_floor', rec_id, count=random.randrange(60))
+        scanned = list(self.records['scanned_items'])
+        for rec_id in random.sample(scanned, min(n // 4, len(scanned))):
+            self.delete('scanned_items', rec_id)
+
+    def apply_pull(self, response: dict) -> None:
+        for table, changes in response["changes"].items():
+            for record in changes["created"] + changes["updated"]:
+                if record["id"] not in self.dirty[table]:    # local changes win until pushed
+                    self.records[table][record["id"]] = record
+            for rec_id in changes["deleted"]:
+                if rec_id not in self.dirty[table]:
+                    self.records[table].pop(rec_id, None)
+        self.last_pulled_at = response["timestamp"]
+
+    def push_body(self) -> dict:
+        changes = {}
+        for table, dirty in self.dirty.items():
+            changes[table] = {"created": [], "updated": [], "deleted": []}
+            for rec_id, state in dirty.items():
+                if state == 'deleted':
+                    changes[table]["deleted"].append(rec_id)
+                else:
+                    changes[table][state].append(self.records[table][rec_id])
+        return {"changes": changes, "lastPulledAt": self.last_pulled_at}
+
+
+def _size(body: dict) -> int:
+    return len(json.dumps(body, separators=(",", ":")).encode())
+
+
+def _sync(cur, device: Device, stats: dict, **hooks) -> None:
+    """WatermelonDB's synchronize(): pull, push, and on conflict start over.
+    *hooks* (forward / remove) are passed on to push()."""
+    while True:
+        response = pull(cur, device.last_pulled_at, timestamp=next(_clock))
+        stats["bytes"] += _size(response)
+        device.apply_pull(response)
+        body = device.push_body()
+        if not any(c["created"] or c["updated"] or c["deleted"] for c in body["changes"].values()):
+            return
+        stats["bytes"] += _size(body)
+        cur.execute("BEGIN")
+        try:
+            result = push(cur, body["changes"], body["lastPulledAt"], timestamp=next(_clock), **hooks)
+            cur.execute("COMMIT")
+        except SyncConflict:
+            cur.execute("ROLLBACK")
+            stats["conflicts"] += 1
+            continue
+        stats["rows"] += sum(sum(c.values()) for c in result["changes"].values())
+        for dirty in device.dirty.values():
+            dirty.clear()
+        return
+
+
+def _server_live(cur) -> dict:
+    snapshot = pull(cur, None, timestamp=next(_clock))["changes"]
+    return {t: {r["id"]: r for r in c["created"]} for t, c in snapshot.items()}
+
+
+def _check_conflict(cur) -> None:
+    a, b = Device("conflict-a"), Device("conflict-b")
+    stats = {"bytes": 0, "rows": 0, "conflicts": 0}
+    _sync(cur, a, stats)
+    _sync(cur, b, stats)
+    rec_id = next(iter(a.records['sales_floor']))
+    a.update('sales_floor', rec_id, count=1)
+    b.update('sales_floor', rec_id, count=2)
+    _sync(cur, a, stats)
+    try:
+        cur.execute("BEGIN")
+        push(cur, b.push_body()["changes"], b.last_pulled_at, timestamp=next(_clock))
+        raise AssertionError("stale push was accepted")
+    except SyncConflict:
+        cur.execute("ROLLBACK")
+    _sync(cur, b, stats)     # re-pull, then the push goes through; b's edit wins
+    assert _server_live(cur)['sales_floor'][rec_id]["count"] == 2
+
+
+def _check_column_types() -> None:
+    """Fractional fields must be FLOAT: Snowflake's bare NUMBER is NUMBER(38,0) and rounds."""
+    for table in SYNC_TABLES.values():
+        ddl = " ".join(table.ddl.split())
+        for (_, col), (field, kind, _) in zip(table.columns, table.fields):
+            want = {'number': 'FLOAT', 'ms': 'NUMBER(38,0)'}.get(kind, 'VARCHAR')
+            assert f"{col} {want}" in ddl, f"{table.store}.{col} ({field}) is not declared {want}"
+        for col in ("CREATED_AT", "UPDATED_AT", "CLIENT_CREATED_AT", "CLIENT_UPDATED_AT"):
+            assert f" {col} NUMBER(38,0)" in ddl, f"{table.store}.{col} is not declared NUMBER(38,0)"
+
+
+def _check_push_race() -> None:
+    """A push stamped before a pull's timestamp but committed after it still reaches that device."""
+    with tempfile.TemporaryDirectory() as tmp:
+        wh = SqliteWarehouse(os.path.join(tmp, "race.db"))
+        writer, reader = wh.connect().cursor(), wh.connect().cursor()
+        delta_sync._tables_ready = False
+        ensure_tables(writer)
+        a, b = Device("race-a"), Device("race-b")
+        stats = {"bytes": 0, "rows": 0, "conflicts": 0}
+        _sync(reader, b, stats)
+        rec_id = a.new_id()
+        a.create('scanned_items', _scanned(rec_id))
+
+        stamp = b.last_pulled_at + 1
+        writer.execute("BEGIN")
+        push(writer, a.push_body()["changes"], a.last_pulled_at, timestamp=stamp)
+        b.apply_pull(pull(reader, b.last_pulled_at, timestamp=stamp + 1000))   # push not yet visible
+        assert rec_id not in b.records['scanned_items']
+        writer.execute("COMMIT")
+        b.apply_pull(pull(reader, b.last_pulled_at, timestamp=stamp + 2000))
+        assert rec_id in b.records['scanned_items'], "a push committed after a pull was never delivered"
+
+        overlap, delta_sync.PULL_OVERLAP_MS = delta_sync.PULL_OVERLAP_MS, 0
+        try:
+            writer.execute("BEGIN")
+            push(writer, a.push_body()["changes"], b.last_pulled_at, timestamp=stamp + 3000)
+            raise AssertionError("a push longer than the pull overlap was committed")
+        except SyncConflict as e:
+            writer.execute("ROLLBACK")
+            assert "too long" in str(e), e
+        finally:
+            delta_sync.PULL_OVERLAP_MS = overlap
+
+        # a's edit is stamped before b's next pull but commits after it; b then
+        # edits the same record and must get a conflict, not overwrite a's edit.
+        stamp = b.last_pulled_at + delta_sync.PULL_OVERLAP_MS       # a pulled at stamp; no conflict
+        edit = {t: {"created": [], "updated": [], "deleted": []} for t in SYNC_TABLES}
+        edit['scanned_items']["updated"].append({**b.records['scanned_items'][rec_id], "count": 1})
+        writer.execute("BEGIN")
+        push(writer, edit, stamp, timestamp=stamp)
+        b.apply_pull(pull(reader, b.last_pulled_at, timestamp=stamp + 1000))
+        writer.execute("COMMIT")
+        b.update('scanned_items', rec_id, count=2)
+        try:
+            reader.execute("BEGIN")
+            push(reader, b.push_body()["changes"], b.last_pulled_at, timestamp=stamp + 2000)
+            raise AssertionError("a push overwrote a record committed after its last pull")
+        except SyncConflict:
+            reader.execute("ROLLBACK")
+        writer.close()
+        reader.close()
+    delta_sync._tables_ready = False
+
+
+def _check_forwarded_deletes() -> None:
+    """Deleted records leave SCANNED_ITEMS / SALES_FLOOR unless a live record shares the key."""
+    wh = DuckdbWarehouse()
+    wh.create_base_tables()
+    cur = wh.connect().cursor()
+    for table in SYNC_TABLES.values():                  # DuckDB has no NUMBER type
+        cur.execute(table.ddl.replace("NUMBER(38,0)", "BIGINT"))
+    delta_sync._tables_ready = True
+    rollup, fingerprints = InventoryRollup(), SalesFloorFingerprints()
+    rollup.ensure_table(cur)
+    hooks = {"forward": partial(write_rows, fingerprints=fingerprints, rollup=rollup),
+             "remove": partial(delete_rows, fingerprints=fingerprints, rollup=rollup)}
+    stats = {"bytes": 0, "rows": 0, "conflicts": 0}
+
+    a, b = Device("del-a"), Device("del-b")
+    for _ in range(40):
+        a.create('scanned_items', _scanned(a.new_id()))
+    for pid in range(31_000_000, 31_000_010):
+        a.create('sales_floor', _floor(a.new_id(), pid))
+    twin = next(iter(a.records['scanned_items'].values()))
+    a.create('scanned_items', {**twin, "id": a.new_id()})                  # same PID + SN
+    a.create('sales_floor', _floor(a.new_id(), 31_000_000))                 # same PID
+    _sync(cur, a, stats, **hooks)
+    _sync(cur, b, stats, **hooks)
+    for table in SYNC_TABLES:
+        first, *rest = b.records[table]
+        for rec_id in [first, *rest[::2]]:       # the first of each twin; the other stays live
+            b.delete(table, rec_id)
+    _sync(cur, b, stats, **hooks)
+
+    live = _server_live(cur)
+    cur.execute("SELECT PID, SN FROM SCANNED_ITEMS")
+    scanned = {tuple(r) for r in cur.fetchall()}
+    cur.execute("SELECT PID FROM SALES_FLOOR")
+    floor = {r[0] for r in cur.fetchall()}
+    assert scanned == {(r["pid"], r["sn"]) for r in live['scanned_items'].values()}, "SCANNED_ITEMS kept deleted rows"
+    assert floor == {r["pid"] for r in live['sales_floor'].values()}, "SALES_FLOOR kept deleted PIDs"
+    assert (twin["pid"], twin["sn"]) in scanned and "31000000" in floor, "a key still held by a live record was deleted"
+    assert rollup.check(cur)["values_drifted"] == 0, "INVENTORY_ROLLUP drifted after deletes"
+    cur.close()
+    delta_sync._tables_ready = False
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--records", type=int, default=5000)
+    ap.add_argument("--devices", type=int, default=3)
+    ap.add_argument("--rounds", type=int, default=10)
+    ap.add_argument("--edits", type=int, default=20)
+    args = ap.parse_args()
+    random.seed(7)
+
+    cur = SqliteWarehouse().connect().cursor()
+    delta_sync._tables_ready = False
+    ensure_tables(cur)
+
+    devices = [Device(f"dev{d}") for d in range(args.devices)]
+    for d in devices:
+        for _ in range(args.records):
+            d.create('scanned_items', _scanned(d.new_id()))
+        for pid in range(30_000_000, 30_000_000 + args.records // 20):
+            d.create('sales_floor', _floor(d.new_id(), pid))
+
+    full = {"bytes": 0, "rows": 0}
+    delta = {"bytes": 0, "rows": 0, "conflicts": 0}
+    for rnd in range(args.rounds):
+        for d in devices:
+            if rnd:
+                d.edit(args.edits)
+            body = {t: list(d.records[t].values()) for t in SYNC_TABLES}
+            full["bytes"] += _size(body)
+            full["rows"] += sum(len(v) for v in body.values())
+            _sync(cur, d, delta)
+
+    # One more pass so every phone has seen every other phone's last push.
+    for d in devices:
+        _sync(cur, d, delta)
+    live = _server_live(cur)
+    for d in devices:
+        assert d.records == live, f"{d.name} diverged from the server"
+    for table, records in live.items():
+        extra = {k for r in records.values() for k in r} - APP_SCHEMA[table] - {"id"}
+        assert not extra, f"pull sent {table} fields the app schema lacks: {sorted(extra)}"
+        assert all(r["updated_at"] < 1_778_000_000_000 for r in records.values()), "pull sent server stamps"
+
+    _check_conflict(cur)
+    _check_column_types()
+    _check_push_race()
+    _check_forwarded_deletes()
+
+    for label, s in (("full", full), ("delta", delta)):
+        print(f"{label:6} sent+received={s['bytes'] / 1e6:8.2f} MB  rows written={s['rows']:8}")
+    print(f"delta/full: bytes {delta['bytes'] / full['bytes']:.3f}, rows {delta['rows'] / full['rows']:.3f}; "
+          f"{delta['conflicts']} conflicts resolved by re-pull; all devices converged; client stamps kept; stale push rejected; late commit delivered and not overwritten; "
+          f"deletes forwarded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+SALES_FLOOR change detection: a phone resending its whole sales_floor table
+every sync, with only --change-rate of the PIDs actually different each time.
+
+  • "merge all"   – every row goes into the MERGE, as before
+  • "warm cache"  – one SalesFloorFingerprints across syncs (a warm instance)
+  • "cold cache"  – a fresh SalesFloorFingerprints per sync (every request
+                    lands on a new instance; fingerprints come from SALES_FLOOR)
+
+Reports rows merged, rows skipped, warehouse round trips and wall time per
+mode, against the fake connector (which keeps what was merged, so lookups
+return it).
+
+Usage (from backend/sync-stream):
+    python bench/bench_fingerprint.py --pids 2000 --syncs 20 --change-rate 0.05
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench.fake_snowflake import FakeConnector  # noqa: E402
+from fingerprint import SalesFloorFingerprints  # noqa: E402
+from ingest import write_batch  # noqa: E402
+
+
+def _table(pids: int) -> list[dict]:
+    return [
+        {"pid": str(30_000_000 + i), "name": f"PRODUCT {i}", "count": random.randrange(60),
+         "weight": round(random.uniform(1, 40), 2), "expiry_date": 1778000000000 + i * 86_400_000}
+        for i in range(pids)
+    ]
+
+
+def _mutate(table: list[dict], rate: float) -> None:
+    for row in random.sample(table, int(len(table) * rate)):
+        row["count"] = random.randrange(60)
+
+
+def _run(label: str, syncs: list[list[dict]], make_fingerprints, args) -> None:
+    fake = FakeConnector(connect_s=0, roundtrip_s=args.roundtrip_ms / 1000, per_row_s=args.per_row_us / 1e6)
+    cur = fake.connect().cursor()
+    fingerprints = make_fingerprints()
+    merged = skipped = 0
+    t0 = time.perf_counter()
+    for rows in syncs:
+        if label == "cold cache":
+            fingerprints = make_fingerprints()
+        result = write_batch(cur, [], rows, fingerprints)
+        merged += result["sales_floor_upserted"]
+        skipped += result["sales_floor_skipped"]
+    elapsed = time.perf_counter() - t0
+    print(f"{label:11} merged={merged:7}  skipped={skipped:7}  "
+          f"round trips={fake.stats.roundtrips:5}  time={elapsed:6.2f}s")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--pids", type=int, default=2000)
+    ap.add_argument("--syncs", type=int, default=20)
+    ap.add_argument("--change-rate", type=float, default=0.05)
+    ap.add_argument("--roundtrip-ms", type=float, default=10.0)
+    ap.add_argument("--per-row-us", type=float, default=200.0)
+    args = ap.parse_args()
+    logging.disable(logging.INFO)
+    random.seed(13)
+
+    table = _table(args.pids)
+    syncs = []
+    for i in range(args.syncs):
+        if i:
+            _mutate(table, args.change_rate)
+        syncs.append([dict(row) for row in table])
+
+    _run("merge all", syncs, lambda: None, args)
+    _run("warm cache", syncs, SalesFloorFingerprints, args)
+    _run("cold cache", syncs, SalesFloorFingerprints, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+SCANNED_ITEMS throughput: parameter binding vs. the PUT + COPY INTO stage path
+across batch sizes, plus what insert_scanned_items() picks at the configured
+threshold.
+
+Client-side work (row conversion, CSV serialisation) is real; warehouse cost
+is modelled by the fake connector (per-row bind cost vs. upload + cheap
+columnar load).
+
+Usage (from backend/sync-stream):
+    python bench/bench_ingest.py --sizes 100 1000 5000 20000 --threshold 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench.fake_snowflake import FakeConnector  # noqa: E402
+from convert import convert_scanned_items  # noqa: E402
+from ingest import copy_scanned_items, insert_scanned_items  # noqa: E402
+
+
+def _payload(n: int) -> list[tuple]:
+    return convert_scanned_items([
+        {"pid": str(30000000 + i % 85), "sn": f"SN{i:09d}", "name": "BFGRD LEAN 454YF",
+         "best_before_date": 1778000000000, "packed_on_date": 1777000000000,
+         "net_kg": 2.35, "count": 6}
+        for i in range(n)
+    ]).rows
+
+
+def _rows_per_s(fn, connector: FakeConnector, rows: list[tuple]) -> float:
+    cur = connector.connect().cursor()
+    t0 = time.perf_counter()
+    fn(cur, rows)
+    return len(rows) / (time.perf_counter() - t0)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000, 20000])
+    ap.add_argument("--threshold", type=int, default=2000)
+    ap.add_argument("--roundtrip-ms", type=float, default=20.0)
+    ap.add_argument("--bind-row-us", type=float, default=60.0)
+    ap.add_argument("--stage-row-us", type=float, default=2.0)
+    ap.add_argument("--upload-mb-ms", type=float, default=40.0)
+    args = ap.parse_args()
+
+    connector = FakeConnector(
+        connect_s=0,
+        roundtrip_s=args.roundtrip_ms / 1000,
+        per_row_s=args.bind_row_us / 1e6,
+        stage_row_s=args.stage_row_us / 1e6,
+        upload_mb_s=args.upload_mb_ms / 1000,
+    )
+
+    def bind(cur, rows):
+        insert_scanned_items(cur, rows, bulk_threshold=len(rows) + 1)
+
+    def adaptive(cur, rows):
+        insert_scanned_items(cur, rows, bulk_threshold=args.threshold)
+
+    print(f"{'rows':>7}  {'bind rows/s':>12}  {'stage rows/s':>13}  {'adaptive rows/s':>16}")
+    for n in args.sizes:
+        rows = _payload(n)
+        print(
+            f"{n:>7}  {_rows_per_s(bind, connector, rows):>12,.0f}  "
+            f"{_rows_per_s(copy_scanned_items, connector, rows):>13,.0f}  "
+            f"{_rows_per_s(adaptive, connector, rows):>16,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
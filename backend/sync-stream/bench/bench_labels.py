@@ -0,0 +1,100 @@
+"""
+Throughput of labels.py: barcodes/sec through parse_gs1_batch and labels/sec
+through parse_label_batch, on scans shaped like the app's — catalog PIDs,
+]C1 + 01 GTIN + 11/17 dates + 3102 weight + 21 serial + GS, and label lines
+like pipelineTest.mjs's lbl() (chicken labels carry an HU number, the rest
+an S/N).
+
+--node runs the JS parseGS1 from pipelineTest.mjs over the same barcodes
+for reference.
+
+Usage (from backend/sync-stream):
+    python bench/bench_labels.py --barcodes 200000 --repeat 5
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench.parity_labels import PIPELINE_TEST  # noqa: E402
+from bench.payloads import load_catalog  # noqa: E402
+from labels import HU_SERIAL_TYPES, parse_gs1_batch, parse_label_batch  # noqa: E402
+
+_JS_BENCH = r"""
+import { readFileSync } from 'node:fs';
+%s
+const barcodes = JSON.parse(readFileSync(0, 'utf8'));
+const times = [];
+for (let r = 0; r < %d; r++) {
+    const t0 = process.hrtime.bigint();
+    for (const b of barcodes) parseGS1(b);
+    times.push(Number(process.hrtime.bigint() - t0) / 1e9);
+}
+process.stdout.write(JSON.stringify(times));
+"""
+
+
+def _scans(n: int, seed: int) -> tuple[list[str], list[dict]]:
+    rng = random.Random(seed)
+    catalog = load_catalog()
+    barcodes, labels = [], []
+    for _ in range(n):
+        p = rng.choice(catalog)
+        gtin = f"000{p.pid:0>8}{rng.randrange(1000):03d}"[-14:]
+        day = rng.randrange(1, 29)
+        chicken = p.type in HU_SERIAL_TYPES
+        sn = f"202603{day:02d}{rng.randrange(10 ** 6):06d}" if chicken else f"{rng.randrange(10 ** 12):012d}"
+        kg = rng.randrange(40, 2000)
+        barcodes.append(f"]C101{gtin}112603{day:02d}172604{day:02d}3102{kg:06d}21{sn}\x1d")
+        lines = [f"PID: {p.pid}", f"{'HU' if chicken else 'S/N'} {sn}", f"Net {kg / 100} kg",
+                 f"PKD: {day:02d}-MAR-2026", f"Best Before: {day:02d}-APR-2026"]
+        labels.append({"lines": lines, "type": p.type, "name": p.name})
+    return barcodes, labels
+
+
+def _rate(label: str, n: int, times: list[float], unit: str) -> None:
+    best, median = min(times), statistics.median(times)
+    print(f"{label:28} best {best * 1000:8.1f} ms  median {median * 1000:8.1f} ms  "
+          f"{n / median:12,.0f} {unit}/s")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--barcodes", type=int, default=200_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--node", action="store_true", help="also time the JS parseGS1 under node")
+    args = ap.parse_args()
+
+    barcodes, labels = _scans(args.barcodes, args.seed)
+
+    def timed(fn, items) -> list[float]:
+        times = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            fn(items)
+            times.append(time.perf_counter() - t0)
+        return times
+
+    _rate("parse_gs1_batch", len(barcodes), timed(parse_gs1_batch, barcodes), "barcodes")
+    with_barcodes = [dict(label, barcode=b) for label, b in zip(labels, barcodes)]
+    _rate("parse_label_batch (OCR only)", len(labels), timed(parse_label_batch, labels), "labels")
+    _rate("parse_label_batch (+barcode)", len(labels), timed(parse_label_batch, with_barcodes), "labels")
+
+    if args.node:
+        with open(PIPELINE_TEST, encoding="utf-8") as f:
+            src = f.read()
+        js = src[src.index("// ─── GS1 Parser"):src.index("// ─── OCR helpers")]
+        out = subprocess.run(["node", "--input-type=module", "-e", _JS_BENCH % (js, args.repeat)],
+                             input=json.dumps(barcodes), capture_output=True, text=True, check=True)
+        _rate("JS parseGS1 (node)", len(barcodes), json.loads(out.stdout), "barcodes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+SALES_FLOOR upsert scaling: one MERGE per row (previous loop) vs. the
+set-based merge_sales_floor() in ingest.py.
+
+Round trips dominate, so the fake connector charges a fixed latency per
+statement plus a small per-row cost.
+
+Usage (from backend/sync-stream):
+    python bench/bench_merge.py --sizes 10 100 500 1000 --roundtrip-ms 20
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench.fake_snowflake import FakeConnector  # noqa: E402
+from convert import convert_sales_floor  # noqa: E402
+from ingest import merge_sales_floor  # noqa: E402
+
+_PER_ROW_MERGE = "MERGE INTO SALES_FLOOR AS target USING (SELECT %s AS PID, ...) AS source ..."
+
+
+def _ms_to_timestamp(ms):
+    if ms is None or ms == 0:
+        return None
+    return datetime.fromtimestamp(ms / 1000.0, tz=timezone.utc).replace(tzinfo=None)
+
+
+def _merge_per_row(cur, sales_floor: list[dict]) -> int:
+    """The pre-batching implementation: one round trip per row."""
+    for row in sales_floor:
+        cur.execute(
+            _PER_ROW_MERGE,
+            (row['pid'], row['name'], row.get('count'), row.get('weight'),
+             _ms_to_timestamp(row.get('expiry_date'))),
+        )
+    return len(sales_floor)
+
+
+def _payload(n: int) -> list[dict]:
+    return [
+        {"pid": str(30000000 + i), "name": f"PRODUCT {i}", "count": i % 40,
+         "weight": 2.5, "expiry_date": 1778000000000}
+        for i in range(n)
+    ]
+
+
+def _merge_set_based(cur, sales_floor: list[dict]) -> int:
+    return merge_sales_floor(cur, convert_sales_floor(sales_floor).rows)
+
+
+def _time(fn, connector: FakeConnector, rows: list[dict]) -> tuple[float, int]:
+    conn = connector.connect()
+    cur = conn.cursor()
+    before = connector.stats.roundtrips
+    t0 = time.perf_counter()
+    fn(cur, rows)
+    return time.perf_counter() - t0, connector.stats.roundtrips - before
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 300, 1000])
+    ap.add_argument("--roundtrip-ms", type=float, default=20.0)
+    ap.add_argument("--per-row-us", type=float, default=20.0)
+    args = ap.parse_args()
+
+    connector = FakeConnector(
+        connect_s=0, roundtrip_s=args.roundtrip_ms / 1000, per_row_s=args.per_row_us / 1e6,
+    )
+    print(f"{'rows':>6}  {'per-row loop':>14}  {'trips':>6}  {'set-based':>12}  {'trips':>6}  {'speedup':>8}")
+    for n in args.sizes:
+        rows = _payload(n)
+        loop_s, loop_trips = _time(_merge_per_row, connector, rows)
+        batch_s, batch_trips = _time(_merge_set_based, connector, rows)
+        print(
+            f"{n:>6}  {loop_s * 1000:>12.1f}ms  {loop_trips:>6}  "
+            f"{batch_s * 1000:>10.1f}ms  {batch_trips:>6}  {loop_s / batch_s:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
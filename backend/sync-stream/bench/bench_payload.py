@@ -0,0 +1,110 @@
+"""
+Sync payload formats on a realistic cooler dump: row JSON vs. columnar JSON,
+each sent as-is, gzip'd and zstd'd.
+
+For every combination reports the bytes on the wire and the server-side
+decode time — decompress + json.loads + payload_tables + building the insert
+tuples (what the handler does before the first statement is sent).
+
+Usage (from backend/sync-stream):
+    python bench/bench_payload.py --rows 10000
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+import zstandard
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from convert import convert_sales_floor, convert_scanned_items  # noqa: E402
+from ingest import payload_tables  # noqa: E402
+
+_DAY_MS = 86_400_000
+_NOW_MS = 1_778_000_000_000
+
+
+def _dump(rows: int) -> dict:
+    """One cooler walk: *rows* case scans spread over ~85 products."""
+    products = [(str(30231900 + i), f"PRODUCT {i:02d} {random.choice(['LEAN', 'REG', 'XLEAN'])} 454YF")
+                for i in range(85)]
+    scanned = []
+    for i in range(rows):
+        pid, name = random.choice(products)
+        packed = _NOW_MS - random.randint(0, 10) * _DAY_MS
+        scanned.append({
+            "pid": pid, "sn": f"{random.getrandbits(40):013d}", "name": name,
+            "best_before_date": packed + random.randint(5, 21) * _DAY_MS,
+            "packed_on_date": packed,
+            "net_kg": round(random.uniform(0.8, 12.0), 2),
+            "count": random.randint(1, 24),
+        })
+    floor = [
+        {"pid": pid, "name": name, "count": random.randint(0, 30),
+         "weight": round(random.uniform(0, 60), 2), "expiry_date": _NOW_MS + 7 * _DAY_MS}
+        for pid, name in products
+    ]
+    return {"scanned_items": scanned, "sales_floor": floor}
+
+
+def _columnar(rows: list[dict]) -> dict:
+    names = list(rows[0])
+    return {"rows": len(rows), "columns": {n: [r.get(n) for r in rows] for n in names}}
+
+
+def _decode(body: bytes, encoding: str):
+    if encoding == "gzip":
+        body = gzip.decompress(body)
+    elif encoding == "zstd":
+        body = zstandard.ZstdDecompressor().decompress(body)
+    scanned, floor = payload_tables(json.loads(body))
+    return convert_scanned_items(scanned).rows, convert_sales_floor(floor).rows
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=10_000)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    dump = _dump(args.rows)
+    bodies = {
+        "rows": json.dumps(dump).encode(),
+        "columnar": json.dumps({
+            "scanned_items": _columnar(dump["scanned_items"]),
+            "sales_floor": _columnar(dump["sales_floor"]),
+        }).encode(),
+    }
+    encoders = {
+        "identity": lambda b: b,
+        "gzip": lambda b: gzip.compress(b, compresslevel=6),
+        "zstd": lambda b: zstandard.ZstdCompressor(level=3).compress(b),
+    }
+
+    reference = _decode(bodies["rows"], "identity")
+    baseline_size = baseline_ms = None
+    print(f"{args.rows:,} scanned_items rows + {len(dump['sales_floor'])} sales_floor rows\n")
+    print(f"{'format':9} {'encoding':9} {'wire KB':>9} {'vs rows':>8} {'decode ms':>10} {'vs rows':>8}")
+    for fmt, raw in bodies.items():
+        for enc, encode in encoders.items():
+            body = encode(raw)
+            assert _decode(body, enc) == reference, f"{fmt}/{enc} decodes to different rows"
+            times = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                _decode(body, enc)
+                times.append(time.perf_counter() - t0)
+            ms = statistics.median(times) * 1000
+            if baseline_size is None:
+                baseline_size, baseline_ms = len(body), ms
+            print(f"{fmt:9} {enc:9} {len(body) / 1024:9.1f} {len(body) / baseline_size:8.2f} "
+                  f"{ms:10.1f} {ms / baseline_ms:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
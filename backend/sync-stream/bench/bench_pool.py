@@ -0,0 +1,82 @@
+"""
+Per-request latency: connect-per-request vs. the module-level SnowflakePool.
+
+Each simulated request does what stream_to_snowflake does against the warehouse
+(one executemany + one MERGE) using the fake connector, so the only variable is
+whether the handshake is paid per request or once per pooled connection.
+
+Usage (from backend/sync-stream):
+    python bench/bench_pool.py --requests 200 --concurrency 4
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench.fake_snowflake import FakeConnector  # noqa: E402
+from pool import SnowflakePool  # noqa: E402
+
+
+def _do_work(conn) -> None:
+    cur = conn.cursor()
+    cur.executemany("INSERT INTO SCANNED_ITEMS VALUES (%s)", [(1,)] * 5)
+    cur.execute("MERGE INTO SALES_FLOOR ...")
+    cur.close()
+
+
+def _request_unpooled(connector: FakeConnector) -> float:
+    t0 = time.perf_counter()
+    conn = connector.connect()
+    try:
+        _do_work(conn)
+    finally:
+        conn.close()
+    return time.perf_counter() - t0
+
+
+def _request_pooled(pool: SnowflakePool) -> float:
+    t0 = time.perf_counter()
+    with pool.connection() as conn:
+        _do_work(conn)
+    return time.perf_counter() - t0
+
+
+def _run(fn, n: int, concurrency: int) -> list[float]:
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        return list(ex.map(lambda _: fn(), range(n)))
+
+
+def _summary(name: str, samples: list[float], connects: int) -> str:
+    ms = sorted(s * 1000 for s in samples)
+    p95 = ms[int(len(ms) * 0.95) - 1]
+    return (
+        f"{name:<10} mean={statistics.mean(ms):7.1f}ms  p50={statistics.median(ms):7.1f}ms  "
+        f"p95={p95:7.1f}ms  connects={connects}"
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--connect-ms", type=float, default=150.0)
+    ap.add_argument("--roundtrip-ms", type=float, default=10.0)
+    args = ap.parse_args()
+
+    unpooled = FakeConnector(connect_s=args.connect_ms / 1000, roundtrip_s=args.roundtrip_ms / 1000)
+    samples = _run(lambda: _request_unpooled(unpooled), args.requests, args.concurrency)
+    print(_summary("unpooled", samples, unpooled.stats.connects))
+
+    pooled = FakeConnector(connect_s=args.connect_ms / 1000, roundtrip_s=args.roundtrip_ms / 1000)
+    pool = SnowflakePool(pooled.connect, max_size=args.concurrency)
+    samples = _run(lambda: _request_pooled(pool), args.requests, args.concurrency)
+    pool.close_all()
+    print(_summary("pooled", samples, pooled.stats.connects))
+
+
+if __name__ == "__main__":
+    main()
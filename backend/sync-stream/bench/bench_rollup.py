@@ -0,0 +1,104 @@
+"""
+INVENTORY_ROLLUP end to end on DuckDB (bench/duckdb_warehouse.py):
+
+  1. ingest --syncs catalog-shaped payloads (bench/payloads.py) through
+     ingest.write_batch, each in its own transaction, with and without the
+     rollup — the difference is the rollup's cost at ingest time
+  2. time the dashboard-style re-aggregation of SCANNED_ITEMS + SALES_FLOOR
+     against reading INVENTORY_ROLLUP, as history grows
+  3. run the consistency check (must find no drift), then corrupt the
+     rollup three ways — a wrong count, a missing PID, a scan written
+     around it — and check that all three are reported and repaired
+
+Usage (from backend/sync-stream):
+    python bench/bench_rollup.py --syncs 200 --scans-per-sync 500
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench.duckdb_warehouse import DuckdbWarehouse  # noqa: E402
+from bench.payloads import PayloadGenerator, load_catalog  # noqa: E402
+from ingest import write_batch  # noqa: E402
+from rollup import ROLLUP_BASE_SQL, InventoryRollup  # noqa: E402
+
+
+def _ingest(payloads: list[dict], rollup) -> tuple[DuckdbWarehouse, float]:
+    wh = DuckdbWarehouse()
+    wh.create_base_tables()
+    cur = wh.connect().cursor()
+    if rollup is not None:
+        rollup.ensure_table(cur)
+    t0 = time.perf_counter()
+    for payload in payloads:
+        cur.execute("BEGIN")
+        write_batch(cur, payload["scanned_items"], payload["sales_floor"], rollup=rollup)
+        cur.execute("COMMIT")
+    return wh, time.perf_counter() - t0
+
+
+def _timed(cur, sql: str, repeat: int) -> tuple[float, int]:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        cur.execute(sql)
+        rows = cur.fetchall()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), len(rows)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--syncs", type=int, default=200)
+    ap.add_argument("--scans-per-sync", type=int, default=500)
+    ap.add_argument("--floor-rows", type=int, default=20)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=3)
+    args = ap.parse_args()
+    logging.disable(logging.WARNING)
+
+    gen = PayloadGenerator(load_catalog(), seed=args.seed)
+    payloads = [gen.payload(args.scans_per_sync, args.floor_rows) for _ in range(args.syncs)]
+
+    _, plain_s = _ingest(payloads, None)
+    rollup = InventoryRollup()
+    wh, rollup_s = _ingest(payloads, rollup)
+    n = args.syncs
+    print(f"ingest {n} syncs x {args.scans_per_sync} scans: "
+          f"{plain_s / n * 1000:.1f} ms/sync without rollup, {rollup_s / n * 1000:.1f} ms/sync with "
+          f"(+{(rollup_s - plain_s) / n * 1000:.1f} ms)")
+
+    cur = wh.connect().cursor()
+    cur.execute("SELECT COUNT(*) FROM SCANNED_ITEMS")
+    history = cur.fetchone()[0]
+    agg_s, agg_rows = _timed(cur, ROLLUP_BASE_SQL, args.repeat)
+    read_s, read_rows = _timed(cur, "SELECT * FROM INVENTORY_ROLLUP", args.repeat)
+    print(f"re-aggregate {history} scans: {agg_s * 1000:7.2f} ms -> {agg_rows} rows")
+    print(f"read rollup:           {read_s * 1000:7.2f} ms -> {read_rows} rows")
+
+    report = rollup.check(cur)
+    print(f"check after ingest: {report['pids_checked']} PIDs, {report['values_drifted']} drifted")
+    assert report["values_drifted"] == 0, report["drift"]
+
+    pids = [r[0] for r in cur.execute("SELECT PID FROM INVENTORY_ROLLUP ORDER BY PID").fetchall()]
+    cur.execute("UPDATE INVENTORY_ROLLUP SET COOLER_COUNT = COOLER_COUNT + 5 WHERE PID = %s", (pids[0],))
+    cur.execute("DELETE FROM INVENTORY_ROLLUP WHERE PID = %s", (pids[1],))
+    cur.execute("INSERT INTO SCANNED_ITEMS (PID, SN, NAME, NET_KG, ITEM_COUNT) VALUES (%s, 'X', 'X', 1.5, 2)",
+                (pids[2],))
+    report = rollup.check_and_repair(cur, repair=True)
+    drifted = sorted({d["pid"] for d in report["drift"]})
+    print(f"check after corrupting {pids[:3]}: drifted PIDs {drifted}, "
+          f"{report['values_drifted']} values, repaired={report['repaired']}")
+    assert drifted == sorted(pids[:3]) and report["repaired"], report
+    report = rollup.check(cur)
+    print(f"check after repair: {report['values_drifted']} drifted")
+    assert report["values_drifted"] == 0, report["drift"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Write-behind spool, fully offline: accept latency vs. a synchronous write,
+then background drain through a flaky fake warehouse.
+
+  • "sync"  – each payload is written inline (what the handler does without
+              async mode)
+  • "spool" – each payload is appended to the SQLite spool; the flusher
+              delivers coalesced batches, failing --fail-rate of deliveries
+              to exercise retry/backoff
+
+Then checks that one receipt the warehouse always rejects ends up 'failed'
+on its own while every receipt coalesced with it is delivered.
+
+Usage (from backend/sync-stream):
+    python bench/bench_spool.py --payloads 200 --rows 5 --fail-rate 0.3
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench.fake_snowflake import FakeConnector  # noqa: E402
+from ingest import write_batch  # noqa: E402
+from spool import Spool, SpoolFlusher  # noqa: E402
+
+
+def _payload(rows: int) -> dict:
+    return {
+        "scanned_items": [
+            {"pid": "30231908", "sn": f"SN{random.getrandbits(40)}", "name": "BFGRD LEAN 454YF",
+             "best_before_date": 1778000000000, "net_kg": 1.4, "count": 6}
+            for _ in range(rows)
+        ],
+        "sales_floor": [{"pid": "30231908", "name": "BFGRD LEAN 454YF", "count": 3}],
+    }
+
+
+def _ms(samples: list[float]) -> str:
+    ms = sorted(s * 1000 for s in samples)
+    return f"p50={statistics.median(ms):.2f}ms p99={ms[int(len(ms) * 0.99) - 1]:.2f}ms"
+
+
+def _check_poison(rows: int) -> None:
+    """One always-rejected receipt must not take its batch down with it."""
+    def deliver(entries):
+        if any(e.payload.get("poison") for e in entries):
+            raise ValueError("Numeric value 'X' is not recognized")
+        return {e.id: {"status": "success"} for e in entries}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        spool = Spool(os.path.join(tmp, "spool.db"))
+        receipts = [spool.enqueue(_payload(rows)) for _ in range(9)]
+        bad = spool.enqueue({**_payload(rows), "poison": True})
+        receipts += [spool.enqueue(_payload(rows)) for _ in range(10)]
+        flusher = SpoolFlusher(spool, deliver, max_attempts=3, backoff_base_s=0, backoff_max_s=0)
+        while spool.pending_count():
+            flusher.flush_once()
+        assert spool.status(bad)["status"] == 'failed', spool.status(bad)
+        stuck = [r for r in receipts if spool.status(r)["status"] != 'done']
+        assert not stuck, f"{len(stuck)} healthy receipts not delivered"
+    print(f"spool  poison receipt failed alone; {len(receipts)} coalesced receipts delivered")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--payloads", type=int, default=200)
+    ap.add_argument("--rows", type=int, default=5)
+    ap.add_argument("--roundtrip-ms", type=float, default=40.0)
+    ap.add_argument("--fail-rate", type=float, default=0.3)
+    args = ap.parse_args()
+    logging.disable(logging.WARNING)
+
+    connector = FakeConnector(connect_s=0, roundtrip_s=args.roundtrip_ms / 1000)
+    cur = connector.connect().cursor()
+    payloads = [_payload(args.rows) for _ in range(args.payloads)]
+
+    sync = []
+    for p in payloads:
+        t0 = time.perf_counter()
+        write_batch(cur, p["scanned_items"], p["sales_floor"])
+        sync.append(time.perf_counter() - t0)
+    print(f"sync   accept latency: {_ms(sync)}  round trips={connector.stats.roundtrips}")
+
+    delivered_rows = 0
+    failures = 0
+
+    def deliver(entries):
+        nonlocal delivered_rows, failures
+        if random.random() < args.fail_rate:
+            failures += 1
+            raise ConnectionError("warehouse resuming")
+        scanned = [r for e in entries for r in e.payload["scanned_items"]]
+        write_batch(cur, scanned, [r for e in entries for r in e.payload["sales_floor"]])
+        delivered_rows += len(scanned)
+        return {e.id: {"status": "success"} for e in entries}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        spool = Spool(os.path.join(tmp, "spool.db"))
+        flusher = SpoolFlusher(spool, deliver, interval_s=0.05, backoff_base_s=0.05, backoff_max_s=0.5)
+        trips_before = connector.stats.roundtrips
+        accept = []
+        t_start = time.perf_counter()
+        flusher.start()
+        for p in payloads:
+            t0 = time.perf_counter()
+            spool.enqueue(p)
+            flusher.notify()
+            accept.append(time.perf_counter() - t0)
+        while spool.pending_count():
+            time.sleep(0.01)
+        drained = time.perf_counter() - t_start
+        flusher.stop()
+
+    print(f"spool  accept latency: {_ms(accept)}  round trips={connector.stats.roundtrips - trips_before}")
+    print(f"spool  drained {delivered_rows} rows in {drained:.2f}s with {failures} failed deliveries retried")
+    _check_poison(args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Peak RSS for a very large sync body: buffered parse (json.load + write_batch)
+vs. streaming parse (streaming.write_stream), against the fake connector.
+
+Each mode runs in its own subprocess so ru_maxrss reflects only that mode.
+With --max-rss-mb the run exits non-zero if the streaming path exceeds the
+budget, so it can gate CI.
+
+Usage (from backend/sync-stream):
+    python bench/bench_stream.py --rows 500000 --max-rss-mb 150
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _write_body(path: str, rows: int) -> None:
+    """Write the payload row by row so generating it doesn't skew the parent's RSS."""
+    with open(path, "w") as f:
+        f.write('{"scanned_items": [')
+        for i in range(rows):
+            if i:
+                f.write(",")
+            json.dump({
+                "pid": str(30000000 + i % 85), "sn": f"SN{i:09d}", "name": "BFGRD LEAN 454YF",
+                "best_before_date": 1778000000000, "packed_on_date": 1777000000000,
+                "net_kg": 2.35, "count": 6,
+            }, f)
+        f.write('], "sales_floor": [')
+        for i in range(85):
+            if i:
+                f.write(",")
+            json.dump({"pid": str(30000000 + i), "name": "BFGRD LEAN 454YF", "count": 4,
+                       "weight": 9.4, "expiry_date": 1778000000000}, f)
+        f.write("]}")
+
+
+def _child(mode: str, path: str) -> None:
+    from bench.fake_snowflake import FakeConnector
+    cur = FakeConnector(connect_s=0, roundtrip_s=0).connect().cursor()
+
+    t0 = time.perf_counter()
+    if mode == "buffered":
+        from ingest import write_batch
+        with open(path, "rb") as f:
+            data = json.load(f)
+        result = write_batch(cur, data["scanned_items"], data["sales_floor"])
+    else:
+        from streaming import write_stream
+        with open(path, "rb") as f:
+            result = write_stream(cur, f)
+    elapsed = time.perf_counter() - t0
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        "mode": mode,
+        "rows": result["scanned_items_written"],
+        "seconds": round(elapsed, 2),
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+    }))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=500_000)
+    ap.add_argument("--max-rss-mb", type=float, default=None)
+    ap.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        _child(*args.child)
+        return
+
+    import logging
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "body.json")
+        _write_body(path, args.rows)
+        print(f"body: {args.rows:,} rows, {os.path.getsize(path) / 1e6:.1f} MB")
+
+        results = {}
+        for mode in ("buffered", "streaming"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", mode, path],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            results[mode] = json.loads(out.strip().splitlines()[-1])
+            print(out.strip().splitlines()[-1])
+
+    if args.max_rss_mb is not None and results["streaming"]["peak_rss_mb"] > args.max_rss_mb:
+        print(f"FAIL: streaming peak RSS above {args.max_rss_mb} MB")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
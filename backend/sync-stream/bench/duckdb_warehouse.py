@@ -0,0 +1,69 @@
+"""
+DuckDB stand-in for a Snowflake connection, for SQL that needs MERGE,
+FULL OUTER JOIN or real aggregation speed (rollup.py, ingest's MERGE).
+Like sqlite_warehouse.py it really stores rows: `%s` binds are rewritten to
+`?`, and BEGIN / COMMIT / ROLLBACK run as DuckDB transactions.
+
+`create_base_tables()` makes SCANNED_ITEMS / SALES_FLOOR with the columns
+ingest.py writes.
+"""
+import duckdb
+
+BASE_TABLES_DDL = (
+    """CREATE TABLE IF NOT EXISTS SCANNED_ITEMS (
+        PID VARCHAR, SN VARCHAR, NAME VARCHAR, BEST_BEFORE_DATE TIMESTAMP,
+        PACKED_ON_DATE TIMESTAMP, NET_KG DOUBLE, ITEM_COUNT BIGINT)""",
+    """CREATE TABLE IF NOT EXISTS SALES_FLOOR (
+        PID VARCHAR PRIMARY KEY, NAME VARCHAR, CURRENT_COUNT BIGINT, TOTAL_WEIGHT DOUBLE,
+        LATEST_EXPIRY TIMESTAMP, UPDATED_AT TIMESTAMP)""",
+)
+
+
+class DuckdbCursor:
+    def __init__(self, conn: duckdb.DuckDBPyConnection):
+        self._cur = conn.cursor()
+        self.statements = 0
+
+    def execute(self, sql: str, params=()):
+        self.statements += 1
+        self._cur.execute(sql.replace('%s', '?'), list(params) or None)
+        return self
+
+    def executemany(self, sql: str, seq):
+        self.statements += 1
+        self._cur.executemany(sql.replace('%s', '?'), [list(p) for p in seq])
+        return self
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    def close(self) -> None:
+        self._cur.close()
+
+
+class DuckdbWarehouse:
+    """`connect()`-compatible: every connection opens the same database."""
+
+    def __init__(self, path: str = ':memory:'):
+        self._db = duckdb.connect(path)
+
+    def connect(self, **_kwargs) -> 'DuckdbConnection':
+        return DuckdbConnection(self._db)
+
+    def create_base_tables(self) -> None:
+        for ddl in BASE_TABLES_DDL:
+            self._db.execute(ddl)
+
+
+class DuckdbConnection:
+    def __init__(self, db: duckdb.DuckDBPyConnection):
+        self._db = db
+
+    def cursor(self) -> DuckdbCursor:
+        return DuckdbCursor(self._db)
+
+    def close(self) -> None:
+        pass
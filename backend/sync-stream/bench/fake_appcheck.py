@@ -0,0 +1,37 @@
+"""
+Local stand-in for `firebase_admin.app_check.verify_token` used by the
+benchmarks. Tokens are opaque strings issued by the stub; verification sleeps
+`verify_s` (signature check + claims validation, or a JWKS fetch when the
+SDK's key cache is cold) and raises ValueError — as the SDK does — for
+unknown or expired tokens.
+"""
+import secrets
+import threading
+import time
+
+
+class StubVerifier:
+    def __init__(self, verify_s: float = 0.004, app_id: str = "1:000000000000:android:bench"):
+        self.verify_s = verify_s
+        self.app_id = app_id
+        self.calls = 0
+        self._tokens: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def issue(self, ttl_s: float = 3600.0) -> str:
+        """A new valid token expiring in *ttl_s* seconds."""
+        token = secrets.token_urlsafe(48)
+        with self._lock:
+            self._tokens[token] = time.time() + ttl_s
+        return token
+
+    def verify_token(self, token: str) -> dict:
+        with self._lock:
+            self.calls += 1
+            exp = self._tokens.get(token)
+        time.sleep(self.verify_s)
+        if exp is None:
+            raise ValueError("Token signature could not be verified.")
+        if exp <= time.time():
+            raise ValueError("Token has expired.")
+        return {"sub": self.app_id, "aud": ["projects/bench"], "iat": int(exp - 3600), "exp": int(exp)}
@@ -0,0 +1,178 @@
+"""
+Local stand-in for `snowflake.connector` used by the benchmarks.
+
+Nothing talks to a real warehouse. Latency is simulated with sleeps so the
+shape of the cost (handshake vs. round trip vs. per-row work) matches what we
+see from a GCP region talking to Snowflake:
+
+  connect_s    – TLS + auth + session creation, paid once per connection
+  roundtrip_s  – one network round trip per execute()/executemany()
+  per_row_s    – server-side work per bound row
+  upload_mb_s  – PUT upload time per MB of (uncompressed) file
+  stage_row_s  – COPY INTO work per staged row (columnar load, much cheaper
+                 than binding)
+  max_concurrency – statements the warehouse runs at once; the rest queue
+                 (Snowflake's MAX_CONCURRENCY_LEVEL, default 8). None = no limit
+"""
+import os
+import re
+import threading
+import time
+
+
+class FakeStats:
+    def __init__(self, max_concurrency: int | None = None):
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self.connects = 0
+        self.roundtrips = 0
+        self.rows = 0
+        self.staged_rows = 0
+        self.statements: list[str] = []
+        self.ledger: dict[str, str] = {}
+        self.sales_floor: dict[str, tuple] = {}   # PID → (PID, NAME, COUNT, WEIGHT, EXPIRY)
+
+    def record(self, sql: str, rows: int) -> None:
+        with self.lock:
+            self.roundtrips += 1
+            self.rows += rows
+            self.statements.append(" ".join(sql.split())[:80])
+
+    def answer(self, sql: str, params) -> list[tuple]:
+        """Result rows for the few queries the function reads back."""
+        flat = " ".join(sql.split())
+        params = params or ()      # execute(sql) without binds, as in bench_pool.py
+        if flat == "SELECT 1":
+            return [(1,)]
+        if flat.startswith("INSERT INTO SYNC_LEDGER"):
+            with self.lock:
+                for i in range(0, len(params), 2):
+                    self.ledger[params[i]] = params[i + 1]
+        elif flat.startswith("SELECT RESULT FROM SYNC_LEDGER"):
+            with self.lock:
+                value = self.ledger.get(params[0])
+            return [] if value is None else [(value,)]
+        elif flat.startswith("SELECT IDEMPOTENCY_KEY, RESULT FROM SYNC_LEDGER"):
+            with self.lock:
+                return [(k, self.ledger[k]) for k in params if k in self.ledger]
+        elif flat.startswith("MERGE INTO SALES_FLOOR"):
+            with self.lock:
+                for i in range(0, len(params), 5):
+                    self.sales_floor[str(params[i])] = tuple(params[i:i + 5])
+        elif flat.startswith("SELECT PID, NAME, CURRENT_COUNT, TOTAL_WEIGHT, LATEST_EXPIRY FROM SALES_FLOOR"):
+            with self.lock:
+                return [self.sales_floor[k] for k in params if k in self.sales_floor]
+        return []
+
+    def record_staged(self, rows: int) -> None:
+        with self.lock:
+            self.staged_rows += rows
+
+
+class FakeCursor:
+    def __init__(self, conn: "FakeConnection"):
+        self._conn = conn
+        self._rows: list[tuple] = []
+
+    def _roundtrip(self, sql: str, rows: int) -> None:
+        if self._conn.closed:
+            raise OperationalError("Connection is closed")
+        if self._conn.expired:
+            raise OperationalError("Session no longer exists", errno=390111)
+        slots = self._conn.stats.slots
+        if slots is None:
+            time.sleep(self._conn.roundtrip_s + rows * self._conn.per_row_s)
+        else:
+            with slots:
+                time.sleep(self._conn.roundtrip_s + rows * self._conn.per_row_s)
+        self._conn.stats.record(sql, rows)
+
+    def execute(self, sql: str, params=None):
+        verb = sql.lstrip().split(None, 1)[0].upper()
+        if verb == "PUT":
+            path = re.search(r"file://([^']+)", sql).group(1)
+            with open(path, "rb") as f:
+                self._conn.staged_rows = sum(1 for _ in f)
+            time.sleep(os.path.getsize(path) / 1e6 * self._conn.upload_mb_s)
+            self._roundtrip(sql, 0)
+        elif verb == "COPY":
+            time.sleep(self._conn.staged_rows * self._conn.stage_row_s)
+            self._roundtrip(sql, 0)
+            self._conn.stats.record_staged(self._conn.staged_rows)
+        else:
+            # A multi-row VALUES list binds one "(%s, ...)" group per row.
+            self._roundtrip(sql, max(1, sql.count("(%s")))
+        self._rows = self._conn.stats.answer(sql, params)
+        return self
+
+    def executemany(self, sql: str, seq):
+        seq = list(seq)
+        self._roundtrip(sql, len(seq))
+        return self
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def close(self) -> None:
+        pass
+
+
+class OperationalError(Exception):
+    """Same name as snowflake.connector.errors.OperationalError."""
+
+    def __init__(self, msg: str, errno: int | None = None):
+        super().__init__(msg)
+        self.errno = errno
+
+
+class FakeConnection:
+    def __init__(
+        self, stats: FakeStats, connect_s: float, roundtrip_s: float, per_row_s: float,
+        upload_mb_s: float, stage_row_s: float,
+    ):
+        self.stats = stats
+        self.connect_s = connect_s
+        self.roundtrip_s = roundtrip_s
+        self.per_row_s = per_row_s
+        self.upload_mb_s = upload_mb_s
+        self.stage_row_s = stage_row_s
+        self.staged_rows = 0
+        self.closed = False
+        self.expired = False
+        time.sleep(connect_s)
+        with stats.lock:
+            stats.connects += 1
+
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(self)
+
+    def is_closed(self) -> bool:
+        return self.closed
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeConnector:
+    """Drop-in for the `snowflake.connector` module: exposes `connect(**kw)`."""
+
+    def __init__(
+        self, connect_s: float = 0.15, roundtrip_s: float = 0.01, per_row_s: float = 0.0,
+        upload_mb_s: float = 0.0, stage_row_s: float = 0.0, max_concurrency: int | None = None,
+    ):
+        self.stats = FakeStats(max_concurrency)
+        self.connect_s = connect_s
+        self.roundtrip_s = roundtrip_s
+        self.per_row_s = per_row_s
+        self.upload_mb_s = upload_mb_s
+        self.stage_row_s = stage_row_s
+
+    def connect(self, **_kwargs) -> FakeConnection:
+        return FakeConnection(
+            self.stats, self.connect_s, self.roundtrip_s, self.per_row_s,
+            self.upload_mb_s, self.stage_row_s,
+        )
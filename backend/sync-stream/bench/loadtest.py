@@ -0,0 +1,262 @@
+"""
+Load test for the sync function: synthetic payloads from the real catalog
+(bench/payloads.py), fired at a configurable batch size and concurrency.
+
+Two targets:
+  • in-process (default) – imports main.py and calls stream_to_snowflake
+    directly from --concurrency threads, against the fake warehouse
+    (bench/fake_snowflake.py, latencies set by --roundtrip-ms etc.). Each
+    batch size runs in a fresh interpreter so peak memory is its own.
+  • --url – POSTs to a deployed function (defaults to $GCP_FUNCTION_URL),
+    sending $APP_CHECK_TOKEN as the App Check header if set.
+
+Results go to stdout (or --output) as one JSON document — per batch size:
+p50/p95/p99 latency, requests/sec, rows/sec, status counts and peak RSS —
+plus the git revision and config, so runs can be diffed between versions.
+Any environment the function reads (COALESCE_WINDOW_MS, SYNC_ASYNC_MODE, …)
+is passed through to in-process runs.
+
+Usage (from backend/sync-stream):
+    python bench/loadtest.py --batch-sizes 1,50,500 --requests 400 --concurrency 16
+    python bench/loadtest.py --url https://…/stream_to_snowflake --batch-sizes 10 --requests 50
+"""
+import argparse
+import gzip
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_ROOT = os.path.dirname(_HERE)
+sys.path.insert(0, _ROOT)
+
+from bench.payloads import PayloadGenerator, load_catalog  # noqa: E402
+
+
+def _percentile(sorted_ms: list[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_ms:
+        return 0.0
+    return sorted_ms[max(0, min(len(sorted_ms) - 1, round(q / 100 * len(sorted_ms) + 0.5) - 1))]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+
+
+def _bodies(args, batch_size: int) -> list[tuple[bytes, int]]:
+    """`(encoded body, rows)` pairs, generated up front so they aren't timed."""
+    catalog = load_catalog()
+    gen = PayloadGenerator(catalog, seed=args.seed)
+    rows = batch_size + min(args.floor_rows, len(catalog))
+    bodies = []
+    for _ in range(min(args.distinct, args.requests)):
+        payload = gen.payload(batch_size, args.floor_rows, columnar=args.columnar)
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        if args.encoding == "gzip":
+            raw = gzip.compress(raw)
+        elif args.encoding == "zstd":
+            import zstandard
+            raw = zstandard.ZstdCompressor().compress(raw)
+        bodies.append((raw, rows))
+    return bodies
+
+
+def _headers(args, i: int) -> dict:
+    headers = {"Content-Type": "application/json"}
+    if args.encoding != "none":
+        headers["Content-Encoding"] = args.encoding
+    if args.idempotency:
+        headers["Idempotency-Key"] = f"loadtest-{os.getpid()}-{i}"
+    if os.environ.get("APP_CHECK_TOKEN"):
+        headers["X-Firebase-AppCheck"] = os.environ["APP_CHECK_TOKEN"]
+    return headers
+
+
+def _in_process_sender(args):
+    """`send(body, headers) -> status` calling stream_to_snowflake in this process."""
+    import snowflake.connector
+    from flask import Flask
+
+    from bench.fake_snowflake import FakeConnector
+    fake = FakeConnector(
+        connect_s=args.connect_ms / 1000, roundtrip_s=args.roundtrip_ms / 1000,
+        per_row_s=args.per_row_us / 1e6, max_concurrency=args.warehouse_concurrency or None,
+    )
+    snowflake.connector.connect = fake.connect
+    import main
+    app = Flask(__name__)
+
+    def send(body: bytes, headers: dict) -> int:
+        with app.test_request_context("/", method="POST", data=body, headers=headers):
+            from flask import request
+            response = main.stream_to_snowflake(request)
+        return response[1] if isinstance(response, tuple) else response.status_code
+
+    return send, fake
+
+
+def _url_sender(url: str, timeout_s: float):
+    def send(body: bytes, headers: dict) -> int:
+        req = urllib.request.Request(url, data=body, headers=headers, method="POST")
+        try:
+            with urllib.request.urlopen(req, timeout=timeout_s) as resp:
+                resp.read()
+                return resp.status
+        except urllib.error.HTTPError as e:
+            return e.code
+        except (urllib.error.URLError, TimeoutError):
+            return 0   # connection failure / timeout
+    return send
+
+
+def run_batch(args, batch_size: int) -> dict:
+    bodies = _bodies(args, batch_size)
+    fake = None
+    if args.url:
+        send = _url_sender(args.url, args.timeout_s)
+    else:
+        send, fake = _in_process_sender(args)
+    rss_before = _peak_rss_mb()
+
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    rows_ok = 0
+    lock = threading.Lock()
+
+    def one(i: int) -> None:
+        nonlocal rows_ok
+        body, rows = bodies[i % len(bodies)]
+        headers = _headers(args, i)
+        t0 = time.perf_counter()
+        status = send(body, headers)
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        with lock:
+            latencies.append(elapsed_ms)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if 200 <= status < 300:
+                rows_ok += rows
+
+    t_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(one, range(args.requests)))
+    wall = time.perf_counter() - t_start
+
+    ms = sorted(latencies)
+    ok = sum(n for code, n in statuses.items() if code.startswith("2"))
+    result = {
+        "batch_size": batch_size,
+        "floor_rows": args.floor_rows,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "ok": ok,
+        "errors": args.requests - ok,
+        "status_counts": statuses,
+        "wall_s": round(wall, 3),
+        "latency_ms": {
+            "p50": round(_percentile(ms, 50), 2),
+            "p95": round(_percentile(ms, 95), 2),
+            "p99": round(_percentile(ms, 99), 2),
+            "max": round(ms[-1], 2) if ms else 0.0,
+            "mean": round(sum(ms) / len(ms), 2) if ms else 0.0,
+        },
+        "requests_per_s": round(args.requests / wall, 1),
+        "rows_per_s": round(rows_ok / wall, 1),
+        "payload_bytes_mean": round(sum(len(b) for b, _ in bodies) / len(bodies)),
+    }
+    if fake is not None:
+        result["warehouse_round_trips"] = fake.stats.roundtrips
+        result["peak_rss_mb"] = round(_peak_rss_mb(), 1)
+        result["rss_before_load_mb"] = round(rss_before, 1)
+    return result
+
+
+def _git_revision() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_ROOT,
+                             capture_output=True, text=True, check=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--", "."], cwd=_ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return out.stdout.strip() + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _child_batch(args, batch_size: int, tmp: str) -> dict:
+    """Run one in-process batch size in a fresh interpreter."""
+    env = dict(
+        os.environ,
+        SNOWFLAKE_USER="loadtest", SNOWFLAKE_ACCOUNT="loadtest", SNOWFLAKE_PASS_SECRET="loadtest",
+        SPOOL_PATH=os.path.join(tmp, f"spool-{batch_size}.db"),
+        REQUEST_LOG=os.environ.get("REQUEST_LOG", "0"),
+    )
+    cmd = [sys.executable, __file__, *sys.argv[1:], "--child-batch", str(batch_size)]
+    out = subprocess.run(cmd, env=env, check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--batch-sizes", default="1,50,500", help="scanned_items rows per request, comma-separated")
+    ap.add_argument("--floor-rows", type=int, default=5, help="sales_floor rows per request")
+    ap.add_argument("--requests", type=int, default=400, help="requests per batch size")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--distinct", type=int, default=32, help="distinct payloads generated per batch size")
+    ap.add_argument("--columnar", action="store_true", help="send column-oriented tables")
+    ap.add_argument("--encoding", choices=("none", "gzip", "zstd"), default="none")
+    ap.add_argument("--idempotency", action="store_true", help="send a unique Idempotency-Key per request")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--url", default=None, help="target a deployed function instead of running in-process")
+    ap.add_argument("--live", action="store_true", help="shorthand for --url $GCP_FUNCTION_URL")
+    ap.add_argument("--timeout-s", type=float, default=60.0)
+    ap.add_argument("--connect-ms", type=float, default=150.0, help="fake warehouse: handshake")
+    ap.add_argument("--roundtrip-ms", type=float, default=10.0, help="fake warehouse: per statement")
+    ap.add_argument("--per-row-us", type=float, default=20.0, help="fake warehouse: per bound row")
+    ap.add_argument("--warehouse-concurrency", type=int, default=8, help="fake warehouse: 0 = unlimited")
+    ap.add_argument("--output", default=None, help="write the JSON report here instead of stdout")
+    ap.add_argument("--child-batch", type=int, default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.live and not args.url:
+        args.url = os.environ.get("GCP_FUNCTION_URL")
+        if not args.url:
+            ap.error("--live needs GCP_FUNCTION_URL set")
+
+    if args.child_batch is not None:
+        print(json.dumps(run_batch(args, args.child_batch)))
+        return
+
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",") if b.strip()]
+    if args.url:
+        results = [run_batch(args, b) for b in batch_sizes]
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            results = [_child_batch(args, b, tmp) for b in batch_sizes]
+
+    report = {
+        "harness": "sync-stream loadtest",
+        "revision": _git_revision(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "target": args.url or "in-process",
+        "config": {k: v for k, v in vars(args).items() if k not in ("child_batch", "output", "live")},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
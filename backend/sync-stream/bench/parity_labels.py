@@ -0,0 +1,247 @@
+"""
+Parity check: labels.py against the JS it ports (pipelineTest.mjs).
+
+The cases are pipelineTest.mjs's scenarios — its six products × S1–S5b, with
+barcodes and label lines built by the same bc() / lbl() helpers — plus edge
+cases for the parsing rules those scenarios don't reach (day-00 dates, month
+rollover, 310x decimals, lb weights, numeric and named-month dates, …).
+
+Expected results live in bench/labels_parity.json. --regenerate rebuilds it
+by running the JS functions, cut straight out of pipelineTest.mjs, under
+node with TZ=UTC; --node checks against node directly instead of the file.
+
+Usage (from backend/sync-stream):
+    python bench/parity_labels.py
+    python bench/parity_labels.py --regenerate
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from labels import extract_bb, extract_kg, extract_pid, extract_sn, parse_gs1, parse_label  # noqa: E402
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+GOLDEN = os.path.join(_HERE, "labels_parity.json")
+PIPELINE_TEST = os.path.join(_HERE, "..", "..", "..", "pipelineTest.mjs")
+
+# pipelineTest.mjs's PRODUCTS.
+PRODUCTS = [
+    {"pid": "31439394", "name": "PKSSG BR MAPLE 900ML", "type": "Pork", "gtin": "00081439394001"},
+    {"pid": "50772502", "name": "AA STRIPLOIN STEAK", "type": "Beef", "gtin": "00057720250021"},
+    {"pid": "30910241", "name": "BFGRD XLEAN C14YF", "type": "Beef", "gtin": "00030910241001"},
+    {"pid": "31180986", "name": "ML WHOLE WING", "type": "Maple Leaf Chicken", "gtin": "00031180986006"},
+    {"pid": "31396056", "name": "PRIME ORG WB", "type": "Organic Chicken", "gtin": "00031396056001"},
+    {"pid": "30148922", "name": "MINA HALAL CHN LG QT", "type": "Halal", "gtin": "00030148922001"},
+]
+_CHICKEN = {"Halal", "Organic Chicken", "Maple Leaf Chicken"}
+
+# The JS run() resolves a scan's fields like this once it knows the product.
+_JS_IMPORTS = "import { readFileSync } from 'node:fs';\n"
+_JS_DRIVER = r"""
+const cases = JSON.parse(readFileSync(0, 'utf8'));
+const RE = /\bPID[:\s]+(\d{7,8})\b|\b(\d{8})\b/i;
+const ocrPid = (lines) => { for (const l of lines) { const m = l.match(RE); if (m) return (m[1] || m[2]).trim(); } return null; };
+const out = cases.map(c => {
+    const g = parseGS1(c.barcode || '');
+    const sn = g.sn || extractSN(c.lines, c.type) || null;
+    const kg = g.weight != null ? g.weight : extractKg(c.lines);
+    let expiry = g.expiry || null;
+    if (!expiry) {
+        expiry = extractBB(c.lines, g.prodDate);
+        if (expiry && g.prodDate && expiry === g.prodDate && c.name) {
+            const n = c.name.toLowerCase();
+            if (n.includes('maple leaf') || n.includes('mina')) expiry += 11 * 86400000;
+        }
+    }
+    return {
+        gs1: { gtin: g.gtin ?? null, prod_date: g.prodDate ?? null, expiry: g.expiry ?? null,
+               sn: g.sn ?? null, weight: g.weight ?? null },
+        sn: extractSN(c.lines, c.type), kg: extractKg(c.lines), bb: extractBB(c.lines, g.prodDate),
+        pid: ocrPid(c.lines),
+        label: { pid: c.pid || ocrPid(c.lines), sn, net_kg: kg, expiry },
+    };
+});
+process.stdout.write(JSON.stringify(out));
+"""
+
+
+def _js_round(x: float) -> int:
+    return math.floor(x + 0.5)
+
+
+def bc(gtin=None, sn=None, weight=None, expiry=None, prod=None) -> str:
+    """pipelineTest.mjs's bc()."""
+    b = "]C1"
+    if gtin:
+        b += f"01{gtin}"
+    if prod:
+        b += f"11{prod}"
+    if expiry:
+        b += f"17{expiry}"
+    if weight is not None:
+        b += f"3102{_js_round(weight * 100):06d}"
+    if sn:
+        b += f"21{sn}\x1d"
+    return b
+
+
+def _js_number(x: float) -> str:
+    return str(int(x)) if x == int(x) else repr(x)
+
+
+def lbl(pid, sn=None, hu=None, weight=None, bb=None, prod=None) -> list[str]:
+    """pipelineTest.mjs's lbl()."""
+    lines = [f"PID: {pid}"]
+    if hu:
+        lines.append(f"HU {hu}")
+    if sn:
+        lines.append(f"S/N {sn}")
+    if weight is not None:
+        lines.append(f"Net {_js_number(weight)} kg")
+    if prod:
+        lines.append(f"PKD: {prod}")
+    if bb:
+        lines.append(f"Best Before: {bb}")
+    return lines
+
+
+def scenario_cases() -> list[dict]:
+    cases = []
+    for p in PRODUCTS:
+        chk = p["type"] in _CHICKEN
+        sn1 = "20260310" + p["pid"][-6:] if chk else p["pid"][-6:] + "000001"
+        sn2 = "20260311" + p["pid"][-6:] if chk else p["pid"][-6:] + "000002"
+        fake_pid = "99999" + p["pid"][-3:]
+        fake_gtin = "000999" + p["pid"][-8:]
+        base = {"type": p["type"], "name": p["name"]}
+        cases += [
+            {**base, "case": f"{p['pid']} S1", "pid": p["pid"],
+             "barcode": bc(p["gtin"], sn1, 1.36, None if chk else "260328", "260310"),
+             "lines": lbl(p["pid"], hu=sn1, weight=1.36, bb="28-MAR-2026", prod="10-MAR-2026") if chk else []},
+            {**base, "case": f"{p['pid']} S2",
+             "barcode": bc(p["gtin"], sn2, 0.9),
+             "lines": lbl(p["pid"], hu=sn2, weight=0.9, bb="22-MAR-2026") if chk
+             else lbl(p["pid"], sn=sn2, weight=0.9, bb="22-MAR-2026")},
+            {**base, "case": f"{p['pid']} S3", "pid": p["pid"],
+             "barcode": bc(p["gtin"], weight=1.1, expiry="260328"), "lines": []},
+            {**base, "case": f"{p['pid']} S4", "pid": p["pid"],
+             "barcode": bc(p["gtin"], sn1, 1.36, "260328"),
+             "lines": lbl(p["pid"], hu=sn1) if chk else []},
+            {**base, "case": f"{p['pid']} S5a", "barcode": bc(fake_gtin), "lines": [f"PID: {fake_pid}"]},
+            {**base, "case": f"{p['pid']} S5b", "name": f"NEW {p['name']}",
+             "barcode": bc(fake_gtin, sn1, 1.2, "260325"), "lines": [f"PID: {fake_pid}"]},
+        ]
+    return cases
+
+
+def edge_cases() -> list[dict]:
+    beef = {"type": "Beef", "name": "AA STRIPLOIN STEAK"}
+    halal = {"type": "Halal", "name": "MINA HALAL CHN LG QT"}
+    return [
+        {**beef, "case": "leading GS, day 00, 3103", "barcode": "\x1d0100012345678905172602003103001234",
+         "lines": []},
+        {**beef, "case": "3101 then serial at end", "barcode": "]C131010005671121ABC-123", "lines": []},
+        {**beef, "case": "non-310 weight AI skipped", "barcode": "]C1320200012301000123456789011726031",
+         "lines": []},
+        {**beef, "case": "serial capped at 20", "barcode": "]C121ABCDEFGHIJKLMNOPQRSTUVWXYZ", "lines": []},
+        {**beef, "case": "unknown AI stops", "barcode": "]C10100012345678905" + "10LOT42" + "17260328",
+         "lines": []},
+        {**beef, "case": "truncated", "barcode": "]C101000123", "lines": []},
+        {**beef, "case": "1999 and 1970", "barcode": "]C111991231" + "17700101", "lines": []},
+        {**beef, "case": "month 13, Feb 31", "barcode": "]C117261301" + "11260231", "lines": []},
+        {**beef, "case": "bad date digits", "barcode": "]C117AB0101", "lines": []},
+        {**beef, "case": "lb, y/m/d packed, d/m/yy use by",
+         "lines": ["PID:1234567", "Net 2.5 lb", "Packed 2026/03/10", "Use by 15/04/26"]},
+        {**beef, "case": "bare lb, named month expiry",
+         "lines": ["3 LB", "EXP 1-Sept-2026", "12 JUN 2026"]},
+        {**beef, "case": "rounding ties", "lines": ["1.005 kg", "31439394"]},
+        {**beef, "case": "double dot", "lines": ["Net 1.2.3 kg"]},
+        {**beef, "case": "bare dot", "lines": ["Net . kg"]},
+        {**beef, "case": "dates without expiry line",
+         "lines": ["01/02/2026 05/02/2026", "packed 03/02/2026"]},
+        {**beef, "case": "single date", "lines": ["made 01/02/26"]},
+        {**beef, "case": "no dates, packed from barcode", "barcode": "]C111260310", "lines": ["no dates"]},
+        {**beef, "case": "two expiry lines, last wins",
+         "lines": ["BB 20/03/2026", "Best before 10/03/2026"]},
+        {**beef, "case": "S/N labelled beats bare", "lines": ["123456789012", "s/n 210987654321"]},
+        {**halal, "case": "HU far from serial", "lines": ["20260310148922", "a", "b", "c", "HU",
+                                                         "20260311148922"]},
+        {**halal, "case": "mina packed only +11d", "barcode": "]C10100030148922001" + "11260310",
+         "lines": ["PKD: 10-MAR-2026"]},
+        {"type": None, "name": None, "case": "no product", "lines": ["PID 7654321"]},
+    ]
+
+
+def node_expected(cases: list[dict]) -> list[dict]:
+    with open(PIPELINE_TEST, encoding="utf-8") as f:
+        src = f.read()
+    start = src.index("// ─── GS1 Parser")
+    end = src.index("// ─── UI / HUD")
+    out = subprocess.run(
+        ["node", "--input-type=module", "-e", _JS_IMPORTS + src[start:end] + _JS_DRIVER],
+        input=json.dumps(cases),
+        env=dict(os.environ, TZ="UTC"), capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout)
+
+
+def _js_cases(cases: list[dict]) -> list[dict]:
+    return [{k: c.get(k) for k in ("barcode", "lines", "type", "name", "pid")} for c in cases]
+
+
+def actual(case: dict) -> dict:
+    lines = case["lines"]
+    g = parse_gs1(case.get("barcode") or "")
+    row = parse_label(lines, case.get("type"), case.get("name"), case.get("barcode"), case.get("pid"))
+    return {
+        "gs1": g._asdict(),
+        "sn": extract_sn(lines, case.get("type")),
+        "kg": extract_kg(lines),
+        "bb": extract_bb(lines, g.prod_date),
+        "pid": extract_pid(lines),
+        "label": {"pid": row.pid, "sn": row.sn, "net_kg": row.net_kg, "expiry": row.expiry},
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--regenerate", action="store_true", help=f"rewrite {os.path.basename(GOLDEN)} from node")
+    ap.add_argument("--node", action="store_true", help="compare against node directly")
+    args = ap.parse_args()
+
+    cases = scenario_cases() + edge_cases()
+    if args.regenerate or args.node:
+        expected = node_expected(_js_cases(cases))
+        if args.regenerate:
+            with open(GOLDEN, "w", encoding="utf-8") as f:
+                json.dump([{"case": c["case"], "input": i, "expected": e}
+                           for c, i, e in zip(cases, _js_cases(cases), expected)], f, indent=1)
+                f.write("\n")
+            print(f"wrote {len(cases)} cases to {GOLDEN}")
+    else:
+        with open(GOLDEN, encoding="utf-8") as f:
+            golden = json.load(f)
+        if [g["input"] for g in golden] != _js_cases(cases):
+            sys.exit(f"{GOLDEN} is out of date with the cases here; run with --regenerate")
+        expected = [g["expected"] for g in golden]
+
+    failures = 0
+    for case, want in zip(cases, expected):
+        got = actual(case)
+        if got != want:
+            failures += 1
+            print(f"MISMATCH {case['case']}:")
+            for key in want:
+                if got[key] != want[key]:
+                    print(f"  {key}: python={got[key]!r}  js={want[key]!r}")
+    print(f"{len(cases) - failures}/{len(cases)} cases match")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
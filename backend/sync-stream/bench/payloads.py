@@ -0,0 +1,106 @@
+"""
+Synthetic sync payloads built from the real product catalog.
+
+PIDs, names, pack sizes and shelf lives come from the defined_products
+INSERTs in vizcount-dashboard/snowflake_setup.sql, so generated rows look
+like what the app sends: a few fast movers account for most scans (Zipf-like
+weights), each scan has a fresh serial number, best-before dates follow the
+product's shelf life, and sales_floor carries one row per distinct PID.
+"""
+import os
+import random
+import re
+import time
+from dataclasses import dataclass
+
+CATALOG_SQL = os.path.join(
+    os.path.dirname(__file__), "..", "..", "..", "vizcount-dashboard", "snowflake_setup.sql",
+)
+
+_PRODUCT_RE = re.compile(
+    r"INSERT INTO defined_products \([^)]*\) VALUES \("
+    r"'((?:[^']|'')*)', '([^']*)', (?:NULL|'[^']*'), (\d+), '((?:[^']|'')*)', (NULL|\d+),"
+)
+
+_DAY_MS = 86_400_000
+_DEFAULT_SHELF_LIFE_DAYS = 10
+
+
+@dataclass(frozen=True)
+class Product:
+    name: str
+    pid: str
+    pack: int
+    type: str
+    shelf_life_days: int
+
+
+def load_catalog(path: str = CATALOG_SQL) -> list[Product]:
+    """Products from the defined_products INSERTs in *path*."""
+    with open(path, encoding="utf-8") as f:
+        sql = f.read()
+    products = [
+        Product(
+            name=name.replace("''", "'"), pid=pid, pack=int(pack), type=kind.replace("''", "'"),
+            shelf_life_days=_DEFAULT_SHELF_LIFE_DAYS if shelf == "NULL" else int(shelf),
+        )
+        for name, pid, pack, kind, shelf in _PRODUCT_RE.findall(sql)
+    ]
+    if not products:
+        raise ValueError(f"No defined_products rows found in {path}.")
+    return products
+
+
+class PayloadGenerator:
+    """Random but plausible scanned_items / sales_floor tables."""
+
+    def __init__(self, catalog: list[Product], seed: int | None = None, skew: float = 1.1):
+        self.catalog = catalog
+        self.rng = random.Random(seed)
+        self._weights = [1 / (rank + 1) ** skew for rank in range(len(catalog))]
+
+    def _product(self) -> Product:
+        return self.rng.choices(self.catalog, self._weights)[0]
+
+    def scanned_items(self, n: int) -> list[dict]:
+        now = int(time.time() * 1000)
+        rows = []
+        for _ in range(n):
+            p = self._product()
+            packed = now - self.rng.randrange(3) * _DAY_MS
+            rows.append({
+                "pid": p.pid,
+                "sn": f"SN{self.rng.getrandbits(48):012d}",
+                "name": p.name,
+                "best_before_date": packed + p.shelf_life_days * _DAY_MS,
+                "packed_on_date": packed,
+                "net_kg": round(self.rng.uniform(0.4, 1.6) * p.pack, 2),
+                "count": p.pack,
+            })
+        return rows
+
+    def sales_floor(self, n: int) -> list[dict]:
+        now = int(time.time() * 1000)
+        products = self.rng.sample(self.catalog, min(n, len(self.catalog)))
+        return [
+            {
+                "pid": p.pid,
+                "name": p.name,
+                "count": self.rng.randrange(0, 4 * p.pack),
+                "weight": round(self.rng.uniform(0.5, 40), 2),
+                "expiry_date": now + self.rng.randrange(1, p.shelf_life_days + 1) * _DAY_MS,
+            }
+            for p in products
+        ]
+
+    def payload(self, scanned_rows: int, floor_rows: int, columnar: bool = False) -> dict:
+        """A request body; *columnar* sends both tables column-oriented."""
+        scanned, floor = self.scanned_items(scanned_rows), self.sales_floor(floor_rows)
+        if columnar:
+            return {"scanned_items": _columnar(scanned), "sales_floor": _columnar(floor)}
+        return {"scanned_items": scanned, "sales_floor": floor}
+
+
+def _columnar(rows: list[dict]) -> dict:
+    names = list(rows[0]) if rows else []
+    return {"rows": len(rows), "columns": {n: [r.get(n) for r in rows] for n in names}}
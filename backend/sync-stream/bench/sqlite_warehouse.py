@@ -0,0 +1,59 @@
+"""
+SQLite stand-in for a Snowflake connection, for code whose SQL is portable
+(delta_sync.py). Unlike fake_snowflake.py it really stores and returns rows:
+`%s` binds are rewritten to `?`, and BEGIN / COMMIT / ROLLBACK are passed
+through as explicit transactions.
+"""
+import sqlite3
+
+
+class SqliteCursor:
+    def __init__(self, conn: sqlite3.Connection):
+        self._cur = conn.cursor()
+        self.statements = 0
+
+    def execute(self, sql: str, params=()):
+        self.statements += 1
+        self._cur.execute(sql.replace('%s', '?'), params)
+        return self
+
+    def executemany(self, sql: str, seq):
+        self.statements += 1
+        self._cur.executemany(sql.replace('%s', '?'), seq)
+        return self
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    def close(self) -> None:
+        self._cur.close()
+
+
+class SqliteWarehouse:
+    """`connect()`-compatible: every connection opens the same database file."""
+
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        self._memory = sqlite3.connect(path, isolation_level=None, check_same_thread=False) \
+            if path == ':memory:' else None
+
+    def connect(self, **_kwargs) -> 'SqliteConnection':
+        if self._memory is not None:
+            return SqliteConnection(self._memory, shared=True)
+        return SqliteConnection(sqlite3.connect(self.path, isolation_level=None), shared=False)
+
+
+class SqliteConnection:
+    def __init__(self, conn: sqlite3.Connection, shared: bool):
+        self._conn = conn
+        self._shared = shared
+
+    def cursor(self) -> SqliteCursor:
+        return SqliteCursor(self._conn)
+
+    def close(self) -> None:
+        if not self._shared:
+            self._conn.close()
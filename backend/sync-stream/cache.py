@@ -0,0 +1,65 @@
+"""
+Small in-process cache shared by the sync-stream modules.
+
+Cloud Functions instances are long-lived between requests, so module-level
+caches survive across invocations on a warm instance. Everything here is
+thread-safe because the function may run with concurrency > 1.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after a TTL.
+
+    `ttl_s` is the default lifetime; `set(..., ttl_s=...)` overrides it per
+    entry (e.g. to expire at a token's own `exp`). Once `max_size` is reached
+    the least-recently-used entry is evicted.
+    """
+
+    def __init__(self, max_size: int, ttl_s: float):
+        self._max_size = max_size
+        self._ttl_s = ttl_s
+        self._lock = threading.Lock()
+        # key → (expires_at, value)
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_s: Optional[float] = None) -> None:
+        ttl_s = self._ttl_s if ttl_s is None else ttl_s
+        if ttl_s <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl_s, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
@@ -0,0 +1,71 @@
+"""
+Cross-request micro-batching for the sync function.
+
+During a shift many devices send tiny payloads (1–5 rows). Written one by one
+each pays its own INSERT + MERGE round trips. The coalescer holds the rows of
+concurrent requests for a short window (COALESCE_WINDOW_MS) or until
+COALESCE_MAX_ROWS have accumulated, writes them as one batch — one
+executemany + one set-based MERGE — and hands each waiting caller its own
+result.
+
+Leader/follower: the first request to arrive opens a batch and waits out the
+window; requests arriving meanwhile join it and block until the leader has
+written it. A failed write raises in every caller of that batch.
+"""
+import threading
+from typing import Callable, Optional
+
+from ingest import WriteGroup
+
+
+class _Batch:
+    def __init__(self):
+        self.groups: list[WriteGroup] = []
+        self.rows = 0
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results: list[dict] = []
+        self.error: Optional[BaseException] = None
+
+
+class Coalescer:
+    """`write(groups)` must write every group and return one result per group."""
+
+    def __init__(self, write: Callable[[list[WriteGroup]], list[dict]], window_s: float, max_rows: int):
+        self._write = write
+        self._window_s = window_s
+        self._max_rows = max_rows
+        self._lock = threading.Lock()
+        self._open: Optional[_Batch] = None
+
+    def submit(self, group: WriteGroup) -> tuple[dict, int]:
+        """Block until *group* has been written; returns (its result, batch size)."""
+        with self._lock:
+            batch = self._open
+            leader = batch is None
+            if leader:
+                batch = self._open = _Batch()
+            index = len(batch.groups)
+            batch.groups.append(group)
+            batch.rows += len(group.scanned_items) + len(group.sales_floor)
+            if batch.rows >= self._max_rows:
+                self._open = None   # close it — later arrivals start a new batch
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self._window_s)
+            with self._lock:
+                if self._open is batch:
+                    self._open = None
+            try:
+                batch.results = self._write(batch.groups)
+            except BaseException as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index], len(batch.groups)
@@ -0,0 +1,81 @@
+"""
+Column-oriented sync tables.
+
+The row format repeats every key on every row:
+
+    "scanned_items": [{"pid": 101, "sn": 5001, "name": "...", ...}, ...]
+
+The columnar format sends one array per field plus a row count:
+
+    "scanned_items": {"rows": 2, "columns": {"pid": [101, 101], "sn": [5001, 5002], ...}}
+
+Either table of a payload may use either format. A column left out of a
+columnar table reads as all-null, so optional fields cost nothing when unset.
+
+On the direct write path columnar tables stay as column lists: ingest.py
+converts them a column at a time and zips the columns into insert tuples,
+without building a dict per row.
+"""
+from typing import Any, Iterator
+
+
+class ColumnarTable:
+    """`rows` rows stored as one list per field."""
+
+    __slots__ = ('rows', 'columns')
+
+    def __init__(self, rows: int, columns: dict[str, list]):
+        self.rows = rows
+        self.columns = columns
+
+    @classmethod
+    def from_json(cls, obj: dict) -> "ColumnarTable":
+        """Check a decoded `{"rows": n, "columns": {...}}` object; ValueError if malformed."""
+        rows = obj.get('rows')
+        columns = obj.get('columns')
+        if not isinstance(rows, int) or isinstance(rows, bool) or rows < 0:
+            raise ValueError("'rows' must be a non-negative integer.")
+        if not isinstance(columns, dict):
+            raise ValueError("'columns' must be an object of arrays.")
+        for name, values in columns.items():
+            if not isinstance(values, list):
+                raise ValueError(f"column '{name}' must be an array.")
+            if len(values) != rows:
+                raise ValueError(f"column '{name}' has {len(values)} values, expected {rows}.")
+        return cls(rows, columns)
+
+    def to_json(self) -> dict:
+        return {"rows": self.rows, "columns": self.columns}
+
+    def column(self, name: str) -> list:
+        values = self.columns.get(name)
+        return values if values is not None else [None] * self.rows
+
+    def slice(self, start: int, stop: int) -> "ColumnarTable":
+        stop = min(stop, self.rows)
+        return ColumnarTable(
+            max(0, stop - start), {k: v[start:stop] for k, v in self.columns.items()},
+        )
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        """Row dicts, for the code paths that mix several callers' rows."""
+        names = list(self.columns)
+        for values in zip(*(self.columns[n] for n in names)):
+            yield dict(zip(names, values))
+
+
+def table_from_json(value: Any) -> list | ColumnarTable:
+    """A payload table in either format → row list or ColumnarTable (ValueError if neither)."""
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        return ColumnarTable.from_json(value)
+    raise ValueError("must be a list of rows or a columnar table.")
+
+
+def table_to_json(rows: list | ColumnarTable) -> list | dict:
+    """Inverse of table_from_json, for re-serialising a payload (the spool)."""
+    return rows.to_json() if isinstance(rows, ColumnarTable) else rows
@@ -0,0 +1,101 @@
+"""
+Compressed request bodies — `Content-Encoding: gzip` or `zstd`.
+
+Cooler dumps are repetitive JSON and compress several-fold, which matters on
+store Wi-Fi. Bodies are decompressed as a stream, and the streaming-vs-
+buffered decision (see streaming.py) is made on the *decoded* size: up to
+STREAM_PARSE_MIN_BYTES of decoded body is read into memory; if the body is
+longer than that, the part already read is chained in front of the rest of
+the decompressor and handed to the streaming parser. A small compressed body
+therefore can't expand into an unbounded in-memory buffer.
+"""
+import gzip
+import zlib
+from typing import IO, Optional
+
+import zstandard
+
+from ingest import PayloadError
+
+SUPPORTED_ENCODINGS = ('gzip', 'zstd')
+_READ_SIZE = 1 << 16
+
+
+class UnsupportedEncoding(ValueError):
+    """The request uses a Content-Encoding this function cannot decode."""
+
+
+class _DecodingReader:
+    """File-like view of the decompressed body; corrupt input → PayloadError."""
+
+    def __init__(self, raw: IO[bytes], encoding: str):
+        self._encoding = encoding
+        if encoding == 'zstd':
+            self._reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+        else:
+            self._reader = gzip.GzipFile(fileobj=raw, mode='rb')
+
+    def read(self, size: int = -1) -> bytes:
+        try:
+            return self._reader.read(size)
+        except (OSError, EOFError, zlib.error, zstandard.ZstdError) as e:
+            raise PayloadError(f"Request body is not valid {self._encoding} data: {e}") from e
+
+
+class _Prefixed:
+    """`prefix` followed by whatever is left in `rest`."""
+
+    def __init__(self, prefix: bytes, rest):
+        self._prefix = memoryview(prefix)
+        self._rest = rest
+
+    def read(self, size: int = -1) -> bytes:
+        if not self._prefix:
+            return self._rest.read(size)
+        if size is None or size < 0:
+            out = bytes(self._prefix) + self._rest.read()
+            self._prefix = memoryview(b'')
+            return out
+        out = bytes(self._prefix[:size])
+        self._prefix = self._prefix[size:]
+        return out
+
+
+def _encoding(content_encoding: Optional[str]) -> Optional[str]:
+    enc = (content_encoding or '').strip().lower()
+    if enc in ('', 'identity'):
+        return None
+    if enc == 'x-gzip':
+        return 'gzip'
+    if enc not in SUPPORTED_ENCODINGS:
+        raise UnsupportedEncoding(
+            f"Unsupported Content-Encoding '{content_encoding}' "
+            f"(supported: {', '.join(SUPPORTED_ENCODINGS)})."
+        )
+    return enc
+
+
+def is_encoded(content_encoding: Optional[str]) -> bool:
+    """True if the body needs decompressing (UnsupportedEncoding if it can't be)."""
+    return _encoding(content_encoding) is not None
+
+
+def open_encoded_body(
+    raw: IO[bytes], content_encoding: str, buffer_limit: int,
+) -> tuple[Optional[bytes], Optional[IO[bytes]]]:
+    """Decode a compressed body.
+
+    Returns `(body, None)` if the decoded body is under *buffer_limit* bytes,
+    otherwise `(None, stream)` with a reader over the whole decoded body for
+    the streaming parser.
+    """
+    reader = _DecodingReader(raw, _encoding(content_encoding))
+    parts: list[bytes] = []
+    size = 0
+    while size < buffer_limit:
+        chunk = reader.read(_READ_SIZE)
+        if not chunk:
+            return b''.join(parts), None
+        parts.append(chunk)
+        size += len(chunk)
+    return None, _Prefixed(b''.join(parts), reader)
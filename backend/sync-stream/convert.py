@@ -0,0 +1,192 @@
+"""
+Bulk conversion and validation of sync payload tables.
+
+Turns a payload table (row dicts or a ColumnarTable) into the tuples the
+SCANNED_ITEMS INSERT / SALES_FLOOR MERGE statements bind, one column at a
+time with NumPy instead of field by field per row:
+
+  • Unix-ms date columns become datetimes in one vectorised cast
+    (0 and null both mean "not set", as WatermelonDB stores them)
+  • required fields must be present, ids must be integers or strings, names
+    strings, numeric fields numbers, dates within the datetime range
+
+A row that fails any check is dropped and reported — by its index in the
+table as sent — instead of failing the whole batch; the rest are written.
+"""
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+
+import telemetry
+from columnar import ColumnarTable
+
+# Cap on rejected rows listed in a response (all are counted).
+MAX_REPORTED_REJECTS = int(os.environ.get('MAX_REPORTED_REJECTS', '100'))
+
+# Field kinds:
+#   id     – int or non-empty str (PID, SN)
+#   text   – str
+#   number – int/float, bound as sent
+#   ms     – Unix milliseconds → datetime (TIMESTAMP_NTZ)
+SCANNED_ITEMS_FIELDS = (
+    ('pid', 'id', True),
+    ('sn', 'id', True),
+    ('name', 'text', True),
+    ('best_before_date', 'ms', False),
+    ('packed_on_date', 'ms', False),
+    ('net_kg', 'number', False),
+    ('count', 'number', False),
+)
+SALES_FLOOR_FIELDS = (
+    ('pid', 'id', True),
+    ('name', 'text', True),
+    ('count', 'number', False),
+    ('weight', 'number', False),
+    ('expiry_date', 'ms', False),
+)
+
+# datetime.min / datetime.max in Unix ms.
+_MIN_MS = -62_135_596_800_000
+_MAX_MS = 253_402_300_799_999
+
+
+@dataclass
+class Converted:
+    """Bindable tuples for the good rows, plus `(index, reason)` for the rest."""
+    rows: list[tuple]
+    rejected: list[tuple[int, str]] = field(default_factory=list)
+
+    def report(self, table: str, offset: int = 0) -> list[dict]:
+        return [
+            {"table": table, "index": offset + i, "error": reason}
+            for i, reason in self.rejected[:MAX_REPORTED_REJECTS]
+        ]
+
+
+_ALLOWED_TYPES = {'id': {int, str}, 'text': {str}}
+
+
+def _type_mask(values: np.ndarray, allowed: set[type]) -> np.ndarray:
+    """True where the value's type is in *allowed* (nulls count as allowed).
+
+    Checks the column's set of types first — C-speed — and only walks it
+    element by element when something unexpected is in there.
+    """
+    kinds = set(map(type, values)) - {type(None)}
+    if kinds <= allowed:
+        return np.ones(len(values), dtype=bool)
+    return np.fromiter((v is None or type(v) in allowed for v in values), dtype=bool, count=len(values))
+
+
+def _object_array(values: list) -> np.ndarray:
+    out = np.empty(len(values), dtype=object)
+    try:
+        out[:] = values
+    except ValueError:
+        # Nested lists in the column — fromiter keeps each one as a single
+        # element instead of broadcasting it into an extra dimension.
+        out = np.fromiter(values, dtype=object, count=len(values))
+    return out
+
+
+def _as_float(values: np.ndarray, present: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Float64 view of an object column (NaN where null) and a mask of values
+    that are present but not finite numbers."""
+    try:
+        floats = values.astype(np.float64)
+    except (TypeError, ValueError):
+        # At least one value isn't numeric — fall back to finding which.
+        floats = np.full(len(values), np.nan)
+        for i in np.flatnonzero(present):
+            try:
+                floats[i] = float(values[i])
+            except (TypeError, ValueError, OverflowError):
+                pass
+    bad = present & ~np.isfinite(floats)
+    # bools (and numeric strings) cast cleanly but are not quantities.
+    bad |= ~_type_mask(values, {int, float})
+    return floats, bad
+
+
+def _ms_to_datetimes(values: np.ndarray, present: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Unix-ms column → object array of naive UTC datetimes (None where unset)."""
+    ms, bad = _as_float(values, present)
+    bad |= present & ~bad & ((ms < _MIN_MS) | (ms > _MAX_MS))
+    is_set = present & ~bad & (ms != 0)
+    out = np.full(len(values), None, dtype=object)
+    if is_set.any():
+        us = np.rint(ms[is_set] * 1000).astype(np.int64)
+        out[is_set] = us.astype('datetime64[us]').astype(object)
+    return out, bad
+
+
+def _columns(table: list[dict] | ColumnarTable, fields) -> tuple[int, dict[str, list], list[int]]:
+    """Column lists for *fields*, plus the indices of rows that aren't objects."""
+    if isinstance(table, ColumnarTable):
+        return table.rows, {name: table.column(name) for name, _, _ in fields}, []
+    not_objects = [i for i, row in enumerate(table) if not isinstance(row, dict)]
+    if not_objects:
+        skip = set(not_objects)
+        table = [{} if i in skip else row for i, row in enumerate(table)]
+    return len(table), {name: [row.get(name) for row in table] for name, _, _ in fields}, not_objects
+
+
+def convert_table(table: list[dict] | ColumnarTable, fields) -> Converted:
+    """Validate and convert *table* column-wise into tuples ordered like *fields*."""
+    with telemetry.span('validate'):
+        return _convert_table(table, fields)
+
+
+def _convert_table(table: list[dict] | ColumnarTable, fields) -> Converted:
+    n, columns, not_objects = _columns(table, fields)
+    if n == 0:
+        return Converted([])
+
+    bad = np.zeros(n, dtype=bool)
+    reasons: dict[int, str] = {}
+
+    def reject(mask: np.ndarray, reason: str) -> None:
+        for i in np.flatnonzero(mask & ~bad):
+            reasons[int(i)] = reason
+        bad[:] |= mask
+
+    if not_objects:
+        mask = np.zeros(n, dtype=bool)
+        mask[not_objects] = True
+        reject(mask, "row must be an object")
+
+    out = []
+    for name, kind, required in fields:
+        values = _object_array(columns[name])
+        present = np.not_equal(values, None)
+        if required:
+            reject(~present, f"missing {name}")
+        if kind in _ALLOWED_TYPES:
+            ok = _type_mask(values, _ALLOWED_TYPES[kind])
+            if kind == 'id':
+                ok &= values != ''
+            reject(~ok, f"{name} must be {'a non-empty integer or string' if kind == 'id' else 'a string'}")
+        elif kind == 'number':
+            _, wrong = _as_float(values, present)
+            reject(wrong, f"{name} must be a number")
+        else:
+            values, wrong = _ms_to_datetimes(values, present)
+            reject(wrong, f"{name} must be Unix milliseconds")
+        out.append(values)
+
+    if bad.any():
+        keep = ~bad
+        out = [col[keep] for col in out]
+    rows = list(zip(*(col.tolist() for col in out)))
+    return Converted(rows, sorted(reasons.items()))
+
+
+def convert_scanned_items(table: list[dict] | ColumnarTable) -> Converted:
+    """SCANNED_ITEMS (PID, SN, NAME, BEST_BEFORE_DATE, PACKED_ON_DATE, NET_KG, ITEM_COUNT)."""
+    return convert_table(table, SCANNED_ITEMS_FIELDS)
+
+
+def convert_sales_floor(table: list[dict] | ColumnarTable) -> Converted:
+    """SALES_FLOOR (PID, NAME, CURRENT_COUNT, TOTAL_WEIGHT, LATEST_EXPIRY)."""
+    return convert_table(table, SALES_FLOOR_FIELDS)
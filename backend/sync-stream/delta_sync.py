@@ -0,0 +1,380 @@
+"""
+WatermelonDB delta sync — the server half of `synchronize()`.
+
+Instead of re-sending whole tables, the app pulls what changed since its
+last sync and pushes only what changed locally:
+
+  • pull(last_pulled_at) → `{changes: {table: {created, updated, deleted}}, timestamp}`
+  • push(changes, last_pulled_at) applies the created/updated/deleted records
+
+Records are kept per WatermelonDB id in mirror tables (SYNC_SCANNED_ITEMS,
+SYNC_SALES_FLOOR) whose CREATED_AT / UPDATED_AT columns are server-assigned
+Unix ms — the same clock as `timestamp` and `last_pulled_at`, so a pull is
+one range scan on UPDATED_AT and device clocks never decide what is "new".
+Deletes are soft (DELETED = TRUE) so other devices can pull them.
+
+A push fails with SyncConflict if any record it touches changed on the
+server after the pusher's last pull; WatermelonDB then pulls and retries.
+
+A push stamps UPDATED_AT when it starts, but its rows only become visible at
+COMMIT; a pull running in between takes a later `timestamp` without seeing
+them. Pulls therefore re-read PULL_OVERLAP_MS behind `last_pulled_at`, and a
+push still running after half that window is refused with SyncConflict
+instead of committed, so every commit lands inside the next pull's overlap.
+Records re-sent by the overlap arrive as `updated`, which WatermelonDB
+applies idempotently. The push conflict check uses the same window: a record
+stamped within PULL_OVERLAP_MS before `last_pulled_at` may have committed
+after that pull, so it counts as changed since it — at the cost of a device
+having to wait out the window (pulling again) before it can overwrite a
+record that was just written.
+
+Pulled records carry only the app's schema fields (`SyncTable.pulled`) and
+the client's own created_at / updated_at as pushed (kept in
+CLIENT_CREATED_AT / CLIENT_UPDATED_AT); the server stamps stay internal.
+
+Pushed records also reach the warehouse tables the dashboard reads: new
+scanned items are appended to SCANNED_ITEMS, sales-floor records are
+merged into SALES_FLOOR (see ingest.write_rows), and deleted records remove
+their rows there by PID + SN / PID (ingest.delete_rows) unless another live
+record still holds that key.
+
+The mirror tables are a deliberate departure from pulling straight off the
+CREATED_AT / UPDATED_AT columns of SCANNED_ITEMS and SALES_FLOOR: those have
+no WatermelonDB id to key updates and deletes on (SALES_FLOOR keeps one row
+per PID, SCANNED_ITEMS is an append-only log), no tombstones for deletes to
+pull, and timestamps set by the warehouse rather than by this clock.
+
+All SQL is plain SELECT / INSERT / UPDATE with `%s` binds, so everything here
+also runs against SQLite (see bench/sqlite_warehouse.py).
+"""
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from convert import MAX_REPORTED_REJECTS, SALES_FLOOR_FIELDS, SCANNED_ITEMS_FIELDS, convert_table
+from ingest import PayloadError, with_rejects
+
+log = logging.getLogger(__name__)
+
+# Max ids per `IN (...)` list.
+SYNC_ID_CHUNK = 1000
+
+# How far behind last_pulled_at a pull re-reads; a push must finish within
+# half of it (the rest is headroom for its COMMIT).
+PULL_OVERLAP_MS = 2 * 60 * 1000
+
+
+# Mirror column type per convert.py kind. Snowflake's bare NUMBER is
+# NUMBER(38,0), which would round NET_KG / TOTAL_WEIGHT on write, so
+# fractional fields are FLOAT and only whole ms timestamps are NUMBER(38,0).
+# CREATE TABLE IF NOT EXISTS leaves mirror tables created with bare NUMBER
+# columns, or without CLIENT_CREATED_AT / CLIENT_UPDATED_AT, as they are;
+# recreate those (Snowflake cannot ALTER NUMBER to FLOAT).
+_COLUMN_TYPES = {'id': 'VARCHAR', 'text': 'VARCHAR', 'ms': 'NUMBER(38,0)', 'number': 'FLOAT'}
+
+
+class SyncConflict(Exception):
+    """A pushed record changed on the server after the client's last pull."""
+
+
+@dataclass(frozen=True)
+class SyncTable:
+    """One WatermelonDB table and its server-side mirror.
+
+    `columns` maps WatermelonDB field → mirror column; `fields` is the
+    convert.py spec used to validate pushed records. `forward_updates` says
+    whether updates (not just creates) are forwarded to the warehouse table,
+    `keys` are the mirror columns that identify a record's warehouse row
+    when it is deleted, and `pulled` the fields of the app's WatermelonDB
+    schema (vizcount-app/db/schema.ts) that a pull sends back.
+    """
+    name: str
+    store: str
+    columns: tuple[tuple[str, str], ...]
+    fields: tuple
+    forward_updates: bool
+    keys: tuple[str, ...]
+    pulled: tuple[str, ...]
+
+    @property
+    def ddl(self) -> str:
+        cols = ",\n        ".join(f"{col} {_COLUMN_TYPES[kind]}"
+                                  for (_, col), (_, kind, _) in zip(self.columns, self.fields))
+        return f"""
+    CREATE TABLE IF NOT EXISTS {self.store} (
+        ID         VARCHAR NOT NULL PRIMARY KEY,
+        {cols},
+        CLIENT_CREATED_AT NUMBER(38,0),
+        CLIENT_UPDATED_AT NUMBER(38,0),
+        CREATED_AT NUMBER(38,0) NOT NULL,
+        UPDATED_AT NUMBER(38,0) NOT NULL,
+        DELETED    BOOLEAN NOT NULL
+    )
+"""
+
+
+SCANNED_ITEMS_SYNC = SyncTable(
+    name='scanned_items',
+    store='SYNC_SCANNED_ITEMS',
+    columns=(
+        ('pid', 'PID'), ('sn', 'SN'), ('name', 'NAME'),
+        ('best_before_date', 'BEST_BEFORE_DATE'), ('packed_on_date', 'PACKED_ON_DATE'),
+        ('net_kg', 'NET_KG'), ('count', 'ITEM_COUNT'),
+    ),
+    fields=SCANNED_ITEMS_FIELDS,
+    forward_updates=False,   # SCANNED_ITEMS is an append-only scan log
+    keys=('PID', 'SN'),
+    pulled=('pid', 'sn', 'name', 'best_before_date', 'net_kg', 'count'),   # no packed_on_date
+)
+SALES_FLOOR_SYNC = SyncTable(
+    name='sales_floor',
+    store='SYNC_SALES_FLOOR',
+    columns=(
+        ('pid', 'PID'), ('name', 'NAME'), ('count', 'CURRENT_COUNT'),
+        ('weight', 'TOTAL_WEIGHT'), ('expiry_date', 'EXPIRY_DATE'),
+    ),
+    fields=SALES_FLOOR_FIELDS,
+    forward_updates=True,    # SALES_FLOOR is merged on PID
+    keys=('PID',),
+    pulled=('pid', 'name', 'count', 'weight', 'expiry_date'),
+)
+SYNC_TABLES = {t.name: t for t in (SCANNED_ITEMS_SYNC, SALES_FLOOR_SYNC)}
+
+_tables_ready = False
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def ensure_tables(cur) -> None:
+    """Create the mirror tables once per instance. DDL commits implicitly in
+    Snowflake, so call this before opening a transaction."""
+    global _tables_ready
+    if not _tables_ready:
+        for table in SYNC_TABLES.values():
+            cur.execute(table.ddl)
+        _tables_ready = True
+
+
+def parse_last_pulled_at(value) -> Optional[int]:
+    """`last_pulled_at` from a query string or push body; None means first sync."""
+    if value is None or value in ('', 'null', 0, '0'):
+        return None
+    try:
+        ms = int(value)
+    except (TypeError, ValueError):
+        raise PayloadError("'last_pulled_at' must be Unix milliseconds or null.") from None
+    if ms < 0:
+        raise PayloadError("'last_pulled_at' must be Unix milliseconds or null.")
+    return ms
+
+
+def _chunks(items: list, size: int = SYNC_ID_CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# ---------------------------------------------------------------
+# Pull
+# ---------------------------------------------------------------
+def pull(cur, last_pulled_at: Optional[int], timestamp: Optional[int] = None) -> dict:
+    """Changes since *last_pulled_at* (everything live if None), in
+    WatermelonDB's pull format.
+
+    `timestamp` is taken before reading: a record stamped after it is sent
+    again by the next pull rather than missed. Records stamped up to
+    PULL_OVERLAP_MS before *last_pulled_at* are read again, for pushes that
+    committed after the previous pull (see module docs).
+    """
+    timestamp = now_ms() if timestamp is None else timestamp
+    changes = {}
+    for table in SYNC_TABLES.values():
+        cols = dict(table.columns)
+        select = (
+            f"SELECT ID, {', '.join(cols[f] for f in table.pulled)}, CLIENT_CREATED_AT, CLIENT_UPDATED_AT, "
+            f"CREATED_AT, UPDATED_AT, DELETED FROM {table.store}"
+        )
+        if last_pulled_at is None:
+            cur.execute(f"{select} WHERE NOT DELETED", ())
+        else:
+            cur.execute(f"{select} WHERE UPDATED_AT > %s", (last_pulled_at - PULL_OVERLAP_MS,))
+
+        created, updated, deleted = [], [], []
+        for row in cur.fetchall():
+            rec_id, values = row[0], row[1:-5]
+            client_created, client_updated, created_at, updated_at, is_deleted = row[-5:]
+            if is_deleted:
+                # Created and deleted since the last pull: the client never had it.
+                if last_pulled_at is not None and created_at <= last_pulled_at:
+                    deleted.append(rec_id)
+                continue
+            record = {"id": rec_id, **dict(zip(table.pulled, values)),
+                      "created_at": created_at if client_created is None else client_created,
+                      "updated_at": updated_at if client_updated is None else client_updated}
+            if last_pulled_at is None or created_at > last_pulled_at:
+                created.append(record)
+            else:
+                updated.append(record)
+        changes[table.name] = {"created": created, "updated": updated, "deleted": deleted}
+    return {"changes": changes, "timestamp": timestamp}
+
+
+# ---------------------------------------------------------------
+# Push
+# ---------------------------------------------------------------
+def _table_changes(name: str, value) -> tuple[list, list]:
+    """`(created + updated records, deleted ids)` for one table of a push."""
+    if not isinstance(value, dict):
+        raise PayloadError(f"'changes.{name}' must be an object.")
+    records = []
+    for kind in ('created', 'updated'):
+        rows = value.get(kind, [])
+        if not isinstance(rows, list):
+            raise PayloadError(f"'changes.{name}.{kind}' must be an array.")
+        records.extend(rows)
+    deleted = value.get('deleted', [])
+    if not isinstance(deleted, list) or not all(isinstance(i, str) and i for i in deleted):
+        raise PayloadError(f"'changes.{name}.deleted' must be an array of ids.")
+    return records, deleted
+
+
+def _client_ms(value) -> Optional[int]:
+    """A pushed record's own created_at / updated_at, if it is Unix ms."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    return None
+
+
+def _server_versions(cur, table: SyncTable, ids: list[str]) -> dict[str, int]:
+    """UPDATED_AT of the given ids that exist in the mirror."""
+    found = {}
+    for chunk in _chunks(ids):
+        cur.execute(
+            f"SELECT ID, UPDATED_AT FROM {table.store} WHERE ID IN ({', '.join(['%s'] * len(chunk))})",
+            tuple(chunk),
+        )
+        found.update(cur.fetchall())
+    return found
+
+
+def _removed_keys(cur, table: SyncTable, deleted: list[str]) -> list[tuple]:
+    """Warehouse keys of the *deleted* (already tombstoned) ids that no live
+    mirror record still holds."""
+    cols = ', '.join(table.keys)
+    keys = set()
+    for chunk in _chunks(deleted):
+        cur.execute(f"SELECT {cols} FROM {table.store} WHERE ID IN ({', '.join(['%s'] * len(chunk))})",
+                    tuple(chunk))
+        keys.update(tuple(row) for row in cur.fetchall())
+    for chunk in _chunks(sorted({key[0] for key in keys})):
+        cur.execute(
+            f"SELECT {cols} FROM {table.store} "
+            f"WHERE NOT DELETED AND {table.keys[0]} IN ({', '.join(['%s'] * len(chunk))})",
+            tuple(chunk),
+        )
+        keys.difference_update(tuple(row) for row in cur.fetchall())
+    return sorted(keys)
+
+
+def push(
+    cur,
+    changes: dict,
+    last_pulled_at: Optional[int],
+    forward: Optional[Callable[..., dict]] = None,
+    timestamp: Optional[int] = None,
+    remove: Optional[Callable[..., dict]] = None,
+) -> dict:
+    """Apply a WatermelonDB push inside the caller's transaction.
+
+    `forward(cur, scanned_rows, sales_floor_rows)` receives the converted
+    tuples bound for the warehouse tables (ingest.write_rows in production),
+    and `remove(cur, scanned_keys, sales_floor_keys)` the keys of deleted
+    records whose warehouse rows should go (ingest.delete_rows).
+    Raises PayloadError for a malformed push and SyncConflict if a record
+    changed on the server since *last_pulled_at* (less the pull overlap),
+    or if the push ran too long to commit inside the pull overlap. Records
+    that fail validation are skipped and reported, as in the bulk sync.
+    """
+    if not isinstance(changes, dict):
+        raise PayloadError("'changes' must be an object.")
+    started = time.monotonic()
+    timestamp = now_ms() if timestamp is None else timestamp
+    ignored = sorted(name for name in changes if name not in SYNC_TABLES)
+
+    parsed = {
+        table.name: _table_changes(table.name, changes[table.name])
+        for table in SYNC_TABLES.values() if table.name in changes
+    }
+
+    counts, forwarded, removed, rejected, rows_rejected = {}, {}, {}, [], 0
+    for table in SYNC_TABLES.values():
+        records, deleted = parsed.get(table.name, ([], []))
+        converted = convert_table(records, (('id', 'id', True),) + table.fields)
+        bad = {i for i, _ in converted.rejected}
+        rows_rejected += len(bad)
+        rejected += converted.report(table.name)
+        kept = [r for i, r in enumerate(records) if i not in bad]
+
+        # Last occurrence of an id wins, as in dedupe_sales_floor.
+        latest = {str(r['id']): (r, conv) for r, conv in zip(kept, converted.rows)}
+        ids = list(latest) + [i for i in deleted if i not in latest]
+        versions = _server_versions(cur, table, ids)
+        if last_pulled_at is not None:
+            stale = [i for i, v in versions.items() if v > last_pulled_at - PULL_OVERLAP_MS]
+        else:
+            stale = list(versions)
+        if stale:
+            raise SyncConflict(
+                f"{len(stale)} {table.name} record(s) changed on the server since the last pull "
+                f"(e.g. '{stale[0]}'); pull first."
+            )
+
+        fields = [f for f, _ in table.columns]
+        inserts = [(i, *(r.get(f) for f in fields), _client_ms(r.get('created_at')),
+                    _client_ms(r.get('updated_at')), timestamp, timestamp, False)
+                   for i, (r, _) in latest.items() if i not in versions]
+        updates = [(*(r.get(f) for f in fields), _client_ms(r.get('created_at')),
+                    _client_ms(r.get('updated_at')), timestamp, i)
+                   for i, (r, _) in latest.items() if i in versions]
+        deletes = [i for i in deleted if i in versions and i not in latest]
+
+        if inserts:
+            cols = ', '.join(c for _, c in table.columns)
+            cur.executemany(
+                f"INSERT INTO {table.store} "
+                f"(ID, {cols}, CLIENT_CREATED_AT, CLIENT_UPDATED_AT, CREATED_AT, UPDATED_AT, DELETED) "
+                f"VALUES ({', '.join(['%s'] * (len(fields) + 6))})",
+                inserts,
+            )
+        if updates:
+            sets = ', '.join(f"{c} = %s" for _, c in table.columns)
+            cur.executemany(
+                f"UPDATE {table.store} SET {sets}, CLIENT_CREATED_AT = %s, CLIENT_UPDATED_AT = %s, "
+                f"UPDATED_AT = %s WHERE ID = %s",
+                updates,
+            )
+        for chunk in _chunks(deletes):
+            cur.execute(
+                f"UPDATE {table.store} SET DELETED = TRUE, UPDATED_AT = %s "
+                f"WHERE ID IN ({', '.join(['%s'] * len(chunk))})",
+                (timestamp, *chunk),
+            )
+
+        removed[table.name] = _removed_keys(cur, table, deletes) if remove is not None else []
+        forwarded[table.name] = [
+            conv[1:] for i, (_, conv) in latest.items()
+            if table.forward_updates or i not in versions
+        ]
+        counts[table.name] = {"created": len(inserts), "updated": len(updates), "deleted": len(deletes)}
+
+    result = {"status": "success", "timestamp": timestamp, "changes": counts, "ignored_tables": ignored}
+    if forward is not None:
+        written = forward(cur, forwarded['scanned_items'], forwarded['sales_floor'])
+        result.update((k, v) for k, v in written.items() if k != "status")
+    if remove is not None:
+        result.update(remove(cur, removed['scanned_items'], removed['sales_floor']))
+    if (time.monotonic() - started) * 1000 > PULL_OVERLAP_MS / 2:
+        raise SyncConflict("Push took too long to commit safely; pull and retry.")
+    return with_rejects(result, rows_rejected, rejected[:MAX_REPORTED_REJECTS])
@@ -0,0 +1,119 @@
+"""
+Change detection for SALES_FLOOR upserts.
+
+The app resends its whole sales_floor table on every sync, but most PIDs
+haven't changed since the last push — and each one still costs MERGE work.
+This keeps a content fingerprint per PID (a digest of name, count, weight
+and expiry) and drops rows whose fingerprint matches before any SQL runs:
+
+  • fingerprints live in a bounded LRU cache with a TTL
+    (SALES_FLOOR_FINGERPRINT_CACHE_SIZE / _TTL_S)
+  • PIDs the cache doesn't know are looked up in SALES_FLOOR itself, one
+    SELECT per batch, so a cold instance still skips what's already there
+  • a row's fingerprint is remembered once its MERGE has run; main.py clears
+    the cache whenever a transaction rolls back
+
+Another instance may update a PID this one has cached; the TTL bounds how
+long such a PID can be wrongly skipped here.
+"""
+import hashlib
+import threading
+from typing import Any
+
+import telemetry
+from cache import TTLCache
+
+# Max PIDs per `IN (...)` lookup.
+FINGERPRINT_LOOKUP_CHUNK = 1000
+
+SALES_FLOOR_LOOKUP_SQL = (
+    "SELECT PID, NAME, CURRENT_COUNT, TOTAL_WEIGHT, LATEST_EXPIRY FROM SALES_FLOOR WHERE PID IN ({})"
+)
+
+
+def pid_key(row: tuple) -> str:
+    """Cache key for a SALES_FLOOR tuple (PIDs arrive as numbers or strings)."""
+    return str(row[0])
+
+
+def _number(v: Any) -> Any:
+    return None if v is None else float(v)
+
+
+def fingerprint(row: tuple) -> bytes:
+    """Digest of a converted SALES_FLOOR tuple `(pid, name, count, weight, expiry)`.
+
+    Numbers are compared as floats so `6` sent and `6.0` read back match.
+    """
+    _, name, count, weight, expiry = row
+    content = repr((name, _number(count), _number(weight), expiry)).encode()
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+
+class SalesFloorFingerprints:
+    """Per-PID fingerprints of what SALES_FLOOR currently holds."""
+
+    def __init__(self, max_size: int = 50000, ttl_s: float = 300.0):
+        self._cache = TTLCache(max_size, ttl_s)
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def split(self, cur, rows: list[tuple]) -> tuple[list[tuple], list[tuple]]:
+        """`(changed, unchanged)` for deduplicated SALES_FLOOR tuples."""
+        known = {}
+        missing = []
+        for row in rows:
+            key = pid_key(row)
+            fp = self._cache.get(key)
+            if fp is None:
+                missing.append(key)
+            else:
+                known[key] = fp
+        with self._stats_lock:
+            self.hits += len(known)
+            self.misses += len(missing)
+
+        if missing:
+            with telemetry.span('fingerprint_lookup'):
+                known.update(self._load(cur, missing))
+
+        changed, unchanged = [], []
+        for row in rows:
+            (unchanged if known.get(pid_key(row)) == fingerprint(row) else changed).append(row)
+        return changed, unchanged
+
+    def _load(self, cur, keys: list[str]) -> dict[str, bytes]:
+        """Fingerprints of the given PIDs as stored in SALES_FLOOR (cached too)."""
+        found = {}
+        for start in range(0, len(keys), FINGERPRINT_LOOKUP_CHUNK):
+            chunk = keys[start:start + FINGERPRINT_LOOKUP_CHUNK]
+            cur.execute(SALES_FLOOR_LOOKUP_SQL.format(", ".join(["%s"] * len(chunk))), tuple(chunk))
+            for row in cur.fetchall():
+                found[pid_key(row)] = fingerprint(tuple(row))
+        for key, fp in found.items():
+            self._cache.set(key, fp)
+        return found
+
+    def remember(self, rows: list[tuple]) -> None:
+        """Record *rows* as SALES_FLOOR's content once they've been merged."""
+        for row in rows:
+            self._cache.set(pid_key(row), fingerprint(row))
+
+    def forget(self, keys) -> None:
+        """Drop the fingerprints of PIDs whose SALES_FLOOR row was deleted."""
+        for key in keys:
+            self._cache.pop(key)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._cache),
+            }
@@ -0,0 +1,144 @@
+"""
+Idempotency keys for sync requests.
+
+Phones on flaky cooler Wi-Fi retry the same sync. The client sends an
+`Idempotency-Key` header (or a `batch_id` in the payload); the first request
+with a key does the ingest and records its result, and every repeat returns
+that result without writing to SCANNED_ITEMS again.
+
+Lookups go through two layers:
+  1. a bounded, TTL-evicting in-process cache (free on a warm instance)
+  2. the durable SYNC_LEDGER table (one SELECT when the cache misses, e.g.
+     after a cold start or when the retry lands on another instance)
+
+The ledger row is written in the same transaction as the ingest, so a batch
+is either fully written and recorded, or neither.
+"""
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from flask import Request
+
+from cache import TTLCache
+
+log = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 128
+
+LEDGER_DDL = """
+    CREATE TABLE IF NOT EXISTS SYNC_LEDGER (
+        IDEMPOTENCY_KEY VARCHAR(128) NOT NULL PRIMARY KEY,
+        RESULT          VARIANT,
+        CREATED_AT      TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
+    )
+"""
+LEDGER_SELECT_SQL = "SELECT RESULT FROM SYNC_LEDGER WHERE IDEMPOTENCY_KEY = %s"
+# VARIANT values can't be bound inside a VALUES clause, hence INSERT ... SELECT.
+LEDGER_INSERT_SQL = "INSERT INTO SYNC_LEDGER (IDEMPOTENCY_KEY, RESULT) SELECT %s, PARSE_JSON(%s)"
+
+
+def idempotency_key(request: Request, data: dict) -> Optional[str]:
+    """Return the request's idempotency key, or None if it didn't send one.
+
+    Raises ValueError for a key that is present but unusable.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER) or data.get('batch_id')
+    if key is None:
+        return None
+    key = str(key).strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise ValueError(f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters.")
+    return key
+
+
+class IdempotencyStore:
+    """In-process cache in front of the SYNC_LEDGER table."""
+
+    def __init__(self, max_size: int, ttl_s: float):
+        self._cache = TTLCache(max_size=max_size, ttl_s=ttl_s)
+        self._ledger_ready = False
+        self._locks: dict[str, list] = {}   # key → [lock, refcount]
+        self._locks_guard = threading.Lock()
+
+    def cached(self, key: str) -> Optional[dict]:
+        """Result for *key* if this instance has seen it recently."""
+        return self._cache.get(key)
+
+    def lookup(self, cur, key: str) -> Optional[dict]:
+        """Check the durable ledger; caches and returns the result if found."""
+        self.ensure_ledger(cur)
+        cur.execute(LEDGER_SELECT_SQL, (key,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        result = json.loads(row[0]) if isinstance(row[0], str) else row[0]
+        self._cache.set(key, result)
+        return result
+
+    def lookup_many(self, cur, keys: list[str]) -> dict[str, dict]:
+        """Ledger lookup for several keys in one round trip; returns the found ones."""
+        if not keys:
+            return {}
+        self.ensure_ledger(cur)
+        placeholders = ", ".join(["%s"] * len(keys))
+        cur.execute(
+            f"SELECT IDEMPOTENCY_KEY, RESULT FROM SYNC_LEDGER WHERE IDEMPOTENCY_KEY IN ({placeholders})",
+            tuple(keys),
+        )
+        found = {}
+        for key, raw in cur.fetchall():
+            found[key] = json.loads(raw) if isinstance(raw, str) else raw
+            self._cache.set(key, found[key])
+        return found
+
+    def record(self, cur, key: str, result: dict) -> None:
+        """Write the ledger row — call inside the ingest's transaction."""
+        self.ensure_ledger(cur)
+        cur.execute(LEDGER_INSERT_SQL, (key, json.dumps(result)))
+
+    def record_many(self, cur, results: dict[str, dict]) -> None:
+        """Write several ledger rows in one statement (spool deliveries)."""
+        self.ensure_ledger(cur)
+        values = ", ".join(["(%s, %s)"] * len(results))
+        params = tuple(v for key, result in results.items() for v in (key, json.dumps(result)))
+        cur.execute(
+            "INSERT INTO SYNC_LEDGER (IDEMPOTENCY_KEY, RESULT) "
+            f"SELECT column1, PARSE_JSON(column2) FROM VALUES {values}",
+            params,
+        )
+
+    def remember(self, key: str, result: dict) -> None:
+        """Cache *result* once the transaction that recorded it has committed."""
+        self._cache.set(key, result)
+
+    @contextmanager
+    def guard(self, key: str) -> Iterator[None]:
+        """Serialise concurrent requests for the same key on this instance.
+
+        The second request waits for the first to finish and then finds its
+        result in the cache. (Snowflake doesn't enforce PRIMARY KEY, so this is
+        what keeps two simultaneous retries on one instance from both writing.)
+        """
+        with self._locks_guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._locks_guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+    def ensure_ledger(self, cur) -> None:
+        """Create SYNC_LEDGER once per instance. DDL commits implicitly in
+        Snowflake, so call this before opening a transaction."""
+        if not self._ledger_ready:
+            cur.execute(LEDGER_DDL)
+            self._ledger_ready = True
+
@@ -0,0 +1,369 @@
+"""
+Warehouse write helpers for the sync-stream Cloud Function.
+
+Everything here takes an open Snowflake cursor and already-parsed payload rows
+(keys match WatermelonDB field names), so main.py stays focused on request
+handling and these can be benchmarked against a fake connector. Payload tables
+are validated and converted to bindable tuples by convert.py first; the
+statement helpers below take those tuples.
+"""
+import csv
+import logging
+import os
+import tempfile
+import uuid
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Optional
+
+import telemetry
+from columnar import ColumnarTable, table_from_json
+from convert import (
+    MAX_REPORTED_REJECTS, SALES_FLOOR_FIELDS, SCANNED_ITEMS_FIELDS,
+    Converted, convert_sales_floor, convert_scanned_items,
+)
+from fingerprint import SalesFloorFingerprints, pid_key
+from rollup import InventoryRollup
+
+log = logging.getLogger(__name__)
+
+# Max rows per MERGE statement. Snowflake caps a VALUES clause at 16,384 rows;
+# staying well below keeps statement text and bind count reasonable.
+SALES_FLOOR_MERGE_CHUNK = int(os.environ.get('SALES_FLOOR_MERGE_CHUNK', '1000'))
+
+# At or above this many scanned_items rows, skip parameter binding and load the
+# batch through the table stage (PUT + COPY INTO) in a single statement.
+SCANNED_ITEMS_BULK_THRESHOLD = int(os.environ.get('SCANNED_ITEMS_BULK_THRESHOLD', '2000'))
+
+SCANNED_ITEMS_REQUIRED = tuple(name for name, _, required in SCANNED_ITEMS_FIELDS if required)
+SALES_FLOOR_REQUIRED = tuple(name for name, _, required in SALES_FLOOR_FIELDS if required)
+
+
+class PayloadError(ValueError):
+    """The request body is not a valid sync payload."""
+
+
+def decode_table(table: str, value) -> list | ColumnarTable:
+    """One payload table, in row or columnar format (PayloadError if malformed)."""
+    try:
+        rows = table_from_json(value)
+    except ValueError as e:
+        raise PayloadError(f"'{table}' {e}") from e
+    if isinstance(rows, ColumnarTable) and rows.rows:
+        required = SCANNED_ITEMS_REQUIRED if table == 'scanned_items' else SALES_FLOOR_REQUIRED
+        missing = [k for k in required if k not in rows.columns]
+        if missing:
+            raise PayloadError(f"'{table}' is missing column {', '.join(missing)}.")
+    return rows
+
+
+def payload_tables(data: dict) -> tuple[list | ColumnarTable, list | ColumnarTable]:
+    """`(scanned_items, sales_floor)` from a decoded body."""
+    return (
+        decode_table('scanned_items', data.get('scanned_items', [])),
+        decode_table('sales_floor', data.get('sales_floor', [])),
+    )
+
+
+# ---------------------------------------------------------------
+# SCANNED_ITEMS — size-adaptive insert
+# Small batches use executemany; batches at or above
+# SCANNED_ITEMS_BULK_THRESHOLD go through PUT + COPY INTO.
+# Maps WatermelonDB field names → Snowflake column names:
+#   pid              → PID
+#   sn               → SN
+#   name             → NAME
+#   best_before_date → BEST_BEFORE_DATE  (ms → TIMESTAMP_NTZ)
+#   packed_on_date   → PACKED_ON_DATE    (ms → TIMESTAMP_NTZ)
+#   net_kg           → NET_KG
+#   count            → ITEM_COUNT
+# ---------------------------------------------------------------
+SCANNED_ITEMS_INSERT_SQL = """
+    INSERT INTO SCANNED_ITEMS
+        (PID, SN, NAME, BEST_BEFORE_DATE, PACKED_ON_DATE, NET_KG, ITEM_COUNT)
+    VALUES
+        (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+SCANNED_ITEMS_COPY_SQL = """
+    COPY INTO SCANNED_ITEMS
+        (PID, SN, NAME, BEST_BEFORE_DATE, PACKED_ON_DATE, NET_KG, ITEM_COUNT)
+    FROM @%SCANNED_ITEMS
+    FILES = ('{file}')
+    FILE_FORMAT = (TYPE = CSV FIELD_OPTIONALLY_ENCLOSED_BY = '"' NULL_IF = ('\\\\N'))
+    ON_ERROR = ABORT_STATEMENT
+    PURGE = TRUE
+"""
+
+# csv.writer leaves this unquoted, and it matches NULL_IF above.
+_CSV_NULL = '\\N'
+
+
+def insert_scanned_items(
+    cur, rows: list[tuple], bulk_threshold: int = SCANNED_ITEMS_BULK_THRESHOLD,
+    rollup: Optional[InventoryRollup] = None,
+) -> str:
+    """Insert converted SCANNED_ITEMS *rows*, picking the ingest strategy by batch size.
+
+    Returns the strategy used: "bind" (executemany) or "stage" (PUT + COPY).
+    With *rollup*, the rows' per-PID totals are added to INVENTORY_ROLLUP too.
+    """
+    with telemetry.span('insert'):
+        if len(rows) >= bulk_threshold:
+            copy_scanned_items(cur, rows)
+            strategy = "stage"
+        else:
+            cur.executemany(SCANNED_ITEMS_INSERT_SQL, rows)
+            strategy = "bind"
+    if rollup is not None:
+        rollup.add_scanned(cur, rows)
+    return strategy
+
+
+def copy_scanned_items(cur, rows: list[tuple]) -> None:
+    """Bulk path: write the batch to a CSV, PUT it on the table stage, COPY it in.
+
+    The file name is unique per call so concurrent requests never collide on
+    the shared table stage, and PURGE removes it once loaded.
+    """
+    name = f"scanned_items_{uuid.uuid4().hex}.csv"
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, name)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            for row in rows:
+                writer.writerow(_CSV_NULL if v is None else v for v in row)
+        log.debug(f"Uploading {len(rows)} rows to @%SCANNED_ITEMS as {name}...")
+        cur.execute(f"PUT 'file://{path}' @%SCANNED_ITEMS AUTO_COMPRESS = TRUE")
+    # AUTO_COMPRESS gzips on upload, so the staged file carries a .gz suffix.
+    cur.execute(SCANNED_ITEMS_COPY_SQL.format(file=f"{name}.gz"))
+
+
+# ---------------------------------------------------------------
+# SALES_FLOOR — set-based upsert
+# Maps WatermelonDB field names → Snowflake column names:
+#   pid          → PID
+#   name         → NAME
+#   count        → CURRENT_COUNT
+#   weight       → TOTAL_WEIGHT
+#   expiry_date  → LATEST_EXPIRY      (ms → TIMESTAMP_NTZ)
+# Uses MERGE so re-scanning the same PID updates, not duplicates.
+# ---------------------------------------------------------------
+def dedupe_sales_floor(rows: list[tuple]) -> list[tuple]:
+    """Collapse SALES_FLOOR tuples to one per PID — the last occurrence wins.
+
+    A single MERGE cannot match the same target row twice (Snowflake raises a
+    nondeterministic-merge error), so duplicates must go before the statement.
+    """
+    latest: dict = {}
+    for row in rows:
+        latest[row[0]] = row
+    return list(latest.values())
+
+
+@lru_cache(maxsize=32)
+def sales_floor_merge_sql(n_rows: int) -> str:
+    """MERGE statement with an n-row VALUES source (cached per chunk size)."""
+    values = ",\n            ".join(["(%s, %s, %s, %s, %s)"] * n_rows)
+    return f"""
+    MERGE INTO SALES_FLOOR AS target
+    USING (
+        SELECT * FROM (VALUES
+            {values}
+        ) AS v (PID, NAME, CURRENT_COUNT, TOTAL_WEIGHT, LATEST_EXPIRY)
+    ) AS source
+    ON target.PID = source.PID
+    WHEN MATCHED THEN UPDATE SET
+        NAME          = source.NAME,
+        CURRENT_COUNT = source.CURRENT_COUNT,
+        TOTAL_WEIGHT  = source.TOTAL_WEIGHT,
+        LATEST_EXPIRY = source.LATEST_EXPIRY,
+        UPDATED_AT    = CURRENT_TIMESTAMP
+    WHEN NOT MATCHED THEN INSERT
+        (PID, NAME, CURRENT_COUNT, TOTAL_WEIGHT, LATEST_EXPIRY)
+    VALUES
+        (source.PID, source.NAME, source.CURRENT_COUNT,
+         source.TOTAL_WEIGHT, source.LATEST_EXPIRY)
+    """
+
+
+def merge_sales_floor(cur, rows: list[tuple], chunk_size: int = SALES_FLOOR_MERGE_CHUNK) -> int:
+    """Upsert converted SALES_FLOOR *rows* with one MERGE per chunk instead of one per row.
+
+    Returns the number of distinct PIDs merged.
+    """
+    rows = dedupe_sales_floor(rows)
+    with telemetry.span('merge'):
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            params = tuple(value for row in chunk for value in row)
+            cur.execute(sales_floor_merge_sql(len(chunk)), params)
+    return len(rows)
+
+
+def upsert_sales_floor(
+    cur, rows: list[tuple], fingerprints: Optional[SalesFloorFingerprints] = None,
+    rollup: Optional[InventoryRollup] = None,
+) -> tuple[int, int]:
+    """MERGE the SALES_FLOOR *rows* whose content changed (all of them without
+    *fingerprints*), and with *rollup* copy them into INVENTORY_ROLLUP;
+    returns `(upserted, skipped)` distinct PIDs."""
+    rows = dedupe_sales_floor(rows)
+    changed, unchanged = (rows, []) if fingerprints is None else fingerprints.split(cur, rows)
+    if changed:
+        merge_sales_floor(cur, changed)
+        if rollup is not None:
+            rollup.set_floor(cur, changed)
+        if fingerprints is not None:
+            fingerprints.remember(changed)
+    return len(changed), len(unchanged)
+
+
+# ---------------------------------------------------------------
+# Whole payload
+# ---------------------------------------------------------------
+def write_rows(
+    cur, scanned_rows: list[tuple], sales_floor_rows: list[tuple],
+    fingerprints: Optional[SalesFloorFingerprints] = None, rollup: Optional[InventoryRollup] = None,
+) -> dict:
+    """INSERT converted scanned_items and MERGE converted sales_floor; returns the counts.
+
+    With *fingerprints*, sales_floor rows identical to what SALES_FLOOR
+    already holds are skipped (see fingerprint.py). With *rollup*,
+    INVENTORY_ROLLUP is updated by the same statements' transaction
+    (see rollup.py).
+    """
+    if scanned_rows:
+        log.debug(f"Preparing {len(scanned_rows)} rows for SCANNED_ITEMS insert...")
+        scanned_strategy = insert_scanned_items(cur, scanned_rows, rollup=rollup)
+        log.debug(f"Successfully inserted {len(scanned_rows)} rows into SCANNED_ITEMS via '{scanned_strategy}'.")
+    else:
+        scanned_strategy = None
+        log.debug("No scanned_items to insert, skipping.")
+
+    if sales_floor_rows:
+        log.debug(f"Processing {len(sales_floor_rows)} rows for SALES_FLOOR upsert (MERGE)...")
+        sales_floor_upserted, sales_floor_skipped = upsert_sales_floor(cur, sales_floor_rows, fingerprints, rollup)
+        log.debug(
+            f"Successfully upserted {sales_floor_upserted} distinct PIDs into SALES_FLOOR "
+            f"({sales_floor_skipped} unchanged, skipped)."
+        )
+    else:
+        sales_floor_upserted = sales_floor_skipped = 0
+        log.debug("No sales_floor rows to upsert, skipping.")
+
+    return {
+        "status": "success",
+        "scanned_items_written": len(scanned_rows),
+        "scanned_items_strategy": scanned_strategy,
+        "sales_floor_upserted": sales_floor_upserted,
+        "sales_floor_skipped": sales_floor_skipped,
+    }
+
+
+# ---------------------------------------------------------------
+# Deletes (delta sync)
+# ---------------------------------------------------------------
+# Max keys per DELETE statement's `IN (...)` list.
+DELETE_CHUNK = 1000
+
+
+def _delete_in(cur, table: str, columns: tuple[str, ...], keys: list[tuple]) -> None:
+    row = f"({', '.join(['%s'] * len(columns))})"
+    for start in range(0, len(keys), DELETE_CHUNK):
+        chunk = keys[start:start + DELETE_CHUNK]
+        cur.execute(
+            f"DELETE FROM {table} WHERE ({', '.join(columns)}) IN ({', '.join([row] * len(chunk))})",
+            tuple(v for key in chunk for v in key),
+        )
+
+
+def delete_rows(
+    cur, scanned_keys: list[tuple], sales_floor_keys: list[tuple],
+    fingerprints: Optional[SalesFloorFingerprints] = None, rollup: Optional[InventoryRollup] = None,
+) -> dict:
+    """DELETE the SCANNED_ITEMS rows with the given `(pid, sn)` keys and the
+    SALES_FLOOR rows with the given `(pid,)` keys; returns the counts.
+
+    Deleted PIDs are dropped from *fingerprints* (a re-created row must not be
+    skipped as unchanged), and with *rollup* their INVENTORY_ROLLUP rows are
+    recomputed from the base tables.
+    """
+    with telemetry.span('delete'):
+        _delete_in(cur, 'SCANNED_ITEMS', ('PID', 'SN'), scanned_keys)
+        _delete_in(cur, 'SALES_FLOOR', ('PID',), sales_floor_keys)
+    if fingerprints is not None:
+        fingerprints.forget(pid_key(key) for key in sales_floor_keys)
+    if rollup is not None:
+        rollup.recompute(cur, [pid_key(key) for key in scanned_keys + sales_floor_keys])
+    log.debug(f"Deleted {len(scanned_keys)} SCANNED_ITEMS keys and {len(sales_floor_keys)} SALES_FLOOR PIDs.")
+    return {"scanned_items_deleted": len(scanned_keys), "sales_floor_deleted": len(sales_floor_keys)}
+
+
+def with_rejects(result: dict, rows_rejected: int, rejected: list[dict]) -> dict:
+    """Add the rejected-row report to *result*; any rejects make the status "partial"."""
+    if rows_rejected:
+        log.warning(f"Rejected {rows_rejected} malformed rows; writing the rest.")
+    return {
+        **result,
+        "status": "partial" if rows_rejected else result["status"],
+        "rows_rejected": rows_rejected,
+        "rejected": rejected,
+    }
+
+
+def _reject_report(scanned: Converted, sales_floor: Converted) -> tuple[int, list[dict]]:
+    return (
+        len(scanned.rejected) + len(sales_floor.rejected),
+        (scanned.report('scanned_items') + sales_floor.report('sales_floor'))[:MAX_REPORTED_REJECTS],
+    )
+
+
+def write_batch(
+    cur, scanned_items: list[dict] | ColumnarTable, sales_floor: list[dict] | ColumnarTable,
+    fingerprints: Optional[SalesFloorFingerprints] = None, rollup: Optional[InventoryRollup] = None,
+) -> dict:
+    """Convert both tables, write the good rows; returns the response counts
+    plus the indices of any rejected rows."""
+    scanned = convert_scanned_items(scanned_items)
+    floor = convert_sales_floor(sales_floor)
+    return with_rejects(
+        write_rows(cur, scanned.rows, floor.rows, fingerprints, rollup), *_reject_report(scanned, floor),
+    )
+
+
+@dataclass
+class WriteGroup:
+    """One caller's payload inside a batch written on behalf of several callers
+    (coalesced requests, spooled receipts).
+
+    `idem_key` is recorded in SYNC_LEDGER with the group's result; when
+    `check_ledger` is set the key is looked up first and, if found, the group
+    is replayed instead of written.
+    """
+    scanned_items: list[dict] | ColumnarTable
+    sales_floor: list[dict] | ColumnarTable
+    idem_key: Optional[str] = None
+    check_ledger: bool = False
+    _converted: Optional[tuple[Converted, Converted]] = field(default=None, init=False, repr=False)
+
+    def converted(self) -> tuple[Converted, Converted]:
+        """`(scanned_items, sales_floor)` converted once and kept for the write and the result."""
+        if self._converted is None:
+            self._converted = (convert_scanned_items(self.scanned_items), convert_sales_floor(self.sales_floor))
+        return self._converted
+
+    def result(self, unchanged_pids: frozenset[str] = frozenset()) -> dict:
+        """The group's response; PIDs in *unchanged_pids* count as skipped."""
+        scanned, floor = self.converted()
+        floor_rows = dedupe_sales_floor(floor.rows)
+        skipped = sum(1 for row in floor_rows if pid_key(row) in unchanged_pids)
+        return with_rejects(
+            {
+                "status": "success",
+                "scanned_items_written": len(scanned.rows),
+                "sales_floor_upserted": len(floor_rows) - skipped,
+                "sales_floor_skipped": skipped,
+            },
+            *_reject_report(scanned, floor),
+        )
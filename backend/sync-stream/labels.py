@@ -0,0 +1,291 @@
+"""
+GS1-128 barcode and label OCR parsing, server side.
+
+A Python port of the app's scanner heuristics (parseGS1, yymmdd, extractSN,
+extractKg, extractBB in pipelineTest.mjs) so the backend can re-derive and
+audit fields from raw scans:
+
+  • `parse_gs1` / `parse_gs1_batch` – AIs 01 (GTIN), 11 (packed), 17
+    (best before), 21 (serial, GS-terminated) and 310x (net kg, x decimals),
+    after an optional `]C1` / `]d2` / `]Q3` symbology id or leading GS
+  • `parse_label` / `parse_label_batch` – PID, serial, net kg and best-before
+    from OCR'd label lines, with the barcode's fields taking precedence the
+    way the app resolves them
+
+Patterns are compiled once at import, results are NamedTuples and dates go
+through a small cache (a batch repeats the same few dates), so a record
+costs little more than its slicing.
+
+Dates are midnight in *tz* (UTC unless given) as Unix ms; the app uses the
+device's zone, so pass the store's zone to compare against what it sent.
+
+One deliberate difference from the JS: a GS between elements is skipped
+(GS1 allows one after any field), where parseGS1 stops at it.
+"""
+import math
+import re
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+from typing import Iterable, NamedTuple, Optional, Sequence
+
+GS = '\x1d'
+_SYMBOLOGY_IDS = (']C1', ']d2', ']Q3')
+
+# Product types whose serial is the 14-digit HU number, not a 12-digit S/N.
+HU_SERIAL_TYPES = frozenset({'Halal', 'Organic Chicken', 'Maple Leaf Chicken'})
+
+# Products whose label only carries a packed date: best-before is packed + 11 days.
+PACKED_PLUS_11_NAMES = ('maple leaf', 'mina')
+_DAY_MS = 86_400_000
+
+_LB_TO_KG = 0.453592
+
+# JS \b, \d and \s are ASCII-only; re.ASCII keeps the matches identical.
+_INT_RE = re.compile(r'\s*([+-]?\d+)', re.ASCII)
+_FLOAT_RE = re.compile(r'\s*([+-]?(?:\d+\.?\d*|\.\d+))', re.ASCII)
+_HU_RE = re.compile(r'\bHU\b', re.ASCII | re.IGNORECASE)
+_HU_SERIAL_RE = re.compile(r'\b(\d{14})\b', re.ASCII)
+_SN_LABELLED_RE = re.compile(r'S/N\s*(\d{12})', re.ASCII | re.IGNORECASE)
+_SN_BARE_RE = re.compile(r'\b(\d{12})\b', re.ASCII)
+_KG_RES = (
+    re.compile(r'\bnet\s*([\d.]+)\s*kg', re.ASCII | re.IGNORECASE),
+    re.compile(r'\b([\d.]+)\s*kg\b', re.ASCII | re.IGNORECASE),
+)
+_LB_RES = (
+    re.compile(r'\bnet\s*([\d.]+)\s*lb', re.ASCII | re.IGNORECASE),
+    re.compile(r'\b([\d.]+)\s*lb\b', re.ASCII | re.IGNORECASE),
+)
+_EXPIRY_LINE_RE = re.compile(r'best before|exp|bb|use by', re.IGNORECASE)
+_NUMERIC_DATE_RE = re.compile(r'\b(\d{1,4})/(\d{1,2})/(\d{2,4})\b', re.ASCII)
+_NAMED_MONTH_DATE_RE = re.compile(r'\b(\d{1,2})[\s-]([A-Za-z]{3,4})[\s-](\d{2,4})\b', re.ASCII)
+_PID_RE = re.compile(r'\bPID[:\s]+(\d{7,8})\b|\b(\d{8})\b', re.ASCII | re.IGNORECASE)
+_MONTHS = {m: i for i, m in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'))}
+
+
+class GS1(NamedTuple):
+    """Fields of a GS1-128 barcode; None where the AI is absent or unreadable."""
+    gtin: Optional[str] = None
+    prod_date: Optional[int] = None
+    expiry: Optional[int] = None
+    sn: Optional[str] = None
+    weight: Optional[float] = None
+
+
+class LabelRow(NamedTuple):
+    """A scan resolved from its barcode and label text, as the app would save it."""
+    pid: Optional[str]
+    gtin: Optional[str]
+    sn: Optional[str]
+    net_kg: float
+    expiry: Optional[int]
+    prod_date: Optional[int]
+
+
+_EMPTY = GS1()
+_CENT = Decimal('0.01')
+
+
+def _js_int(s: str) -> Optional[int]:
+    """`parseInt(s, 10)`: leading digits, None where JS gives NaN."""
+    m = _INT_RE.match(s)
+    return int(m.group(1)) if m else None
+
+
+def _js_float(s: str) -> Optional[float]:
+    """`parseFloat(s)`: the leading number ('1.2.3' → 1.2), None for NaN."""
+    m = _FLOAT_RE.match(s)
+    return float(m.group(1)) if m else None
+
+
+def _to_fixed2(x: float) -> float:
+    """`parseFloat(x.toFixed(2))` — rounds the exact binary value half up."""
+    if not math.isfinite(x) or abs(x) >= 1e21:
+        return x   # toFixed gives these back unrounded
+    if not (x * 8).is_integer():
+        return round(x, 2)   # not an exact tie, so round() agrees
+    return float(Decimal(x).quantize(_CENT, rounding=ROUND_HALF_UP))
+
+
+@lru_cache(maxsize=4096)
+def _midnight_ms(year: int, month_index: int, day: int, tz: tzinfo) -> Optional[int]:
+    """`new Date(year, month_index, day).getTime()` in *tz*, with the same
+    rollover for out-of-range months and days (month -1, day 0, day 32 …)."""
+    year += month_index // 12
+    try:
+        d = date(year, month_index % 12 + 1, 1) + timedelta(days=day - 1)
+        return int(datetime(d.year, d.month, d.day, tzinfo=tz).timestamp() * 1000)
+    except (ValueError, OverflowError):
+        return None
+
+
+@lru_cache(maxsize=4096)
+def yymmdd(s: str, tz: tzinfo = timezone.utc) -> Optional[int]:
+    """A GS1 YYMMDD date as Unix ms; YY < 70 is 20YY, DD 00 the month's last day."""
+    y, m, d = _js_int(s[0:2]), _js_int(s[2:4]), _js_int(s[4:6])
+    if y is None or m is None or d is None:
+        return None
+    yr = 2000 + y if y < 70 else 1900 + y
+    return _midnight_ms(yr, m, 0, tz) if d == 0 else _midnight_ms(yr, m - 1, d, tz)
+
+
+def parse_gs1(barcode: str, tz: tzinfo = timezone.utc) -> GS1:
+    """Fields of one GS1-128 string (see the module docstring for the AIs)."""
+    gtin = prod_date = expiry = sn = weight = None
+    n = len(barcode)
+    i = 0
+    if barcode[:1] == GS:
+        i = 1
+    elif barcode[:3] in _SYMBOLOGY_IDS:
+        i = 3
+    while i + 2 <= n:
+        ai = barcode[i:i + 2]
+        if ai == '01':
+            gtin = barcode[i + 2:i + 16]
+            i += 16
+        elif ai == '11':
+            prod_date = yymmdd(barcode[i + 2:i + 8], tz)
+            i += 8
+        elif ai == '17':
+            expiry = yymmdd(barcode[i + 2:i + 8], tz)
+            i += 8
+        elif ai == '21':
+            i += 2
+            end = barcode.find(GS, i, i + 21)
+            if end < 0:
+                end = min(n, i + 20)
+            sn = barcode[i:end]
+            i = end + 1 if end < n and barcode[end] == GS else end
+        elif ai == '31':
+            if i + 4 > n:
+                break
+            if barcode[i + 2] == '0':
+                decimals = _js_int(barcode[i + 3])
+                value = _js_int(barcode[i + 4:i + 10])
+                weight = None if decimals is None or value is None else value / 10 ** decimals
+            i += 10
+        elif ai[0] == GS:
+            i += 1
+        else:
+            break
+    if gtin is None and sn is None and weight is None and prod_date is None and expiry is None:
+        return _EMPTY
+    return GS1(gtin, prod_date, expiry, sn, weight)
+
+
+def parse_gs1_batch(barcodes: Iterable[str], tz: tzinfo = timezone.utc) -> list[GS1]:
+    """`parse_gs1` over many barcodes."""
+    parse = parse_gs1
+    return [parse(b, tz) for b in barcodes]
+
+
+def extract_sn(lines: Sequence[str], product_type: Optional[str]) -> Optional[str]:
+    """The serial number on a label: the 14-digit HU number (near the "HU"
+    line first) for chicken, else a 12-digit S/N."""
+    if product_type in HU_SERIAL_TYPES:
+        hu = next((k for k, line in enumerate(lines) if _HU_RE.search(line)), -1)
+        source = [*lines[max(0, hu - 2):hu + 3], *lines] if hu >= 0 else lines
+        for line in source:
+            m = _HU_SERIAL_RE.search(line)
+            if m:
+                return m.group(1)
+    else:
+        for pattern in (_SN_LABELLED_RE, _SN_BARE_RE):
+            for line in lines:
+                m = pattern.search(line)
+                if m:
+                    return m.group(1)
+    return None
+
+
+def extract_kg(lines: Sequence[str]) -> Optional[float]:
+    """Net weight in kg from the first line giving one in kg or lb; 0 if none
+    (None where the matched number doesn't parse, e.g. '. kg')."""
+    for line in lines:
+        lower = line.lower()
+        m = 'kg' in lower and (_KG_RES[0].search(line) or _KG_RES[1].search(line))
+        if m:
+            kg = _js_float(m.group(1))
+            return None if kg is None else _to_fixed2(kg)
+        m = 'lb' in lower and (_LB_RES[0].search(line) or _LB_RES[1].search(line))
+        if m:
+            lb = _js_float(m.group(1))
+            return None if lb is None else _to_fixed2(lb * _LB_TO_KG)
+    return 0
+
+
+def extract_bb(lines: Sequence[str], prod_ts: Optional[int] = None,
+               tz: tzinfo = timezone.utc) -> Optional[int]:
+    """Best-before from label dates (d/m/y, y/m/d or d-MON-y): the last one on
+    a best before/exp/bb/use by line, else the latest date, else *prod_ts*."""
+    latest = None
+    expiry = None
+    for line in lines:
+        is_expiry_line = None
+        for a, b, c in _NUMERIC_DATE_RE.findall(line) if '/' in line else ():
+            a, b, c = int(a), int(b), int(c)
+            ts = (_midnight_ms(a, b - 1, c, tz) if a > 1000
+                  else _midnight_ms(2000 + c if c < 100 else c, b - 1, a, tz))
+            if ts is not None:
+                latest = ts if latest is None or ts > latest else latest
+                if is_expiry_line is None:
+                    is_expiry_line = _EXPIRY_LINE_RE.search(line) is not None
+                if is_expiry_line:
+                    expiry = ts
+        for d, mon, yr in _NAMED_MONTH_DATE_RE.findall(line):
+            month = _MONTHS.get(mon[:3].lower())
+            if month is None:
+                continue
+            yr = int(yr)
+            ts = _midnight_ms(2000 + yr if yr < 100 else yr, month, int(d), tz)
+            if ts is not None:
+                latest = ts if latest is None or ts > latest else latest
+                if is_expiry_line is None:
+                    is_expiry_line = _EXPIRY_LINE_RE.search(line) is not None
+                if is_expiry_line:
+                    expiry = ts
+    if expiry is not None:
+        return expiry
+    if latest is not None:
+        return latest
+    return prod_ts or None
+
+
+def extract_pid(lines: Sequence[str]) -> Optional[str]:
+    """The first `PID: nnnnnnnn` (7–8 digits) or bare 8-digit number."""
+    for line in lines:
+        m = _PID_RE.search(line)
+        if m:
+            return m.group(1) or m.group(2)
+    return None
+
+
+def parse_label(lines: Sequence[str], product_type: Optional[str] = None,
+                product_name: Optional[str] = None, barcode: Optional[str] = None,
+                pid: Optional[str] = None, tz: tzinfo = timezone.utc) -> LabelRow:
+    """Resolve a scan the way the app does: barcode fields first, label text
+    for whatever they lack. *pid* (e.g. from a GTIN lookup) overrides the OCR'd
+    one; *product_type* / *product_name* drive the serial and +11 day rules."""
+    gs1 = parse_gs1(barcode, tz) if barcode else _EMPTY
+    sn = gs1.sn or extract_sn(lines, product_type) or None
+    net_kg = gs1.weight if gs1.weight is not None else extract_kg(lines)
+    expiry = gs1.expiry or None
+    if not expiry:
+        expiry = extract_bb(lines, gs1.prod_date, tz)
+        if expiry and gs1.prod_date and expiry == gs1.prod_date and product_name:
+            name = product_name.lower()
+            if any(p in name for p in PACKED_PLUS_11_NAMES):
+                expiry += 11 * _DAY_MS
+    return LabelRow(pid or extract_pid(lines), gs1.gtin or None, sn, net_kg, expiry, gs1.prod_date)
+
+
+def parse_label_batch(labels: Iterable[dict], tz: tzinfo = timezone.utc) -> list[LabelRow]:
+    """`parse_label` over dicts with `lines` and optionally `type`, `name`,
+    `barcode` and `pid`."""
+    parse = parse_label
+    return [
+        parse(label.get('lines') or (), label.get('type'), label.get('name'),
+              label.get('barcode'), label.get('pid'), tz)
+        for label in labels
+    ]
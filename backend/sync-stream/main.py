@@ -1,12 +1,30 @@
+import startup
+startup.begin()
+
 import functions_framework
-import snowflake.connector
-import firebase_admin
-from firebase_admin import app_check
-from datetime import datetime, timezone
 from flask import Request, Response
-from typing import Optional
+from functools import partial
+from typing import Any, Callable, Optional
+import json
 import os
 import logging
+import threading
+
+from appcheck import AppCheckError, CachedVerifier
+from coalescer import Coalescer
+from columnar import table_to_json
+from content_encoding import UnsupportedEncoding, is_encoded, open_encoded_body
+from delta_sync import SyncConflict, ensure_tables, parse_last_pulled_at, pull, push
+from fingerprint import SalesFloorFingerprints, pid_key
+from idempotency import IdempotencyStore, idempotency_key
+from ingest import (
+    PayloadError, WriteGroup, dedupe_sales_floor, delete_rows, payload_tables, write_batch, write_rows,
+)
+from pool import SnowflakePool, is_connection_error
+from rollup import InventoryRollup
+from spool import Spool, SpoolEntry, SpoolFlusher
+from streaming import STREAM_PARSE_MIN_BYTES, use_streaming, write_stream
+import telemetry
 
 # ---------------------------------------------------------------
 # Configure structured logging — shows up clearly in GCP Cloud Logging
@@ -14,14 +32,45 @@ import logging
 logging.basicConfig(level=logging.INFO, format="%(levelname)s | %(message)s")
 log = logging.getLogger(__name__)
 
-# Initialize Firebase once (uses the function's service account automatically)
-log.info("Initializing Firebase Admin SDK...")
-firebase_admin.initialize_app()
-log.info("Firebase Admin SDK initialized successfully.")
+# ---------------------------------------------------------------
+# Heavy SDKs are loaded on first use, not at import: importing
+# snowflake.connector alone takes most of a second, and a cold start
+# pays for everything imported here. Set STARTUP_PROFILE=1 to log
+# where boot time goes (see startup.py).
+# ---------------------------------------------------------------
+_firebase_lock = threading.Lock()
+_app_check = None
+
+
+def get_app_check():
+    """firebase_admin.app_check, initialising Firebase once on first use
+    (uses the function's service account automatically)."""
+    global _app_check
+    if _app_check is None:
+        with _firebase_lock:
+            if _app_check is None:
+                with startup.phase('firebase_admin load + init'):
+                    import firebase_admin
+                    from firebase_admin import app_check
+                    log.info("Initializing Firebase Admin SDK...")
+                    firebase_admin.initialize_app()
+                    log.info("Firebase Admin SDK initialized successfully.")
+                _app_check = app_check
+    return _app_check
+
+
+# App Check results are cached per token until the token's `exp` — see appcheck.py.
+APP_CHECK_ENFORCE = os.environ.get('APP_CHECK_ENFORCE', '0') == '1'
+_APP_CHECK = CachedVerifier(
+    lambda token: get_app_check().verify_token(token),
+    max_size=int(os.environ.get('APP_CHECK_CACHE_SIZE', '10000')),
+    max_ttl_s=float(os.environ.get('APP_CHECK_CACHE_MAX_TTL_S', '3600')),
+    negative_ttl_s=float(os.environ.get('APP_CHECK_NEGATIVE_TTL_S', '10')),
+)
 
 
 def get_secret() -> str:
-    log.info("Fetching Snowflake password from environment variables...")
+    log.debug("Fetching Snowflake password from environment variables...")
     
     # If this env var contains the actual password string rather than a secret name,
     # we just return it directly! No need to call the Secret Manager API.
@@ -30,43 +79,131 @@ def get_secret() -> str:
     if not password:
         raise ValueError("Env var SNOWFLAKE_PASS_SECRET is missing or empty.")
 
-    log.info("Password fetched successfully from environment.")
+    log.debug("Password fetched successfully from environment.")
     return password
 
 
-def ms_to_timestamp(ms: Optional[int | float]) -> Optional[datetime]:
-    """
-    WatermelonDB stores dates as Unix milliseconds (integers).
-    Snowflake TIMESTAMP_NTZ expects a Python datetime.
-    Returns None if the value is None or 0 (optional fields).
-    """
-    if ms is None or ms == 0:
-        return None
-    return datetime.fromtimestamp(ms / 1000.0, tz=timezone.utc).replace(tzinfo=None)
+def connect_snowflake():
+    """Open a new Snowflake connection from env-var credentials."""
+    with startup.phase('snowflake.connector import'):
+        import snowflake.connector
+    return snowflake.connector.connect(
+        user=os.environ.get('SNOWFLAKE_USER'),
+        account=os.environ.get('SNOWFLAKE_ACCOUNT'),
+        password=get_secret(),
+        warehouse='COMPUTE_WH',
+        database='VIZCOUNT_DB',
+        schema='PUBLIC'
+    )
+
+
+# ---------------------------------------------------------------
+# Connection pool — lives at module level so warm instances reuse
+# sessions across invocations instead of re-handshaking per request.
+# ---------------------------------------------------------------
+_POOL = SnowflakePool(
+    connect_snowflake,
+    max_size=int(os.environ.get('SNOWFLAKE_POOL_SIZE', '4')),
+    validate_after_s=float(os.environ.get('SNOWFLAKE_POOL_VALIDATE_AFTER_S', '30')),
+    max_lifetime_s=float(os.environ.get('SNOWFLAKE_POOL_MAX_LIFETIME_S', '3600')),
+)
+
+# Idempotency-Key results: recent keys cached in-process, all keys in SYNC_LEDGER.
+_IDEMPOTENCY = IdempotencyStore(
+    max_size=int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', '10000')),
+    ttl_s=float(os.environ.get('IDEMPOTENCY_CACHE_TTL_S', '86400')),
+)
+
+# SALES_FLOOR rows identical to what the table already holds skip the
+# MERGE (see fingerprint.py). SALES_FLOOR_SKIP_UNCHANGED=0 turns this off.
+_FINGERPRINTS = SalesFloorFingerprints(
+    max_size=int(os.environ.get('SALES_FLOOR_FINGERPRINT_CACHE_SIZE', '50000')),
+    ttl_s=float(os.environ.get('SALES_FLOOR_FINGERPRINT_TTL_S', '300')),
+) if os.environ.get('SALES_FLOOR_SKIP_UNCHANGED', '1') == '1' else None
+
+# Per-PID totals kept in INVENTORY_ROLLUP by every ingest transaction, so
+# the dashboard can read one row per product (see rollup.py). Off by default
+# until the dashboard reads it: it makes every sync transactional (BEGIN /
+# COMMIT round trips) and adds one MERGE per ROLLUP_MERGE_CHUNK PIDs for
+# each table written (bench/bench_rollup.py measures the cost).
+# INVENTORY_ROLLUP=1 turns it on; over existing history, run rollup_check
+# with ?repair=1 once to backfill.
+_ROLLUP = InventoryRollup() if os.environ.get('INVENTORY_ROLLUP', '0') == '1' else None
+
+# ---------------------------------------------------------------
+# Async (write-behind) mode — payloads are spooled to local SQLite
+# and delivered by a background flusher. Opt in per request with
+# `Prefer: respond-async`, or for every request with SYNC_ASYNC_MODE=1.
+# The spool/flusher are created on first use.
+# ---------------------------------------------------------------
+SYNC_ASYNC_MODE = os.environ.get('SYNC_ASYNC_MODE', '0') == '1'
+SPOOL_PATH      = os.environ.get('SPOOL_PATH', '/tmp/vizcount-spool.db')
+
+# ---------------------------------------------------------------
+# Cross-request coalescing — off unless COALESCE_WINDOW_MS > 0.
+# Concurrent small requests are held for up to the window (or until
+# COALESCE_MAX_ROWS) and written together — see coalescer.py.
+# ---------------------------------------------------------------
+COALESCE_WINDOW_MS = float(os.environ.get('COALESCE_WINDOW_MS', '0'))
+_COALESCER = Coalescer(
+    lambda groups: _write_groups(groups),
+    window_s=COALESCE_WINDOW_MS / 1000,
+    max_rows=int(os.environ.get('COALESCE_MAX_ROWS', '2000')),
+) if COALESCE_WINDOW_MS > 0 else None
+
+_spool: Optional[Spool] = None
+_flusher: Optional[SpoolFlusher] = None
+_spool_lock = threading.Lock()
+
+# ---------------------------------------------------------------
+# Observability — one JSON log record per request plus in-process
+# Prometheus metrics at GET <function-url>/metrics (see telemetry.py).
+# Set METRICS_TOKEN to require `Authorization: Bearer <token>` there.
+# ---------------------------------------------------------------
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+startup.loaded()
 
 
 @functions_framework.http
-def stream_to_snowflake(request: Request) -> tuple[dict, int]:
-    log.info("=== Incoming request received ===")
-    log.info(f"Method: {request.method} | Content-Type: {request.content_type}")
+def stream_to_snowflake(request: Request) -> tuple[dict, int] | Response:
+    if _is_metrics_request(request):
+        return _metrics(request)
+    with startup.first_request():
+        return telemetry.traced('stream_to_snowflake', _handle, request)
+
+
+def _is_metrics_request(request: Request) -> bool:
+    return request.method == 'GET' and request.path.rstrip('/').endswith('/metrics')
+
+
+def _metrics(request: Request) -> Response:
+    if METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {METRICS_TOKEN}":
+        return Response("unauthorized\n", status=401, mimetype='text/plain')
+    return Response(telemetry.render(), mimetype='text/plain; version=0.0.4')
+
+
+def _handle(request: Request) -> tuple[dict, int]:
+    log.debug(f"Incoming {request.method} | Content-Type: {request.content_type}")
 
     # ---------------------------------------------------------------
     # 1. SECURITY: Verify App Check Token
-    # ⚠️  TEMPORARILY DISABLED FOR TESTING — re-enable before production!
+    # ⚠️  Off unless APP_CHECK_ENFORCE=1 — turn on before production!
+    # Results are cached per token until its `exp` (see appcheck.py).
     # ---------------------------------------------------------------
-    # app_check_token = request.headers.get('X-Firebase-AppCheck')
-    # log.info(f"App Check token present: {bool(app_check_token)}")
-    # try:
-    #     app_check.verify_token(app_check_token)
-    #     log.info("App Check token verified successfully.")
-    # except Exception as e:
-    #     log.warning(f"App Check verification FAILED: {e}")
-    #     return {"error": "Device verification failed"}, 401
+    denied = _check_app_check(request)
+    if denied is not None:
+        return denied
+
+    # Receipt status lookup for async-mode syncs: GET ?receipt=<id>
+    if request.method == 'GET':
+        return _receipt_status(request.args.get('receipt'))
 
     # ---------------------------------------------------------------
     # 2. GET DATA: Parse the JSON body sent from the app
     # Expected payload shape (keys match WatermelonDB field names):
     # {
+    #   "batch_id": "optional — same as the Idempotency-Key header",
     #   "scanned_items": [
     #     { "pid": 1234, "sn": 5678, "name": "...", "best_before_date": 1700000000000,
     #       "packed_on_date": 1700000000000, "net_kg": 2.5, "count": 10 }
@@ -76,15 +213,133 @@ def stream_to_snowflake(request: Request) -> tuple[dict, int]:
     #   ]
     # }
     # ---------------------------------------------------------------
-    log.info("Parsing request body...")
-    data = request.get_json(silent=True)
-    if not data:
-        log.error("Request body is missing or not valid JSON.")
-        return {"error": "Invalid or missing JSON body"}, 400
+    # Bodies of STREAM_PARSE_MIN_BYTES or more once decoded (or of unknown
+    # length) are walked incrementally and flushed in chunks instead — see
+    # streaming.py.
+    # ---------------------------------------------------------------
+    # Either table may instead be sent column-oriented — one array per field
+    # plus a row count (see columnar.py):
+    #   "scanned_items": { "rows": 2, "columns": { "pid": [1234, 1234], "sn": [5678, 5679], ... } }
+    # and the body may be sent with Content-Encoding: gzip or zstd.
+    # ---------------------------------------------------------------
+    try:
+        encoded = is_encoded(request.headers.get('Content-Encoding'))
+    except UnsupportedEncoding as e:
+        log.error(f"Rejecting request: {e}")
+        return {"error": str(e)}, 415
+
+    body, stream = None, None
+    if encoded:
+        try:
+            body, stream = open_encoded_body(
+                request.stream, request.headers['Content-Encoding'], STREAM_PARSE_MIN_BYTES,
+            )
+        except PayloadError as e:
+            log.error(f"Rejecting request: {e}")
+            return {"error": str(e)}, 400
+    elif use_streaming(request.content_length):
+        stream = request.stream
+
+    streaming = stream is not None
+    if streaming:
+        log.debug(f"Parsing request body in streaming mode ({request.content_length} bytes on the wire)...")
+        telemetry.note(mode='streaming')
+        data = {}
+        write = partial(write_stream, stream=stream, fingerprints=_FINGERPRINTS, rollup=_ROLLUP)
+    else:
+        with telemetry.span('parse'):
+            data = request.get_json(silent=True) if body is None else _parse_json(body)
+            if not data or not isinstance(data, dict):
+                log.error("Request body is missing or not valid JSON.")
+                return {"error": "Invalid or missing JSON body"}, 400
+
+            try:
+                scanned_items, sales_floor = payload_tables(data)
+            except PayloadError as e:
+                log.error(f"Rejecting request: {e}")
+                return {"error": str(e)}, 400
+        telemetry.note(rows_received={"scanned_items": len(scanned_items), "sales_floor": len(sales_floor)})
+        write = partial(
+            write_batch, scanned_items=scanned_items, sales_floor=sales_floor,
+            fingerprints=_FINGERPRINTS, rollup=_ROLLUP,
+        )
+
+    try:
+        idem_key = idempotency_key(request, data)
+    except ValueError as e:
+        log.error(f"Rejecting request: {e}")
+        return {"error": str(e)}, 400
+
+    if idem_key:
+        telemetry.note(idempotency_key=idem_key)
+
+    if not streaming and _wants_async(request):
+        return _accept_async(scanned_items, sales_floor, idem_key)
+
+    if _COALESCER is not None and not streaming:
+        dispatch = partial(_write_coalesced, WriteGroup(scanned_items, sales_floor, idem_key, check_ledger=True))
+    else:
+        dispatch = partial(_write_to_snowflake, write, idem_key, streaming=streaming)
+
+    if not idem_key:
+        return dispatch()
 
-    scanned_items = data.get('scanned_items', [])
-    sales_floor   = data.get('sales_floor', [])
-    log.info(f"Received {len(scanned_items)} scanned_items and {len(sales_floor)} sales_floor rows.")
+    # -----------------------------------------------------------
+    # Retries of the same batch: answer from cache/ledger, never re-insert.
+    # -----------------------------------------------------------
+    with _IDEMPOTENCY.guard(idem_key):
+        cached = _IDEMPOTENCY.cached(idem_key)
+        if cached is not None:
+            telemetry.note(replayed='cache')
+            return cached, 200
+        return dispatch()
+
+
+def _check_app_check(request: Request) -> Optional[tuple[dict, int]]:
+    """The 401 response if App Check is enforced and the token doesn't verify."""
+    if not APP_CHECK_ENFORCE:
+        return None
+    app_check_token = request.headers.get('X-Firebase-AppCheck')
+    log.debug(f"App Check token present: {bool(app_check_token)}")
+    try:
+        with telemetry.span('app_check'):
+            _APP_CHECK.verify(app_check_token)
+        log.debug("App Check token verified successfully.")
+    except AppCheckError as e:
+        log.warning(f"App Check verification FAILED: {e}")
+        return {"error": "Device verification failed"}, 401
+    return None
+
+
+def _parse_json(body: bytes) -> Any:
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def _write_coalesced(group: WriteGroup) -> tuple[dict, int]:
+    """Hand *group* to the coalescer and wait for its batch to be written."""
+    try:
+        result, batch_size = _COALESCER.submit(group)
+    except Exception as e:
+        log.exception(f"Error during coalesced Snowflake write: {e}")
+        return {"error": str(e)}, 500
+    telemetry.note(mode='coalesced', batch_size=batch_size)
+    return result, 200
+
+
+def _write_to_snowflake(
+    write: Callable[[Any], dict], idem_key: Optional[str] = None, streaming: bool = False,
+) -> tuple[dict, int]:
+    """Run *write(cur)* on a pooled connection and build the HTTP response.
+
+    Everything runs in one transaction when an idempotency key is present
+    (ingest + ledger row), when *write* streams the body (so a malformed
+    tail rolls back the chunks already flushed) or when INVENTORY_ROLLUP is
+    maintained (base rows + rollup).
+    """
+    transactional = idem_key is not None or streaming or _ROLLUP is not None
 
     # ---------------------------------------------------------------
     # 3. CONNECT to Snowflake
@@ -92,132 +347,337 @@ def stream_to_snowflake(request: Request) -> tuple[dict, int]:
     sf_user    = os.environ.get('SNOWFLAKE_USER')
     sf_account = os.environ.get('SNOWFLAKE_ACCOUNT')
 
-    log.info(f"Connecting to Snowflake — user: '{sf_user}', account: '{sf_account}'")
+    log.debug(f"Connecting to Snowflake — user: '{sf_user}', account: '{sf_account}'")
     if not sf_user or not sf_account:
         log.error("SNOWFLAKE_USER or SNOWFLAKE_ACCOUNT env var is missing!")
         return {"error": "Server misconfiguration: missing Snowflake credentials."}, 500
 
     try:
-        password = get_secret()
-    except Exception as e:
-        log.exception(f"Failed to retrieve Snowflake password from Secret Manager: {e}")
-        return {"error": f"Secret Manager error: {str(e)}"}, 500
-
-    try:
-        conn = snowflake.connector.connect(
-            user=sf_user,
-            account=sf_account,
-            password=password,
-            warehouse='COMPUTE_WH',
-            database='VIZCOUNT_DB',
-            schema='PUBLIC'
-        )
-        log.info("Snowflake connection established successfully.")
+        conn = _POOL.acquire()
+        log.debug("Snowflake connection acquired from pool.")
     except Exception as e:
         log.exception(f"Failed to connect to Snowflake: {e}")
         return {"error": f"Snowflake connection error: {str(e)}"}, 500
 
+    cur = None
+    broken = False
+    in_txn = False
     try:
         cur = conn.cursor()
 
-        # -----------------------------------------------------------
-        # 4a. INSERT into SCANNED_ITEMS
-        # Maps WatermelonDB field names → Snowflake column names:
-        #   pid              → PID
-        #   sn               → SN
-        #   name             → NAME
-        #   best_before_date → BEST_BEFORE_DATE  (ms → TIMESTAMP_NTZ)
-        #   packed_on_date   → PACKED_ON_DATE    (ms → TIMESTAMP_NTZ)
-        #   net_kg           → NET_KG
-        #   count            → ITEM_COUNT
-        # -----------------------------------------------------------
-        if scanned_items:
-            log.info(f"Preparing {len(scanned_items)} rows for SCANNED_ITEMS insert...")
-            scanned_rows = [
-                (
-                    row['pid'],
-                    row['sn'],
-                    row['name'],
-                    ms_to_timestamp(row.get('best_before_date')),
-                    ms_to_timestamp(row.get('packed_on_date')),
-                    row.get('net_kg'),
-                    row.get('count'),
-                )
-                for row in scanned_items
-            ]
-            log.info(f"Sample row to insert: {scanned_rows[0]}")
-            cur.executemany(
-                """
-                INSERT INTO SCANNED_ITEMS
-                    (PID, SN, NAME, BEST_BEFORE_DATE, PACKED_ON_DATE, NET_KG, ITEM_COUNT)
-                VALUES
-                    (%s, %s, %s, %s, %s, %s, %s)
-                """,
-                scanned_rows
-            )
-            log.info(f"Successfully inserted {len(scanned_rows)} rows into SCANNED_ITEMS.")
-        else:
-            log.info("No scanned_items to insert, skipping.")
+        if idem_key:
+            prior = _IDEMPOTENCY.lookup(cur, idem_key)
+            if prior is not None:
+                telemetry.note(replayed='ledger')
+                return prior, 200
+
+        if transactional:
+            if _ROLLUP is not None:
+                _ROLLUP.ensure_table(cur)
+            # Ingest + ledger row commit together, so a retry after a crash
+            # either sees the ledger row or finds nothing was written.
+            cur.execute("BEGIN")
+            in_txn = True
 
         # -----------------------------------------------------------
-        # 4b. UPSERT into SALES_FLOOR
-        # Maps WatermelonDB field names → Snowflake column names:
-        #   pid          → PID
-        #   name         → NAME
-        #   count        → CURRENT_COUNT
-        #   weight       → TOTAL_WEIGHT
-        #   expiry_date  → LATEST_EXPIRY      (ms → TIMESTAMP_NTZ)
-        # Uses MERGE so re-scanning the same PID updates, not duplicates.
+        # 4. WRITE: INSERT into SCANNED_ITEMS, MERGE into SALES_FLOOR
+        # (field mappings and strategies documented in ingest.py)
         # -----------------------------------------------------------
-        if sales_floor:
-            log.info(f"Processing {len(sales_floor)} rows for SALES_FLOOR upsert (MERGE)...")
-            for i, row in enumerate(sales_floor):
-                log.info(f"  Upserting SALES_FLOOR row {i+1}/{len(sales_floor)}: pid={row.get('pid')}, name={row.get('name')}")
-                cur.execute(
-                    """
-                    MERGE INTO SALES_FLOOR AS target
-                    USING (
-                        SELECT %s AS PID, %s AS NAME, %s AS CURRENT_COUNT,
-                               %s AS TOTAL_WEIGHT, %s AS LATEST_EXPIRY
-                    ) AS source
-                    ON target.PID = source.PID
-                    WHEN MATCHED THEN UPDATE SET
-                        NAME          = source.NAME,
-                        CURRENT_COUNT = source.CURRENT_COUNT,
-                        TOTAL_WEIGHT  = source.TOTAL_WEIGHT,
-                        LATEST_EXPIRY = source.LATEST_EXPIRY,
-                        UPDATED_AT    = CURRENT_TIMESTAMP()
-                    WHEN NOT MATCHED THEN INSERT
-                        (PID, NAME, CURRENT_COUNT, TOTAL_WEIGHT, LATEST_EXPIRY)
-                    VALUES
-                        (source.PID, source.NAME, source.CURRENT_COUNT,
-                         source.TOTAL_WEIGHT, source.LATEST_EXPIRY)
-                    """,
-                    (
-                        row['pid'],
-                        row['name'],
-                        row.get('count'),
-                        row.get('weight'),
-                        ms_to_timestamp(row.get('expiry_date')),
-                    )
-                )
-            log.info(f"Successfully upserted {len(sales_floor)} rows into SALES_FLOOR.")
-        else:
-            log.info("No sales_floor rows to upsert, skipping.")
-
-        result = {
-            "status": "success",
-            "scanned_items_written": len(scanned_items),
-            "sales_floor_upserted": len(sales_floor)
-        }
-        log.info(f"=== Request completed successfully: {result} ===")
+        result = write(cur)
+
+        if idem_key:
+            _IDEMPOTENCY.record(cur, idem_key, result)
+        if in_txn:
+            with telemetry.span('commit'):
+                cur.execute("COMMIT")
+            in_txn = False
+        if idem_key:
+            _IDEMPOTENCY.remember(idem_key, result)
+
         return result, 200
 
+    except PayloadError as e:
+        log.error(f"Rejecting request: {e}")
+        broken = in_txn and not _rollback(cur)
+        return {"error": str(e)}, 400
+
     except Exception as e:
         log.exception(f"Error during Snowflake write operations: {e}")
+        broken = is_connection_error(e) or (in_txn and not _rollback(cur))
         return {"error": str(e)}, 500
 
     finally:
-        cur.close()
-        conn.close()
-        log.info("Snowflake connection closed.")
\ No newline at end of file
+        if cur is not None:
+            cur.close()
+        _POOL.release(conn, broken=broken)
+        log.debug("Snowflake connection returned to pool.")
+
+
+# -------------------------------------------------------------------
+# Async mode: spool now, deliver in the background
+# -------------------------------------------------------------------
+def _wants_async(request: Request) -> bool:
+    return SYNC_ASYNC_MODE or 'respond-async' in request.headers.get('Prefer', '')
+
+
+def _get_spool(start_flusher: bool = True) -> tuple[Spool, SpoolFlusher]:
+    global _spool, _flusher
+    with _spool_lock:
+        if _spool is None:
+            _spool = Spool(SPOOL_PATH)
+            _flusher = SpoolFlusher(
+                _spool,
+                _deliver_spooled,
+                max_rows=int(os.environ.get('SPOOL_FLUSH_MAX_ROWS', '20000')),
+                interval_s=float(os.environ.get('SPOOL_FLUSH_INTERVAL_S', '1.0')),
+                max_attempts=int(os.environ.get('SPOOL_MAX_ATTEMPTS', '10')),
+            )
+        if start_flusher:
+            _flusher.start()
+        return _spool, _flusher
+
+
+def _accept_async(scanned_items, sales_floor, idem_key: Optional[str]) -> tuple[dict, int]:
+    if idem_key:
+        cached = _IDEMPOTENCY.cached(idem_key)
+        if cached is not None:
+            telemetry.note(replayed='cache')
+            return cached, 200
+
+    spool, flusher = _get_spool()
+    receipt = spool.enqueue(
+        {"scanned_items": table_to_json(scanned_items), "sales_floor": table_to_json(sales_floor)},
+        idem_key,
+    )
+    flusher.notify()
+    telemetry.note(mode='async', receipt=receipt)
+    return {"status": "accepted", "receipt": receipt}, 202
+
+
+def _receipt_status(receipt: Optional[str]) -> tuple[dict, int]:
+    if not receipt:
+        return {"error": "Missing 'receipt' query parameter."}, 400
+    # A status check alone never starts the flusher, nor creates a spool.
+    if _spool is None and not os.path.exists(SPOOL_PATH):
+        status = None
+    else:
+        status = _get_spool(start_flusher=False)[0].status(receipt)
+    if status is None:
+        return {"error": f"Unknown receipt '{receipt}'."}, 404
+    return status, 200
+
+
+def _deliver_spooled(entries: list[SpoolEntry]) -> dict[str, dict]:
+    """Spool flusher callback: write a claimed batch of receipts.
+
+    Every receipt is recorded in SYNC_LEDGER (under its idempotency key, or
+    `spool:<receipt>`). Receipts being retried, or redelivered after their
+    batch failed, are checked against the ledger first, so a batch that
+    committed just before a crash isn't written twice; so is every receipt
+    with a client Idempotency-Key, whose earlier delivery may have gone
+    through another instance or been purged from the spool.
+    """
+    groups = [
+        WriteGroup(*payload_tables(e.payload), idem_key=e.ledger_key,
+                   check_ledger=bool(e.idem_key) or e.redelivery)
+        for e in entries
+    ]
+    return dict(zip((e.id for e in entries), _write_groups(groups)))
+
+
+# -------------------------------------------------------------------
+# Multi-caller batches (coalescer + spool)
+# -------------------------------------------------------------------
+def _write_groups(groups: list[WriteGroup]) -> list[dict]:
+    """Write several callers' payloads as one batch in one transaction.
+
+    Returns one result per group, in order. Keyed groups get their ledger rows
+    in the same transaction; groups whose key is already in the ledger (when
+    check_ledger is set) get the recorded result and are not written.
+    """
+    unchanged: frozenset[str] = frozenset()
+    with _POOL.connection() as conn:
+        cur = conn.cursor()
+        try:
+            check = [g.idem_key for g in groups if g.idem_key and g.check_ledger]
+            prior = _IDEMPOTENCY.lookup_many(cur, check)
+            fresh = [g for g in groups if not (g.idem_key and g.idem_key in prior)]
+
+            # Skip unchanged SALES_FLOOR rows across the whole batch up front,
+            # so each group's result can report its own skipped PIDs.
+            converted = [g.converted() for g in fresh]
+            floor_rows = dedupe_sales_floor([row for _, floor in converted for row in floor.rows])
+            if _FINGERPRINTS is not None and floor_rows:
+                floor_rows, skipped = _FINGERPRINTS.split(cur, floor_rows)
+                unchanged = frozenset(pid_key(row) for row in skipped)
+            keyed = {g.idem_key: g.result(unchanged) for g in fresh if g.idem_key}
+
+            if fresh:
+                if keyed:
+                    _IDEMPOTENCY.ensure_ledger(cur)
+                if _ROLLUP is not None:
+                    _ROLLUP.ensure_table(cur)
+                cur.execute("BEGIN")
+                try:
+                    write_rows(
+                        cur, [row for scanned, _ in converted for row in scanned.rows], floor_rows,
+                        rollup=_ROLLUP,
+                    )
+                    if keyed:
+                        _IDEMPOTENCY.record_many(cur, keyed)
+                    cur.execute("COMMIT")
+                except BaseException:
+                    _rollback(cur)
+                    raise
+                if _FINGERPRINTS is not None:
+                    _FINGERPRINTS.remember(floor_rows)
+        finally:
+            cur.close()
+
+    for key, result in keyed.items():
+        _IDEMPOTENCY.remember(key, result)
+    return [
+        prior[g.idem_key] if g.idem_key in prior else g.result(unchanged)
+        for g in groups
+    ]
+
+
+def _rollback(cur) -> bool:
+    """Roll back the open transaction; False means the connection is suspect.
+
+    SALES_FLOOR fingerprints remembered inside the transaction may describe
+    rows that are now rolled back, so the fingerprint cache is dropped too.
+    """
+    if _FINGERPRINTS is not None:
+        _FINGERPRINTS.clear()
+    try:
+        cur.execute("ROLLBACK")
+        return True
+    except Exception as e:
+        log.warning(f"ROLLBACK failed: {e}")
+        return False
+
+
+# -------------------------------------------------------------------
+# Delta sync — WatermelonDB's synchronize() protocol (see delta_sync.py).
+# Deployed as a second entry point from the same source:
+#   GET  ?last_pulled_at=<ms|null>           → { changes, timestamp }
+#   POST { changes, lastPulledAt }           → apply the push (409 on conflict)
+# -------------------------------------------------------------------
+@functions_framework.http
+def sync_changes(request: Request) -> tuple[dict, int] | Response:
+    if _is_metrics_request(request):
+        return _metrics(request)
+    with startup.first_request():
+        return telemetry.traced('sync_changes', _handle_sync_changes, request)
+
+
+def _handle_sync_changes(request: Request) -> tuple[dict, int]:
+    denied = _check_app_check(request)
+    if denied is not None:
+        return denied
+    if request.method == 'GET':
+        return _pull_changes(request.args.get('last_pulled_at'))
+    with telemetry.span('parse'):
+        data = request.get_json(silent=True)
+    if not isinstance(data, dict) or 'changes' not in data:
+        log.error("Push body is missing or has no 'changes'.")
+        return {"error": "Invalid or missing JSON body"}, 400
+    return _push_changes(data['changes'], data.get('lastPulledAt', data.get('last_pulled_at')))
+
+
+def _pull_changes(raw_last_pulled_at: Optional[str]) -> tuple[dict, int]:
+    try:
+        last_pulled_at = parse_last_pulled_at(raw_last_pulled_at)
+        with _POOL.connection() as conn:
+            cur = conn.cursor()
+            try:
+                ensure_tables(cur)
+                with telemetry.span('pull'):
+                    result = pull(cur, last_pulled_at)
+            finally:
+                cur.close()
+    except PayloadError as e:
+        log.error(f"Rejecting pull: {e}")
+        return {"error": str(e)}, 400
+    except Exception as e:
+        log.exception(f"Error during delta pull: {e}")
+        return {"error": str(e)}, 500
+    telemetry.note(
+        mode='pull', last_pulled_at=last_pulled_at,
+        records_pulled={t: sum(len(v) for v in c.values()) for t, c in result["changes"].items()},
+    )
+    return result, 200
+
+
+def _push_changes(changes: Any, raw_last_pulled_at: Any) -> tuple[dict, int]:
+    try:
+        last_pulled_at = parse_last_pulled_at(raw_last_pulled_at)
+        with _POOL.connection() as conn:
+            cur = conn.cursor()
+            try:
+                ensure_tables(cur)
+                if _ROLLUP is not None:
+                    _ROLLUP.ensure_table(cur)
+                cur.execute("BEGIN")
+                try:
+                    result = push(
+                        cur, changes, last_pulled_at,
+                        forward=partial(write_rows, fingerprints=_FINGERPRINTS, rollup=_ROLLUP),
+                        remove=partial(delete_rows, fingerprints=_FINGERPRINTS, rollup=_ROLLUP),
+                    )
+                    with telemetry.span('commit'):
+                        cur.execute("COMMIT")
+                except BaseException:
+                    _rollback(cur)
+                    raise
+            finally:
+                cur.close()
+    except PayloadError as e:
+        log.error(f"Rejecting push: {e}")
+        return {"error": str(e)}, 400
+    except SyncConflict as e:
+        log.warning(f"Push conflict: {e}")
+        return {"error": str(e)}, 409
+    except Exception as e:
+        log.exception(f"Error during delta push: {e}")
+        return {"error": str(e)}, 500
+    telemetry.note(mode='push', last_pulled_at=last_pulled_at, records_pushed=result["changes"])
+    return result, 200
+
+
+# -------------------------------------------------------------------
+# INVENTORY_ROLLUP consistency check — a third entry point, meant for
+# Cloud Scheduler. Recomputes the rollup from the base tables and reports
+# drift; ?repair=1 (or POST) rebuilds the rollup when anything drifted.
+# Requires `Authorization: Bearer $ROLLUP_CHECK_TOKEN` when that is set.
+# -------------------------------------------------------------------
+ROLLUP_CHECK_TOKEN = os.environ.get('ROLLUP_CHECK_TOKEN')
+
+
+@functions_framework.http
+def rollup_check(request: Request) -> tuple[dict, int] | Response:
+    with startup.first_request():
+        return telemetry.traced('rollup_check', _handle_rollup_check, request)
+
+
+def _handle_rollup_check(request: Request) -> tuple[dict, int]:
+    if ROLLUP_CHECK_TOKEN and request.headers.get('Authorization') != f"Bearer {ROLLUP_CHECK_TOKEN}":
+        return {"error": "unauthorized"}, 401
+    repair = request.method == 'POST' or request.args.get('repair') == '1'
+    rollup = _ROLLUP or InventoryRollup()
+    try:
+        with _POOL.connection() as conn:
+            cur = conn.cursor()
+            try:
+                with telemetry.span('rollup_check'):
+                    report = rollup.check_and_repair(cur, repair=repair)
+            finally:
+                cur.close()
+    except Exception as e:
+        log.exception(f"Error during rollup check: {e}")
+        return {"error": str(e)}, 500
+    telemetry.note(
+        mode='rollup_check', pids_drifted=report["pids_drifted"], repaired=report["repaired"],
+    )
+    return report, 200
@@ -0,0 +1,167 @@
+"""
+Module-level Snowflake connection pool for the sync-stream Cloud Function.
+
+A warm Cloud Functions instance handles many requests, so opening a fresh
+connection per request pays the TLS + auth handshake every time. The pool keeps
+idle connections around between invocations and hands them out one per
+request, which makes it safe when the function runs with concurrency > 1.
+
+Connections are validated before use:
+  • closed connections are dropped
+  • connections older than `max_lifetime_s` are recycled
+  • connections idle longer than `validate_after_s` are pinged with SELECT 1
+    (this is what catches expired sessions — the ping fails and we reconnect)
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+import telemetry
+
+log = logging.getLogger(__name__)
+
+# Snowflake error numbers meaning the session/token behind a connection is gone.
+SESSION_EXPIRED_ERRNOS = frozenset({390111, 390112, 390114})
+
+
+def is_connection_error(exc: BaseException) -> bool:
+    """True when *exc* means the connection itself is unusable (not a bad query)."""
+    if getattr(exc, 'errno', None) in SESSION_EXPIRED_ERRNOS:
+        return True
+    return type(exc).__name__ in ('OperationalError', 'InterfaceError')
+
+
+class SnowflakePool:
+    """Thread-safe LIFO pool of Snowflake connections.
+
+    `connect` is any zero-argument callable returning a DB-API connection
+    (normally a closure around `snowflake.connector.connect`). At most
+    `max_size` idle connections are kept; extra connections opened under a
+    burst are closed on release instead of being pooled.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_size: int = 4,
+        validate_after_s: float = 30.0,
+        max_lifetime_s: float = 3600.0,
+    ):
+        self._connect = connect
+        self._max_size = max_size
+        self._validate_after_s = validate_after_s
+        self._max_lifetime_s = max_lifetime_s
+        self._lock = threading.Lock()
+        # Each idle entry: (conn, created_at, last_used_at)
+        self._idle: list[tuple[Any, float, float]] = []
+        self._created: dict[int, float] = {}
+
+    # -----------------------------------------------------------------
+    # Borrow / return
+    # -----------------------------------------------------------------
+    def acquire(self) -> Any:
+        """Return a validated connection, reusing an idle one when possible."""
+        with telemetry.span('connect'):
+            return self._acquire()
+
+    def _acquire(self) -> Any:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, created_at, last_used_at = self._idle.pop()
+
+            now = time.monotonic()
+            if self._is_closed(conn):
+                log.info("Pool: dropping closed connection.")
+                self._discard(conn)
+                continue
+            if now - created_at > self._max_lifetime_s:
+                log.info("Pool: recycling connection past max lifetime.")
+                self._discard(conn)
+                continue
+            if now - last_used_at > self._validate_after_s and not self._ping(conn):
+                log.info("Pool: idle connection failed validation, reconnecting.")
+                self._discard(conn)
+                continue
+            return conn
+
+        log.info("Pool: opening new Snowflake connection.")
+        conn = self._connect()
+        with self._lock:
+            self._created[id(conn)] = time.monotonic()
+        return conn
+
+    def release(self, conn: Any, broken: bool = False) -> None:
+        """Return *conn* to the pool, or close it if broken / pool is full."""
+        if broken or self._is_closed(conn):
+            self._discard(conn)
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._idle) < self._max_size:
+                created_at = self._created.get(id(conn), now)
+                self._idle.append((conn, created_at, now))
+                return
+        self._discard(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """`with pool.connection() as conn:` — returns the connection on exit.
+
+        If the block raises a connection-level error (expired session, network
+        drop) the connection is discarded instead of being pooled again.
+        """
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except BaseException as e:
+            broken = is_connection_error(e)
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    def close_all(self) -> None:
+        """Close every idle connection (used by benchmarks and shutdown)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _, _ in idle:
+            self._discard(conn)
+
+    @property
+    def idle_count(self) -> int:
+        with self._lock:
+            return len(self._idle)
+
+    # -----------------------------------------------------------------
+    # Helpers
+    # -----------------------------------------------------------------
+    @staticmethod
+    def _is_closed(conn: Any) -> bool:
+        is_closed = getattr(conn, 'is_closed', None)
+        return bool(is_closed()) if callable(is_closed) else False
+
+    @staticmethod
+    def _ping(conn: Any) -> bool:
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT 1")
+                cur.fetchone()
+            finally:
+                cur.close()
+            return True
+        except Exception as e:
+            log.warning(f"Pool: validation ping failed: {e}")
+            return False
+
+    def _discard(self, conn: Any) -> None:
+        with self._lock:
+            self._created.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass  # already dead — nothing else to clean up
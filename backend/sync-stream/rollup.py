@@ -0,0 +1,285 @@
+"""
+Per-PID inventory rollup, maintained at ingest time.
+
+The dashboard's inventory view re-aggregates all of SCANNED_ITEMS and
+SALES_FLOOR on every refresh, so it costs more the longer history gets.
+INVENTORY_ROLLUP holds the same figures with one row per PID:
+
+  • COOLER_COUNT / COOLER_NET_KG  – SUM(ITEM_COUNT) / SUM(NET_KG) of SCANNED_ITEMS
+  • COOLER_MIN_EXPIRY             – MIN(BEST_BEFORE_DATE) of SCANNED_ITEMS
+  • FLOOR_COUNT / FLOOR_WEIGHT / FLOOR_EXPIRY – the PID's SALES_FLOOR row
+
+and is updated in the same transaction as the rows it summarises:
+
+  • scanned items only ever append, so each batch adds its per-PID totals
+    and can only lower the min expiry — one MERGE per chunk of PIDs
+  • a SALES_FLOOR MERGE replaces the PID's row, so the floor columns take
+    the new values (the same as applying new − old, without reading old)
+  • records deleted by a delta-sync push (ingest.delete_rows) cannot be
+    subtracted — the min expiry they set is gone — so those PIDs' rows are
+    recomputed from the base tables
+
+Reading it is O(products) rows:
+
+    SELECT PID, COOLER_COUNT, FLOOR_COUNT, COOLER_NET_KG,
+           COALESCE(FLOOR_EXPIRY, COOLER_MIN_EXPIRY) AS EXPIRY
+    FROM INVENTORY_ROLLUP
+
+`check()` recomputes the rollup from the base tables in one statement (so
+both sides are the same snapshot) and reports every PID and column that
+drifted; `rebuild()` replaces the table with the recomputed rows. main.py
+serves both as the rollup_check entry point, for a scheduled job.
+
+All SQL is MERGE / SELECT / INSERT with `%s` binds and no Snowflake-only
+syntax, so it also runs on DuckDB (see bench/bench_rollup.py).
+"""
+import logging
+import os
+from functools import lru_cache
+from typing import Any
+
+import telemetry
+from fingerprint import pid_key
+
+log = logging.getLogger(__name__)
+
+# Max PIDs per rollup MERGE.
+ROLLUP_MERGE_CHUNK = int(os.environ.get('ROLLUP_MERGE_CHUNK', '1000'))
+
+# Float sums drift by rounding when added up in a different order.
+ROLLUP_KG_TOLERANCE = float(os.environ.get('ROLLUP_KG_TOLERANCE', '0.001'))
+
+# Cap on drifted values listed in a check report (all are counted).
+MAX_REPORTED_DRIFT = 100
+
+ROLLUP_DDL = """
+    CREATE TABLE IF NOT EXISTS INVENTORY_ROLLUP (
+        PID               VARCHAR NOT NULL PRIMARY KEY,
+        COOLER_COUNT      BIGINT NOT NULL,
+        COOLER_NET_KG     DOUBLE NOT NULL,
+        COOLER_MIN_EXPIRY TIMESTAMP,
+        FLOOR_COUNT       BIGINT NOT NULL,
+        FLOOR_WEIGHT      DOUBLE NOT NULL,
+        FLOOR_EXPIRY      TIMESTAMP,
+        UPDATED_AT        TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+ROLLUP_COLUMNS = (
+    'COOLER_COUNT', 'COOLER_NET_KG', 'COOLER_MIN_EXPIRY', 'FLOOR_COUNT', 'FLOOR_WEIGHT', 'FLOOR_EXPIRY',
+)
+
+# What the rollup should hold, straight from the base tables.
+ROLLUP_BASE_SQL = """
+    SELECT COALESCE(s.PID, f.PID)          AS PID,
+           COALESCE(s.ITEM_COUNT, 0)       AS COOLER_COUNT,
+           COALESCE(s.NET_KG, 0)           AS COOLER_NET_KG,
+           s.MIN_EXPIRY                    AS COOLER_MIN_EXPIRY,
+           COALESCE(f.CURRENT_COUNT, 0)    AS FLOOR_COUNT,
+           COALESCE(f.TOTAL_WEIGHT, 0)     AS FLOOR_WEIGHT,
+           f.LATEST_EXPIRY                 AS FLOOR_EXPIRY
+    FROM (
+        SELECT CAST(PID AS VARCHAR) AS PID, SUM(ITEM_COUNT) AS ITEM_COUNT,
+               SUM(NET_KG) AS NET_KG, MIN(BEST_BEFORE_DATE) AS MIN_EXPIRY
+        FROM SCANNED_ITEMS
+        GROUP BY CAST(PID AS VARCHAR)
+    ) AS s
+    FULL OUTER JOIN (
+        SELECT CAST(PID AS VARCHAR) AS PID, CURRENT_COUNT, TOTAL_WEIGHT, LATEST_EXPIRY
+        FROM SALES_FLOOR
+    ) AS f ON s.PID = f.PID
+"""
+
+ROLLUP_CHECK_SQL = f"""
+    SELECT COALESCE(b.PID, r.PID),
+           {', '.join(f'b.{c}' for c in ROLLUP_COLUMNS)},
+           {', '.join(f'r.{c}' for c in ROLLUP_COLUMNS)},
+           b.PID IS NOT NULL, r.PID IS NOT NULL
+    FROM ({ROLLUP_BASE_SQL}) AS b
+    FULL OUTER JOIN INVENTORY_ROLLUP AS r ON b.PID = r.PID
+"""
+
+ROLLUP_REBUILD_SQL = f"""
+    INSERT INTO INVENTORY_ROLLUP (PID, {', '.join(ROLLUP_COLUMNS)})
+    SELECT PID, {', '.join(ROLLUP_COLUMNS)} FROM ({ROLLUP_BASE_SQL}) AS b
+"""
+
+# ROLLUP_REBUILD_SQL for some PIDs; format with the `IN (...)` placeholders.
+ROLLUP_RECOMPUTE_SQL = ROLLUP_REBUILD_SQL.rstrip() + "\n    WHERE b.PID IN ({})\n"
+
+
+@lru_cache(maxsize=32)
+def _cooler_merge_sql(n_rows: int) -> str:
+    values = ",\n            ".join(["(%s, %s, %s, %s)"] * n_rows)
+    return f"""
+    MERGE INTO INVENTORY_ROLLUP AS target
+    USING (
+        SELECT * FROM (VALUES
+            {values}
+        ) AS v (PID, ITEM_COUNT, NET_KG, MIN_EXPIRY)
+    ) AS source
+    ON target.PID = source.PID
+    WHEN MATCHED THEN UPDATE SET
+        COOLER_COUNT      = target.COOLER_COUNT + source.ITEM_COUNT,
+        COOLER_NET_KG     = target.COOLER_NET_KG + source.NET_KG,
+        COOLER_MIN_EXPIRY = COALESCE(LEAST(target.COOLER_MIN_EXPIRY, source.MIN_EXPIRY),
+                                     target.COOLER_MIN_EXPIRY, source.MIN_EXPIRY),
+        UPDATED_AT        = CURRENT_TIMESTAMP
+    WHEN NOT MATCHED THEN INSERT
+        (PID, COOLER_COUNT, COOLER_NET_KG, COOLER_MIN_EXPIRY, FLOOR_COUNT, FLOOR_WEIGHT)
+    VALUES
+        (source.PID, source.ITEM_COUNT, source.NET_KG, source.MIN_EXPIRY, 0, 0)
+    """
+
+
+@lru_cache(maxsize=32)
+def _floor_merge_sql(n_rows: int) -> str:
+    values = ",\n            ".join(["(%s, %s, %s, %s)"] * n_rows)
+    return f"""
+    MERGE INTO INVENTORY_ROLLUP AS target
+    USING (
+        SELECT * FROM (VALUES
+            {values}
+        ) AS v (PID, CURRENT_COUNT, TOTAL_WEIGHT, LATEST_EXPIRY)
+    ) AS source
+    ON target.PID = source.PID
+    WHEN MATCHED THEN UPDATE SET
+        FLOOR_COUNT  = source.CURRENT_COUNT,
+        FLOOR_WEIGHT = source.TOTAL_WEIGHT,
+        FLOOR_EXPIRY = source.LATEST_EXPIRY,
+        UPDATED_AT   = CURRENT_TIMESTAMP
+    WHEN NOT MATCHED THEN INSERT
+        (PID, COOLER_COUNT, COOLER_NET_KG, FLOOR_COUNT, FLOOR_WEIGHT, FLOOR_EXPIRY)
+    VALUES
+        (source.PID, 0, 0, source.CURRENT_COUNT, source.TOTAL_WEIGHT, source.LATEST_EXPIRY)
+    """
+
+
+def cooler_increments(rows: list[tuple]) -> list[tuple]:
+    """`(pid, count, net_kg, min_expiry)` per PID for converted SCANNED_ITEMS tuples."""
+    totals: dict[str, list] = {}
+    for row in rows:
+        _, _, _, best_before, _, net_kg, count = row
+        key = pid_key(row)
+        t = totals.get(key)
+        if t is None:
+            totals[key] = [count or 0, net_kg or 0, best_before]
+            continue
+        t[0] += count or 0
+        t[1] += net_kg or 0
+        if best_before is not None and (t[2] is None or best_before < t[2]):
+            t[2] = best_before
+    return [(pid, *t) for pid, t in totals.items()]
+
+
+def _merge(cur, sql_for, rows: list[tuple], chunk_size: int) -> None:
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        cur.execute(sql_for(len(chunk)), tuple(v for row in chunk for v in row))
+
+
+class InventoryRollup:
+    """Writes and checks INVENTORY_ROLLUP (one instance per process)."""
+
+    def __init__(self, chunk_size: int = ROLLUP_MERGE_CHUNK, kg_tolerance: float = ROLLUP_KG_TOLERANCE):
+        self.chunk_size = chunk_size
+        self.kg_tolerance = kg_tolerance
+        self._ready = False
+
+    def ensure_table(self, cur) -> None:
+        """Create INVENTORY_ROLLUP once per instance. DDL commits implicitly
+        in Snowflake, so call this before opening a transaction."""
+        if not self._ready:
+            cur.execute(ROLLUP_DDL)
+            self._ready = True
+
+    def add_scanned(self, cur, rows: list[tuple]) -> int:
+        """Add inserted SCANNED_ITEMS tuples to the cooler columns; returns PIDs touched."""
+        increments = cooler_increments(rows)
+        with telemetry.span('rollup'):
+            _merge(cur, _cooler_merge_sql, increments, self.chunk_size)
+        return len(increments)
+
+    def set_floor(self, cur, rows: list[tuple]) -> int:
+        """Copy merged (deduplicated) SALES_FLOOR tuples into the floor columns."""
+        values = [(pid_key(row), row[2] or 0, row[3] or 0, row[4]) for row in rows]
+        with telemetry.span('rollup'):
+            _merge(cur, _floor_merge_sql, values, self.chunk_size)
+        return len(values)
+
+    def recompute(self, cur, pids: list[str]) -> int:
+        """Replace the rows of *pids* with figures recomputed from the base
+        tables, in the caller's transaction; returns the PIDs touched."""
+        keys = sorted(set(pids))
+        with telemetry.span('rollup'):
+            for start in range(0, len(keys), self.chunk_size):
+                chunk = tuple(keys[start:start + self.chunk_size])
+                marks = ", ".join(["%s"] * len(chunk))
+                cur.execute(f"DELETE FROM INVENTORY_ROLLUP WHERE PID IN ({marks})", chunk)
+                cur.execute(ROLLUP_RECOMPUTE_SQL.format(marks), chunk)
+        return len(keys)
+
+    def check(self, cur) -> dict:
+        """Compare the rollup with the base tables; returns the drift report."""
+        cur.execute(ROLLUP_CHECK_SQL, ())
+        rows = cur.fetchall()
+        n = len(ROLLUP_COLUMNS)
+        drift: list[dict] = []
+        drifted_pids = set()
+        for row in rows:
+            pid, expected, actual, in_base, in_rollup = row[0], row[1:1 + n], row[1 + n:1 + 2 * n], *row[-2:]
+            if not (in_base and in_rollup):
+                drifted_pids.add(pid)
+                drift.append({"pid": pid, "column": "*",
+                              "problem": "missing from rollup" if in_base else "not in base tables"})
+                continue
+            for column, want, got in zip(ROLLUP_COLUMNS, expected, actual):
+                if not self._same(column, want, got):
+                    drifted_pids.add(pid)
+                    drift.append({"pid": pid, "column": column, "rollup": got, "expected": want})
+        report = {
+            "pids_checked": len(rows),
+            "pids_drifted": len(drifted_pids),
+            "values_drifted": len(drift),
+            "drift": drift[:MAX_REPORTED_DRIFT],
+        }
+        if drift:
+            log.warning(f"INVENTORY_ROLLUP drift: {len(drift)} values across {len(drifted_pids)} PIDs.")
+        return report
+
+    def _same(self, column: str, want: Any, got: Any) -> bool:
+        if want is None or got is None:
+            return want is None and got is None
+        if column in ('COOLER_NET_KG', 'FLOOR_WEIGHT'):
+            return abs(float(want) - float(got)) <= self.kg_tolerance
+        if column in ('COOLER_COUNT', 'FLOOR_COUNT'):
+            return float(want) == float(got)
+        return want == got
+
+    def check_and_repair(self, cur, repair: bool = False) -> dict:
+        """The consistency job: check, and with *repair* rebuild if anything drifted."""
+        self.ensure_table(cur)
+        report = self.check(cur)
+        report["repaired"] = False
+        if repair and report["values_drifted"]:
+            report["pids_rebuilt"] = self.rebuild(cur)
+            report["repaired"] = True
+        return report
+
+    def rebuild(self, cur) -> int:
+        """Replace the rollup with rows recomputed from the base tables, in
+        one transaction; returns the number of PIDs written."""
+        self.ensure_table(cur)
+        cur.execute("BEGIN")
+        try:
+            cur.execute("DELETE FROM INVENTORY_ROLLUP")
+            cur.execute(ROLLUP_REBUILD_SQL)
+            cur.execute("SELECT COUNT(*) FROM INVENTORY_ROLLUP")
+            written = cur.fetchone()[0]
+            cur.execute("COMMIT")
+        except BaseException:
+            cur.execute("ROLLBACK")
+            raise
+        log.info(f"Rebuilt INVENTORY_ROLLUP: {written} PIDs.")
+        return written
+
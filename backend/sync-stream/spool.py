@@ -0,0 +1,298 @@
+"""
+Write-behind spool: accept sync payloads in milliseconds, deliver to
+Snowflake in the background.
+
+In async mode the handler checks the payload's shape, appends it to a local SQLite
+database (WAL mode, synchronous=FULL) and returns 202 with a receipt id. A
+single background flusher thread drains the spool: it claims the oldest
+queued receipts up to a row budget, hands them to a `deliver` callable as one
+coalesced batch, and marks them done — or re-queues them with exponential
+backoff if delivery fails. A failed batch is bisected on the spot, and a
+receipt that has failed a delivery is retried on its own, so one receipt the
+warehouse rejects fails alone instead of taking the receipts it was
+coalesced with to 'failed'. Delivery is at-least-once; main.py records every
+receipt in SYNC_LEDGER inside the delivery transaction so a redelivered
+receipt is detected and not written twice.
+
+Receipt states: queued → flushing → done | failed (after SPOOL_MAX_ATTEMPTS).
+
+Durability is per instance: the spool survives process restarts on the same
+disk, but on Cloud Functions /tmp is instance memory, so point SPOOL_PATH at
+a persistent volume (and keep CPU allocated outside requests) for the
+flusher to make progress between requests.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS receipts (
+    seq             INTEGER PRIMARY KEY AUTOINCREMENT,
+    id              TEXT NOT NULL UNIQUE,
+    idem_key        TEXT UNIQUE,
+    payload         TEXT,
+    row_count       INTEGER NOT NULL,
+    status          TEXT NOT NULL DEFAULT 'queued',
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    result          TEXT,
+    error           TEXT,
+    created_at      REAL NOT NULL,
+    updated_at      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS receipts_queue ON receipts (status, next_attempt_at, seq);
+"""
+
+
+@dataclass
+class SpoolEntry:
+    id: str
+    idem_key: Optional[str]
+    payload: dict
+    attempts: int
+    bisected: bool = False     # redelivered after its batch failed in this flush
+
+    @property
+    def ledger_key(self) -> str:
+        """Key this receipt is recorded under in SYNC_LEDGER."""
+        return self.idem_key or f"spool:{self.id}"
+
+    @property
+    def redelivery(self) -> bool:
+        """An earlier delivery of this receipt failed, possibly after its COMMIT."""
+        return self.attempts > 0 or self.bisected
+
+
+class Spool:
+    """SQLite-backed queue of accepted-but-undelivered payloads."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.executescript(_SCHEMA)
+        # Anything mid-flush when the process died may or may not have reached
+        # Snowflake — re-queue it as a retry so the ledger gets checked first.
+        with self._lock:
+            self._db.execute(
+                "UPDATE receipts SET status = 'queued', attempts = attempts + 1 "
+                "WHERE status = 'flushing'"
+            )
+
+    def enqueue(self, payload: dict, idem_key: Optional[str] = None) -> str:
+        """Durably append *payload*; returns its receipt id.
+
+        A payload whose idempotency key is already spooled is not added twice —
+        the existing receipt id is returned instead.
+        """
+        now = time.time()
+        receipt = uuid.uuid4().hex
+        rows = len(payload.get('scanned_items', [])) + len(payload.get('sales_floor', []))
+        with self._lock:
+            if idem_key:
+                existing = self._db.execute(
+                    "SELECT id FROM receipts WHERE idem_key = ?", (idem_key,)
+                ).fetchone()
+                if existing:
+                    return existing[0]
+            self._db.execute(
+                "INSERT INTO receipts (id, idem_key, payload, row_count, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (receipt, idem_key, json.dumps(payload), rows, now, now),
+            )
+        return receipt
+
+    def claim(self, max_rows: int) -> list[SpoolEntry]:
+        """Mark the oldest due receipts as flushing, up to *max_rows* rows total
+        (always at least one receipt, however large).
+
+        A receipt that already failed a delivery is claimed alone, and a batch
+        of fresh receipts stops before one.
+        """
+        now = time.time()
+        with self._lock:
+            candidates = self._db.execute(
+                "SELECT id, idem_key, payload, attempts, row_count FROM receipts "
+                "WHERE status = 'queued' AND next_attempt_at <= ? ORDER BY seq",
+                (now,),
+            )
+            entries, total = [], 0
+            for rid, idem_key, payload, attempts, row_count in candidates:
+                if entries and (attempts or total + row_count > max_rows):
+                    break
+                entries.append(SpoolEntry(rid, idem_key, json.loads(payload), attempts))
+                total += row_count
+                if attempts:
+                    break
+            self._db.executemany(
+                "UPDATE receipts SET status = 'flushing', updated_at = ? WHERE id = ?",
+                [(now, e.id) for e in entries],
+            )
+        return entries
+
+    def mark_done(self, results: dict[str, dict]) -> None:
+        """Record each receipt's result and drop its payload."""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "UPDATE receipts SET status = 'done', payload = NULL, result = ?, "
+                "error = NULL, updated_at = ? WHERE id = ?",
+                [(json.dumps(result), now, rid) for rid, result in results.items()],
+            )
+
+    def mark_retry(self, entries: list[SpoolEntry], error: str, backoff_s: float, max_attempts: int) -> None:
+        """Re-queue *entries* after *backoff_s*, or fail those out of attempts."""
+        now = time.time()
+        with self._lock:
+            for e in entries:
+                attempts = e.attempts + 1
+                status = 'failed' if attempts >= max_attempts else 'queued'
+                self._db.execute(
+                    "UPDATE receipts SET status = ?, attempts = ?, next_attempt_at = ?, "
+                    "error = ?, updated_at = ? WHERE id = ?",
+                    (status, attempts, now + backoff_s, error, now, e.id),
+                )
+
+    def status(self, receipt: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, attempts, result, error, created_at, updated_at "
+                "FROM receipts WHERE id = ?", (receipt,),
+            ).fetchone()
+        if row is None:
+            return None
+        status, attempts, result, error, created_at, updated_at = row
+        return {
+            "receipt": receipt,
+            "status": status,
+            "attempts": attempts,
+            "result": json.loads(result) if result else None,
+            "error": error,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM receipts WHERE status IN ('queued', 'flushing')"
+            ).fetchone()[0]
+
+    def purge_done(self, older_than_s: float) -> int:
+        with self._lock:
+            return self._db.execute(
+                "DELETE FROM receipts WHERE status = 'done' AND updated_at < ?",
+                (time.time() - older_than_s,),
+            ).rowcount
+
+
+class SpoolFlusher:
+    """Background thread that drains a Spool through *deliver*.
+
+    `deliver(entries)` writes the coalesced batch and returns a result dict per
+    receipt id. A batch that raises is bisected (see `_bisect`); receipts
+    that are re-queued with backoff are then retried one at a time (see
+    Spool.claim).
+    """
+
+    def __init__(
+        self,
+        spool: Spool,
+        deliver: Callable[[list[SpoolEntry]], dict[str, dict]],
+        max_rows: int = 20000,
+        interval_s: float = 1.0,
+        max_attempts: int = 10,
+        backoff_base_s: float = 2.0,
+        backoff_max_s: float = 300.0,
+        retention_s: float = 86400.0,
+    ):
+        self._spool = spool
+        self._deliver = deliver
+        self._max_rows = max_rows
+        self._interval_s = interval_s
+        self._max_attempts = max_attempts
+        self._backoff_base_s = backoff_base_s
+        self._backoff_max_s = backoff_max_s
+        self._retention_s = retention_s
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="spool-flusher", daemon=True)
+                self._thread.start()
+
+    def notify(self) -> None:
+        """Wake the flusher early (a new payload was just spooled)."""
+        self._wake.set()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def flush_once(self) -> int:
+        """Deliver one coalesced batch; returns how many receipts it covered."""
+        entries = self._spool.claim(self._max_rows)
+        if not entries:
+            return 0
+        error = self._attempt(entries)
+        return len(entries) if error is None else self._bisect(entries, error)
+
+    def _attempt(self, entries: list[SpoolEntry]) -> Optional[Exception]:
+        """Deliver *entries* and mark them done; returns the error instead of raising."""
+        try:
+            results = self._deliver(entries)
+        except Exception as e:
+            return e
+        self._spool.mark_done(results)
+        log.info(f"Spool: delivered {len(entries)} receipts.")
+        return None
+
+    def _bisect(self, entries: list[SpoolEntry], error: Exception) -> int:
+        """*entries* failed together with *error*: deliver each half on its own,
+        and keep splitting a half that fails while the other goes through, so
+        a receipt the warehouse rejects ends up failing alone. When both halves
+        fail the cause is likely not the data (e.g. the warehouse is down), so
+        the batch is re-queued with backoff. Returns receipts delivered."""
+        if len(entries) > 1:
+            for entry in entries:
+                entry.bisected = True
+            mid = len(entries) // 2
+            halves = entries[:mid], entries[mid:]
+            errors = [self._attempt(half) for half in halves]
+            if not all(errors):
+                return sum(len(half) if err is None else self._bisect(half, err)
+                           for half, err in zip(halves, errors))
+        attempts = min(entry.attempts for entry in entries)
+        backoff = min(self._backoff_max_s, self._backoff_base_s * (2 ** attempts))
+        log.warning(f"Spool: delivery of {len(entries)} receipts failed, retrying in {backoff:.0f}s: {error}")
+        self._spool.mark_retry(entries, str(error), backoff, self._max_attempts)
+        return 0
+
+    def _run(self) -> None:
+        last_purge = 0.0
+        while not self._stop.is_set():
+            try:
+                while self.flush_once():
+                    pass
+                if time.time() - last_purge > 3600:
+                    self._spool.purge_done(self._retention_s)
+                    last_purge = time.time()
+            except Exception as e:
+                log.exception(f"Spool: flusher error: {e}")
+            self._wake.wait(self._interval_s)
+            self._wake.clear()
@@ -0,0 +1,128 @@
+"""
+Cold-start profiling for the sync function.
+
+A scale-from-zero request pays for everything main.py does at import time
+plus whatever the first request loads lazily (the Snowflake connector, the
+Firebase SDK). With STARTUP_PROFILE=1 this module records:
+
+  • every module imported while main.py loads, with cumulative and self
+    time (an `__import__` hook, like `python -X importtime` but in-process,
+    so it works under functions-framework on Cloud Functions)
+  • named phases — the module import as a whole and each lazy SDK load
+  • the first request, end to end
+
+and logs one `startup profile:` JSON line when the first request finishes.
+Off by default: the hook adds a little overhead to every import.
+"""
+import builtins
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+log = logging.getLogger(__name__)
+
+STARTUP_PROFILE = os.environ.get('STARTUP_PROFILE', '0') == '1'
+STARTUP_PROFILE_TOP = int(os.environ.get('STARTUP_PROFILE_TOP', '15'))
+
+
+class _ImportTimer:
+    """`__import__` wrapper timing each module's first import."""
+
+    def __init__(self):
+        self._orig = builtins.__import__
+        self._local = threading.local()
+        self.records: list[tuple[str, float, float]] = []   # (module, cumulative_s, self_s)
+
+    def __call__(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._orig(name, globals, locals, fromlist, level)
+        stack = self._local.__dict__.setdefault('stack', [])
+        stack.append(0.0)
+        t0 = time.perf_counter()
+        try:
+            return self._orig(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - t0
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.records.append((name, elapsed, elapsed - children))
+
+    def install(self) -> None:
+        builtins.__import__ = self
+
+    def uninstall(self) -> None:
+        if builtins.__import__ is self:
+            builtins.__import__ = self._orig
+
+
+class _Profile:
+    def __init__(self):
+        self.imports = _ImportTimer()
+        self.phases: dict[str, float] = {}
+        self.began = time.perf_counter()
+        self.reported = False
+        self._lock = threading.Lock()
+
+    def report(self, first_request_s: float) -> dict:
+        slowest = sorted(self.imports.records, key=lambda r: r[2], reverse=True)[:STARTUP_PROFILE_TOP]
+        return {
+            "phases_ms": {k: round(v * 1000, 1) for k, v in self.phases.items()},
+            "first_request_ms": round(first_request_s * 1000, 1),
+            "modules_imported": len(self.imports.records),
+            "slowest_imports": [
+                {"module": name, "self_ms": round(own * 1000, 1), "cumulative_ms": round(cum * 1000, 1)}
+                for name, cum, own in slowest
+            ],
+        }
+
+
+_profile = _Profile() if STARTUP_PROFILE else None
+
+
+def begin() -> None:
+    """Start timing imports; call before main.py's own imports."""
+    if _profile is not None:
+        _profile.began = time.perf_counter()
+        _profile.imports.install()
+
+
+def loaded() -> None:
+    """main.py has finished loading."""
+    if _profile is not None:
+        _profile.phases['module load'] = time.perf_counter() - _profile.began
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a named startup step (no-op unless profiling)."""
+    if _profile is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _profile.phases[name] = _profile.phases.get(name, 0.0) + time.perf_counter() - t0
+
+
+@contextmanager
+def first_request() -> Iterator[None]:
+    """Wrap request handling; logs the report once, after the first request."""
+    if _profile is None or _profile.reported:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _profile._lock:
+            if not _profile.reported:
+                _profile.reported = True
+                _profile.imports.uninstall()
+                log.info(f"startup profile: {json.dumps(_profile.report(time.perf_counter() - t0))}")
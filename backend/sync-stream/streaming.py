@@ -0,0 +1,174 @@
+"""
+Streaming request parsing for very large sync payloads.
+
+`request.get_json()` materialises the whole body, and building the insert
+tuples makes another full copy, so peak memory grows with rows per request.
+In streaming mode the body is walked incrementally with ijson: each
+`scanned_items` / `sales_floor` element is converted as it arrives and
+flushed to the warehouse every STREAM_CHUNK_ROWS rows, so memory stays flat
+regardless of payload size.
+
+Streaming mode is used for bodies of at least STREAM_PARSE_MIN_BYTES (or of
+unknown length). Since rows are written before the end of the body has been
+seen, the caller runs the whole ingest in one transaction and rolls it back
+if the JSON turns out to be malformed. The idempotency key must come from the
+`Idempotency-Key` header in this mode — a `batch_id` inside the body is only
+seen after rows have already been written.
+
+A columnar table (see columnar.py) can only be turned into rows once all of
+its columns have arrived, so it is buffered whole — as flat column lists,
+which are far smaller than the equivalent row dicts — and then written in
+STREAM_CHUNK_ROWS slices.
+"""
+import logging
+import os
+from typing import IO, Any, Iterator, Optional
+
+import ijson
+from werkzeug.exceptions import ClientDisconnected
+
+from columnar import ColumnarTable
+from convert import MAX_REPORTED_REJECTS, convert_sales_floor, convert_scanned_items
+from fingerprint import SalesFloorFingerprints
+from ingest import PayloadError, decode_table, insert_scanned_items, upsert_sales_floor, with_rejects
+from rollup import InventoryRollup
+
+log = logging.getLogger(__name__)
+
+STREAM_PARSE_MIN_BYTES = int(os.environ.get('STREAM_PARSE_MIN_BYTES', str(4 * 1024 * 1024)))
+STREAM_CHUNK_ROWS = int(os.environ.get('STREAM_CHUNK_ROWS', '5000'))
+
+_TABLES = {'scanned_items.item': 'scanned_items', 'sales_floor.item': 'sales_floor'}
+_COLUMNAR_TABLES = {'scanned_items': 'scanned_items', 'sales_floor': 'sales_floor'}
+
+
+def use_streaming(content_length: Optional[int]) -> bool:
+    return content_length is None or content_length >= STREAM_PARSE_MIN_BYTES
+
+
+class _BodyReader:
+    """Adapts the WSGI input stream for ijson.
+
+    ijson probes the stream with read(0) to detect bytes vs. text; werkzeug's
+    LimitedStream treats a zero-byte read at that point as a disconnect.
+    """
+
+    def __init__(self, stream: IO[bytes]):
+        self._stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        return b'' if size == 0 else self._stream.read(size)
+
+
+def iter_payload_rows(stream: IO[bytes]) -> Iterator[tuple[str, Any]]:
+    """Yield `(table, row)` for every array element, one row in memory at a time.
+
+    A columnar table is yielded once, as `(table, ColumnarTable)`. Like the
+    buffered path, a body that is not a non-empty JSON object is a PayloadError.
+    """
+    builder = None
+    table = None
+    tables = None
+    top_level = None
+    keys = 0
+    try:
+        for prefix, event, value in ijson.parse(_BodyReader(stream), use_float=True):
+            if prefix == '':
+                top_level = top_level or event
+                keys += event == 'map_key'
+            if builder is None:
+                if prefix in _TABLES and event not in ('start_map', 'start_array'):
+                    # A scalar where a row object should be — still yielded,
+                    # so it's rejected at its own index.
+                    yield _TABLES[prefix], value
+                    continue
+                if event in ('start_map', 'start_array') and prefix in _TABLES:
+                    tables = _TABLES
+                elif event == 'start_map' and prefix in _COLUMNAR_TABLES:
+                    tables = _COLUMNAR_TABLES
+                else:
+                    continue
+                table = tables[prefix]
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+                continue
+            builder.event(event, value)
+            if event in ('end_map', 'end_array') and prefix in tables:
+                if tables is _TABLES:
+                    yield table, builder.value
+                else:
+                    yield table, decode_table(table, builder.value)
+                builder = None
+    except ijson.JSONError as e:
+        raise PayloadError(f"Invalid JSON body: {e}") from e
+    except ClientDisconnected as e:
+        raise PayloadError("Request body ended before the declared length.") from e
+    if top_level != 'start_map' or not keys:
+        raise PayloadError("Invalid or missing JSON body")
+
+
+def write_stream(
+    cur, stream: IO[bytes], chunk_rows: int = STREAM_CHUNK_ROWS,
+    fingerprints: Optional[SalesFloorFingerprints] = None, rollup: Optional[InventoryRollup] = None,
+) -> dict:
+    """Parse *stream* incrementally and write it in fixed-size chunks.
+
+    Returns the same counts and rejected-row report as ingest.write_batch,
+    plus the number of chunks. Rejected-row indices are positions in the
+    whole table, not the chunk.
+    """
+    buffers: dict[str, list[dict] | ColumnarTable] = {'scanned_items': [], 'sales_floor': []}
+    offsets = {'scanned_items': 0, 'sales_floor': 0}
+    scanned_written = 0
+    sales_floor_upserted = 0
+    sales_floor_skipped = 0
+    strategies: set[str] = set()
+    chunks = 0
+    rows_rejected = 0
+    rejected: list[dict] = []
+
+    def flush(table: str) -> None:
+        nonlocal scanned_written, sales_floor_upserted, sales_floor_skipped, chunks, rows_rejected
+        rows = buffers[table]
+        if not rows:
+            return
+        if table == 'scanned_items':
+            converted = convert_scanned_items(rows)
+            if converted.rows:
+                strategies.add(insert_scanned_items(cur, converted.rows, rollup=rollup))
+                scanned_written += len(converted.rows)
+        else:
+            converted = convert_sales_floor(rows)
+            if converted.rows:
+                upserted, skipped = upsert_sales_floor(cur, converted.rows, fingerprints, rollup)
+                sales_floor_upserted += upserted
+                sales_floor_skipped += skipped
+        rows_rejected += len(converted.rejected)
+        rejected.extend(converted.report(table, offsets[table])[:MAX_REPORTED_REJECTS - len(rejected)])
+        offsets[table] += len(rows)
+        chunks += 1
+        log.debug(f"Flushed chunk {chunks}: {len(converted.rows)} {table} rows.")
+        buffers[table] = []
+
+    for table, row in iter_payload_rows(stream):
+        if isinstance(row, ColumnarTable):
+            flush(table)
+            for start in range(0, row.rows, chunk_rows):
+                buffers[table] = row.slice(start, start + chunk_rows)
+                flush(table)
+            continue
+        buffers[table].append(row)
+        if len(buffers[table]) >= chunk_rows:
+            flush(table)
+    flush('scanned_items')
+    flush('sales_floor')
+
+    result = {
+        "status": "success",
+        "scanned_items_written": scanned_written,
+        "scanned_items_strategy": "+".join(sorted(strategies)) or None,
+        "sales_floor_upserted": sales_floor_upserted,
+        "sales_floor_skipped": sales_floor_skipped,
+        "chunks": chunks,
+    }
+    return with_rejects(result, rows_rejected, rejected)
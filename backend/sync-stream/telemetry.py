@@ -0,0 +1,213 @@
+"""
+Per-request telemetry for the sync functions.
+
+Each request gets a trace that collects
+  • spans — named durations (parse, validate, connect, insert, merge, …)
+    recorded with `span(name)` from wherever the work happens; repeated
+    spans add up (a streamed body merges once per chunk)
+  • the row counts from the response (written, upserted, skipped, rejected)
+    and the payload bytes
+  • anything else a handler attaches with `note(**fields)`
+
+and logs it as ONE structured JSON line on stdout when the request ends
+(Cloud Logging turns it into a jsonPayload; REQUEST_LOG=0 turns it off).
+
+The same traces feed in-process Prometheus metrics — latency histograms per
+function and per span, request/row/byte counters (graph rows/sec as
+`rate(vizcount_sync_rows_total[1m])`) — rendered by `render()` for the
+metrics route. Metrics are per instance and reset on cold start.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+
+REQUEST_LOG = os.environ.get('REQUEST_LOG', '1') == '1'
+
+# Histogram bucket upper bounds, in seconds.
+LATENCY_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Response fields counted as rows, by outcome.
+ROW_FIELDS = {
+    'scanned_items_written': 'scanned_items_written',
+    'sales_floor_upserted': 'sales_floor_upserted',
+    'sales_floor_skipped': 'sales_floor_skipped',
+    'rows_rejected': 'rejected',
+}
+
+# Raw JSON lines on stdout, not the "LEVEL | message" format of the root logger.
+_request_log = logging.getLogger('sync.requests')
+_request_log.propagate = False
+if not _request_log.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    _request_log.addHandler(_handler)
+    _request_log.setLevel(logging.INFO)
+
+
+class Trace:
+    def __init__(self, function: str, method: str, payload_bytes: Optional[int]):
+        self.function = function
+        self.method = method
+        self.payload_bytes = payload_bytes or 0
+        self.started = time.perf_counter()
+        self.spans: dict[str, float] = {}
+        self.fields: dict[str, Any] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar('sync_trace', default=None)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a step of the current request (no-op outside one)."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - t0)
+
+
+def note(**fields: Any) -> None:
+    """Attach fields to the current request's log record."""
+    trace = _current.get()
+    if trace is not None:
+        trace.fields.update(fields)
+
+
+def traced(function: str, handle: Callable[[Any], tuple], request) -> tuple:
+    """Run *handle(request)* under a new trace; log and record it when done."""
+    trace = Trace(function, request.method, request.content_length)
+    token = _current.set(trace)
+    status = 500
+    body: Any = None
+    try:
+        body, status = handle(request)
+        return body, status
+    finally:
+        _current.reset(token)
+        _finish(trace, status, body if isinstance(body, dict) else {})
+
+
+def _finish(trace: Trace, status: int, body: dict) -> None:
+    seconds = time.perf_counter() - trace.started
+    # A replayed idempotent result wrote nothing this time.
+    rows = {} if trace.fields.get('replayed') else {
+        outcome: body[key] for key, outcome in ROW_FIELDS.items() if isinstance(body.get(key), int)
+    }
+    METRICS.observe(trace, status, seconds, rows)
+    if REQUEST_LOG:
+        record = {
+            "severity": "ERROR" if status >= 500 else "WARNING" if status >= 400 else "INFO",
+            "message": f"{trace.function} {trace.method} {status} in {seconds * 1000:.1f} ms",
+            "function": trace.function,
+            "method": trace.method,
+            "status": status,
+            "duration_ms": round(seconds * 1000, 2),
+            "spans_ms": {k: round(v * 1000, 2) for k, v in trace.spans.items()},
+            "payload_bytes": trace.payload_bytes,
+            "rows": rows,
+            **trace.fields,
+        }
+        if status >= 400 and body.get("error"):
+            record["error"] = body["error"]
+        _request_log.info(json.dumps(record, default=str))
+
+
+# ---------------------------------------------------------------
+# In-process Prometheus metrics
+# ---------------------------------------------------------------
+class _Histogram:
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS_S)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.sum += seconds
+        for i, bound in enumerate(LATENCY_BUCKETS_S):
+            if seconds <= bound:
+                self.buckets[i] += 1
+
+
+def _labels(pairs: tuple, **extra: Any) -> str:
+    return "{" + ",".join(f'{k}="{v}"' for k, v in (*pairs, *extra.items())) + "}"
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: dict[tuple[str, int], int] = {}
+        self.latency: dict[str, _Histogram] = {}
+        self.spans: dict[tuple[str, str], _Histogram] = {}
+        self.rows: dict[tuple[str, str], int] = {}
+        self.payload_bytes: dict[str, int] = {}
+        self.started = time.time()
+
+    def observe(self, trace: Trace, status: int, seconds: float, rows: dict[str, int]) -> None:
+        fn = trace.function
+        with self._lock:
+            self.requests[fn, status] = self.requests.get((fn, status), 0) + 1
+            self.latency.setdefault(fn, _Histogram()).observe(seconds)
+            for name, s in trace.spans.items():
+                self.spans.setdefault((fn, name), _Histogram()).observe(s)
+            for outcome, n in rows.items():
+                self.rows[fn, outcome] = self.rows.get((fn, outcome), 0) + n
+            self.payload_bytes[fn] = self.payload_bytes.get(fn, 0) + trace.payload_bytes
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        out: list[str] = []
+
+        # Series are keyed by ((label, value), ...) tuples, so they sort stably.
+        def histogram(name: str, help_: str, series: dict) -> None:
+            out.append(f"# HELP {name} {help_}")
+            out.append(f"# TYPE {name} histogram")
+            for labels, h in sorted(series.items()):
+                for bound, n in zip(LATENCY_BUCKETS_S, h.buckets):
+                    out.append(f"{name}_bucket{_labels(labels, le=bound)} {n}")
+                out.append(f"{name}_bucket{_labels(labels, le='+Inf')} {h.count}")
+                out.append(f"{name}_sum{_labels(labels)} {h.sum:.6f}")
+                out.append(f"{name}_count{_labels(labels)} {h.count}")
+
+        def counter(name: str, help_: str, series: dict) -> None:
+            out.append(f"# HELP {name} {help_}")
+            out.append(f"# TYPE {name} counter")
+            for labels, value in sorted(series.items()):
+                out.append(f"{name}{_labels(labels)} {value}")
+
+        with self._lock:
+            counter("vizcount_sync_requests_total", "Requests handled, by function and HTTP status.",
+                    {(("function", fn), ("code", code)): n for (fn, code), n in self.requests.items()})
+            histogram("vizcount_sync_request_duration_seconds", "End-to-end request latency.",
+                      {(("function", fn),): h for fn, h in self.latency.items()})
+            histogram("vizcount_sync_span_duration_seconds", "Time per request spent in each step.",
+                      {(("function", fn), ("span", name)): h for (fn, name), h in self.spans.items()})
+            counter("vizcount_sync_rows_total", "Rows by outcome (written, upserted, skipped, rejected).",
+                    {(("function", fn), ("outcome", o)): n for (fn, o), n in self.rows.items()})
+            counter("vizcount_sync_payload_bytes_total", "Request body bytes received.",
+                    {(("function", fn),): n for fn, n in self.payload_bytes.items()})
+            out.append("# HELP vizcount_sync_process_start_time_seconds When this instance started.")
+            out.append("# TYPE vizcount_sync_process_start_time_seconds gauge")
+            out.append(f"vizcount_sync_process_start_time_seconds {self.started:.3f}")
+        return "\n".join(out) + "\n"
+
+
+METRICS = Metrics()
+
+
+def render() -> str:
+    return METRICS.render()
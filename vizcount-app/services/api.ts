@@ -1,10 +1,20 @@
 import appCheck from '@react-native-firebase/app-check';
 
+/**
+ * Generate a key that identifies one sync batch. Create it once per batch and
+ * reuse it for every retry of that batch so the backend can skip duplicates.
+ */
+export function newIdempotencyKey(): string {
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+}
+
 /**
  * Example helper function to securely call your GCP Cloud Function.
  * It automatically fetches the App Check token and attaches it to the request.
+ * Pass the same `idempotencyKey` when retrying a batch — the backend returns
+ * the original result instead of inserting the rows again.
  */
-export async function sendDataToGCP(payload: any) {
+export async function sendDataToGCP(payload: any, idempotencyKey?: string) {
     try {
         // 1. Get the App Check Token
         const { token } = await appCheck().getToken();
@@ -18,6 +28,7 @@ export async function sendDataToGCP(payload: any) {
                 'Content-Type': 'application/json',
                 // This is the header GCP expects for App Check validation
                 'X-Firebase-AppCheck': token,
+                ...(idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {}),
             },
             body: JSON.stringify(payload)
         });
@@ -0,0 +1,46 @@
+import { synchronize } from '@nozbe/watermelondb/sync';
+import appCheck from '@react-native-firebase/app-check';
+
+import { database } from '../db';
+
+/**
+ * Incremental sync with the backend's `sync_changes` function: pulls what
+ * changed on the server since the last sync, then pushes only this device's
+ * local changes. A 409 from the push means another device changed the same
+ * records first — synchronize() throws and the next sync pulls and retries.
+ */
+export async function syncDatabase() {
+    const SYNC_URL = process.env.EXPO_PUBLIC_GCP_DELTA_SYNC_URL!;
+
+    const request = async (init: RequestInit & { query?: string } = {}) => {
+        const { token } = await appCheck().getToken();
+        const response = await fetch(`${SYNC_URL}${init.query ?? ''}`, {
+            ...init,
+            headers: {
+                'Content-Type': 'application/json',
+                'X-Firebase-AppCheck': token,
+            },
+        });
+        if (!response.ok) {
+            throw new Error(`Sync HTTP error! status: ${response.status}`);
+        }
+        return response.json();
+    };
+
+    await synchronize({
+        database,
+        pullChanges: async ({ lastPulledAt }) => {
+            const { changes, timestamp } = await request({
+                method: 'GET',
+                query: `?last_pulled_at=${lastPulledAt ?? 'null'}`,
+            });
+            return { changes, timestamp };
+        },
+        pushChanges: async ({ changes, lastPulledAt }) => {
+            await request({
+                method: 'POST',
+                body: JSON.stringify({ changes, lastPulledAt }),
+            });
+        },
+    });
+}
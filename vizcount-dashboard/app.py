@@ -11,10 +11,11 @@ Wires together:
 """
 
 import sys
+import pandas as pd
 import streamlit as st
 
 from config.settings import PAGE_CONFIG
-from data.loader import load_category_data
+from data.loader import current_snapshot, inventory_status, load_category_data
 from utils.icons import inject_css, force_sidebar_open, ICON_HEADER
 from utils.logger import get_logger
 from components.sidebar import render_sidebar
@@ -26,7 +27,39 @@ from utils.icons import ICON_HEADER
 
 log = get_logger("app")
 
+
+def _ago(age_s: float) -> str:
+    age = int(age_s)
+    if age < 120:
+        return f"{age}s ago"
+    if age < 2 * 3600:
+        return f"{age // 60} min ago"
+    return f"{age // 3600} h ago"
+
+
+def _live_badge(status) -> str:
+    """Header badge: data age, amber while a stale entry is being refreshed."""
+    ago = _ago(status.age_s)
+    if not status.live:
+        color, text = "#ef4444", "Demo Data"
+    elif status.offline:
+        color, text = "#f97316", f"Offline · {ago}"
+    elif status.stale:
+        color, text = "#f59e0b", f"Refreshing · {ago}"
+    else:
+        color, text = "#22c55e", f"Live · {ago}"
+    return (
+        f'<div style="text-align:right;padding-top:14px;font-size:13px;color:{color}" '
+        f'title="Fetched {status.fetched_at:%I:%M:%S %p}">'
+        f'<span class="live-dot" style="background:{color}"></span>{text}</div>'
+    )
+
 # ── Bootstrap ─────────────────────────────────────────────────────────────────
+# Sessions get shallow views of the loader's shared frames; Copy-on-Write keeps
+# a write through one off the shared data. Always on from pandas 3.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
 st.set_page_config(**PAGE_CONFIG)
 inject_css()
 force_sidebar_open()    # JS override: keeps sidebar translateX at 0 on every run
@@ -37,11 +70,17 @@ log.info(
     st.__version__,
 )
 
+# ── Inventory snapshot ─────────────────────────────────────────────────────────
+# Taken once per rerun: a background refresh landing mid-rerun must not leave
+# the sidebar and the main view showing different data.
+snap = current_snapshot()
+
 # ── Sidebar / navigation ───────────────────────────────────────────────────────
-selected_category = render_sidebar()
+selected_category = render_sidebar(snap)
 
 # ── Load category data ─────────────────────────────────────────────────────────
-df = load_category_data(selected_category)
+df     = load_category_data(selected_category, snap)
+status = inventory_status(snap)
 
 # ── Page header ────────────────────────────────────────────────────────────────
 col_hdr, col_live = st.columns([6, 1])
@@ -66,10 +105,20 @@ with col_hdr:
         unsafe_allow_html=True,
     )
 with col_live:
-    st.markdown(
-        '<div style="text-align:right;padding-top:14px;font-size:13px;color:#22c55e">'
-        '<span class="live-dot"></span>Live Data</div>',
-        unsafe_allow_html=True,
+    st.markdown(_live_badge(status), unsafe_allow_html=True)
+
+if not status.live:
+    st.warning(
+        "⚠️ Could not load live data from Snowflake — showing demo data.  "
+        "Check the **🪲 Debug Logs** panel in the sidebar.",
+        icon="🔌",
+    )
+elif status.offline:
+    st.warning(
+        f"⚠️ Snowflake is unreachable — showing the last data loaded at "
+        f"{status.fetched_at:%I:%M %p, %b %d} ({_ago(status.age_s)}).  "
+        "Check the **🪲 Debug Logs** panel in the sidebar.",
+        icon="🔌",
     )
 
 st.markdown("---")
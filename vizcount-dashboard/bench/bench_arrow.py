@@ -0,0 +1,166 @@
+"""
+Memory per cached frame and conversion time of the loader's full load,
+before and after the Arrow-native path (data/loader.py::_frame), on a
+synthetic catalog of --products products spread over the PRODUCTS
+categories, with cooler and floor rows for each.
+
+Both paths start from the same Arrow table — what fetch_arrow_all() hands
+back — so the timings cover only the conversion to the cached frames:
+
+  before – table.to_pandas() (as Snowpark's to_pandas() does), then the
+           previous post-processing: pd.to_numeric/astype on every count,
+           one Python date per row via .apply(_ms_to_date)
+  after  – _frame() casts in Arrow (int32, timestamp[ms], dictionary) and
+           converts once; _aggregate() stays vectorized
+
+Memory is DataFrame.memory_usage(deep=True) of the per-PID state and of the
+per-category frames load_inventory() serves.
+
+Usage (from vizcount-dashboard):
+    python bench/bench_arrow.py --products 100000
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pandas as pd  # noqa: E402
+
+import data.loader as loader  # noqa: E402
+from bench.local_warehouse import LocalWarehouse  # noqa: E402
+from config.settings import PRODUCTS  # noqa: E402
+
+
+# ── Previous conversion path (verbatim apart from names) ──────────────────────
+
+def _ms_to_date(ms_val) -> date:
+    if ms_val is None or pd.isna(ms_val):
+        return date.today()
+    return datetime.utcfromtimestamp(int(ms_val) / 1000).date()
+
+
+def _legacy_state(table) -> pd.DataFrame:
+    df = table.to_pandas()
+    for col in ("cooler_count", "floor_count"):
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype("int64")
+    for col in ("min_best_before", "min_expiry"):
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    return df.set_index("pid")
+
+
+def _legacy_aggregate(state: pd.DataFrame) -> pd.DataFrame:
+    df = state.groupby(["category", "product"], as_index=False, sort=False).agg(
+        cooler_count=("cooler_count", "sum"),
+        floor_count=("floor_count", "sum"),
+        min_best_before=("min_best_before", "min"),
+        min_expiry=("min_expiry", "min"),
+    )
+    df["total_count"] = df["cooler_count"] + df["floor_count"]
+    expiry_ts = df["min_expiry"].fillna(df["min_best_before"])
+    df["expiry_date"] = expiry_ts.apply(_ms_to_date)
+    today = date.today()
+    df["days_to_expiry"] = (
+        df["expiry_date"].map(lambda d: (d - today).days).where(expiry_ts.notna())
+    )
+    df = df.sort_values("days_to_expiry", na_position="last", kind="stable", ignore_index=True)
+    df = df.drop(columns=["min_best_before", "min_expiry"])
+    for col in ("cooler_count", "floor_count", "total_count", "days_to_expiry"):
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
+    return df
+
+
+def _legacy_partition(df: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    return {
+        cat: g.drop(columns="category").reset_index(drop=True)
+        for cat, g in df.groupby("category", sort=False)
+    }
+
+
+# ── Bench ─────────────────────────────────────────────────────────────────────
+
+def _warehouse(products: int, seed: int) -> LocalWarehouse:
+    wh = LocalWarehouse(sample_rows=False)
+    wh.execute("SELECT setseed(?)", [seed / 1000])
+    wh.execute(
+        "INSERT INTO defined_products (name, pid, pack, type) "
+        "SELECT 'PRODUCT ' || lpad(i::VARCHAR, 7, '0'), (80000000 + i)::VARCHAR, 6, "
+        "       list_extract(?, 1 + (i % ?)) "
+        "FROM range(?) t(i)", [list(PRODUCTS), len(PRODUCTS), products])
+    # ~3 cooler rows per product, one floor row for 80% of them
+    wh.execute(
+        "INSERT INTO scanned_items (pid, sn, name, best_before_date, count, created_at, updated_at) "
+        "SELECT (80000000 + (i % ?))::VARCHAR, 'SN' || i, '', "
+        "       1778000000000 + (random() * 20 * 86400000)::BIGINT, 1 + (random() * 40)::INT, 0, 0 "
+        "FROM range(?) t(i)", [products, 3 * products])
+    wh.execute(
+        "INSERT INTO sales_floor (pid, name, count, expiry_date, created_at, updated_at) "
+        "SELECT (80000000 + i)::VARCHAR, '', 1 + (random() * 20)::INT, "
+        "       1778000000000 + (random() * 10 * 86400000)::BIGINT, 0, 0 "
+        "FROM range(?) t(i) WHERE random() < 0.8", [products])
+    return wh
+
+
+def _mb(frames) -> float:
+    return sum(int(df.memory_usage(deep=True).sum()) for df in frames) / 2 ** 20
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--products", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+    logging.getLogger("vizcount").setLevel(logging.WARNING)
+
+    wh = _warehouse(args.products, args.seed)
+    fetched = loader._fetch(wh, loader._inventory_sql(PRODUCTS))
+    print(f"{fetched.num_rows:,} PID rows, Arrow result {fetched.nbytes / 2 ** 20:.1f} MB "
+          f"(pandas {pd.__version__})")
+
+    def run(label: str, state_fn, aggregate, partition) -> tuple[pd.DataFrame, dict]:
+        times, state_times = [], []
+        for _ in range(args.repeat):
+            table = fetched.select(fetched.column_names)    # fresh handle: _frame self-destructs
+            t0 = time.perf_counter()
+            state = state_fn(table)
+            t1 = time.perf_counter()
+            frames = partition(aggregate(state))
+            times.append(time.perf_counter() - t0)
+            state_times.append(t1 - t0)
+        print(f"{label:7} conversion {statistics.median(times) * 1000:8.1f} ms "
+              f"(state {statistics.median(state_times) * 1000:6.1f} ms)   "
+              f"state {_mb([state]):6.1f} MB   frames {_mb(frames.values()):6.1f} MB "
+              f"({_mb(frames.values()) / len(frames):5.1f} MB/category)")
+        return state, frames
+
+    _, before = run("before", _legacy_state, _legacy_aggregate, _legacy_partition)
+    _, after = run(
+        "after",
+        lambda t: loader._frame(
+            t, counts=("cooler_count", "floor_count"),
+            timestamps=("min_best_before", "min_expiry"), categories=("category", "product"),
+        ).set_index("pid"),
+        loader._aggregate, loader._partition,
+    )
+
+    cat = next(iter(PRODUCTS))
+    print(f"\n{cat!r} frame dtypes  before → after")
+    for col in loader._COLUMNS:
+        print(f"  {col:15} {str(before[cat][col].dtype):>14} → {after[cat][col].dtype}")
+    b = before[cat].sort_values("product", ignore_index=True)
+    a = after[cat].astype({"product": str}).sort_values("product", ignore_index=True)
+    same = all(
+        (b[col].astype("int64") == a[col].astype("int64")).all()
+        for col in ("cooler_count", "floor_count", "total_count", "days_to_expiry")
+    ) and (pd.to_datetime(b["expiry_date"]) == a["expiry_date"]).all()
+    print(f"\nvalues identical: {same}")
+    sys.exit(0 if same else 1)
+
+
+if __name__ == "__main__":
+    main()
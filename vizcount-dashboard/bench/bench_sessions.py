@@ -0,0 +1,155 @@
+"""
+Latency and memory of the loader's public API when --sessions concurrent
+sessions each rerun the page --reruns times, on a synthetic catalog of
+--products products (see bench_arrow.py). Every rerun makes the same reads
+the app does: load_inventory() for the sidebar badges, load_all_data() for
+the quick stats and load_category_data() for the main view.
+
+  pickle – @st.cache_data: every call unpickles a fresh copy of the frames
+  copy   – the previous shared cache: deep copies per call, load_all_data()
+           concatenating every category on each rerun
+  shared – data/loader.py now: shallow views of the snapshot frames and of
+           the all-category frame built once per refresh
+
+Latency is per rerun (p50 / p95 across all sessions). Memory is the
+tracemalloc peak above the cached snapshot during a second, traced run, i.e.
+what the reruns allocate on top of the shared data.
+
+Usage (from vizcount-dashboard):
+    python bench/bench_sessions.py --products 100000 --sessions 20
+"""
+import argparse
+import logging
+import os
+import pickle
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pandas as pd  # noqa: E402
+
+import data.loader as loader  # noqa: E402
+from bench.bench_arrow import _warehouse  # noqa: E402
+from config.settings import PRODUCTS  # noqa: E402
+
+if int(pd.__version__.split(".")[0]) < 3:     # as app.py sets it for the dashboard
+    pd.set_option("mode.copy_on_write", True)
+
+
+# ── API variants ──────────────────────────────────────────────────────────────
+
+def _pickle_api():
+    blobs = {cat: pickle.dumps(df) for cat, df in loader._CACHE.get().frames.items()}
+    combined = pickle.dumps(loader._CACHE.get().combined)
+    return (
+        lambda: {cat: pickle.loads(b) for cat, b in blobs.items()},
+        lambda: pickle.loads(combined),
+        lambda cat: pickle.loads(blobs[cat]),
+    )
+
+
+def _copy_api():
+    def inventory():
+        return {cat: df.copy() for cat, df in loader._CACHE.get().frames.items()}
+
+    def all_data():
+        return pd.concat([f for f in inventory().values() if not f.empty], ignore_index=True)
+
+    return inventory, all_data, lambda cat: loader._CACHE.get().frames[cat].copy()
+
+
+def _shared_api():
+    return loader.load_inventory, loader.load_all_data, loader.load_category_data
+
+
+# ── Bench ─────────────────────────────────────────────────────────────────────
+
+def _rerun(api, category: str) -> tuple:
+    inventory, all_data, category_data = api
+    badges = {cat: int((df["days_to_expiry"] <= 1).sum()) for cat, df in inventory().items()}
+    all_df = all_data()
+    stats = (int((all_df["days_to_expiry"] == 0).sum()), int((all_df["days_to_expiry"] < 0).sum()))
+    df = category_data(category)
+    return badges, stats, int(df["total_count"].sum())
+
+
+def _run(api, sessions: int, reruns: int, trace: bool = False) -> tuple[list[float], int, float]:
+    cats = list(PRODUCTS)
+    times: list[float] = []
+    start = threading.Barrier(sessions)
+
+    def session(i: int) -> None:
+        start.wait()
+        for k in range(reruns):
+            t0 = time.perf_counter()
+            _rerun(api, cats[(i + k) % len(cats)])
+            times.append(time.perf_counter() - t0)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    if trace:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    peak = 0
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return times, peak, wall
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--products", type=int, default=100_000)
+    ap.add_argument("--sessions", type=int, default=20)
+    ap.add_argument("--reruns", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+    logging.getLogger("vizcount").setLevel(logging.WARNING)
+
+    wh = _warehouse(args.products, args.seed)
+    loader._get_conn = lambda: wh
+    tmp = tempfile.TemporaryDirectory()
+    loader._SNAPSHOT_PATH = os.path.join(tmp.name, "inventory_state.parquet")
+    loader._CACHE = loader._InventoryCache()
+    snap = loader._CACHE.get()
+    size = sum(int(df.memory_usage(deep=True).sum()) for df in (*snap.frames.values(), snap.combined))
+    print(f"{args.products:,} products, snapshot {size / 2 ** 20:.1f} MB; "
+          f"{args.sessions} sessions × {args.reruns} reruns (pandas {pd.__version__})\n")
+
+    results = {}
+    print(f"{'':8} {'p50':>10} {'p95':>10} {'wall':>9} {'peak alloc':>12}")
+    for label, make in (("pickle", _pickle_api), ("copy", _copy_api), ("shared", _shared_api)):
+        api = make()
+        _rerun(api, next(iter(PRODUCTS)))                 # warm up
+        times, _, wall = _run(api, args.sessions, args.reruns)
+        _, peak, _ = _run(api, args.sessions, 1, trace=True)
+        results[label] = _rerun(api, next(iter(PRODUCTS)))
+        p50 = statistics.median(times) * 1000
+        p95 = statistics.quantiles(times, n=20)[-1] * 1000
+        print(f"{label:8} {p50:7.2f} ms {p95:7.2f} ms {wall:7.2f} s {peak / 2 ** 20:9.1f} MB")
+
+    same = results["pickle"] == results["copy"] == results["shared"]
+    print(f"\nsame figures from every variant: {same}")
+
+    # A session writing through its view must not change what others see
+    cat = next(iter(PRODUCTS))
+    before = int(snap.frames[cat]["total_count"].sum())
+    view = loader.load_category_data(cat)
+    view.loc[view.index[0], "total_count"] = -1
+    view["extra"] = 0
+    isolated = int(snap.frames[cat]["total_count"].sum()) == before and "extra" not in snap.frames[cat]
+    print(f"writes through a view leave the snapshot untouched: {isolated}")
+    sys.exit(0 if same and isolated else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+The loader's SQL (data/loader.py) on synthetic datasets from bench/synth.py,
+at each of --sizes scanned_items rows, on local engines:
+
+  duckdb – bench/local_warehouse.py, tables loaded straight from the Parquet
+  sqlite – the snowflake_setup.sql tables in an in-memory SQLite database;
+           three-part names are dropped and GREATEST is registered as a
+           function, the rest of the SQL runs as written
+
+Queries, each timed to the last fetched row (median of --repeat runs):
+
+  full        – _inventory_sql(PRODUCTS): the per-PID state of a full load
+  delta       – _DELTA_SQL over the newest hour of scans and floor changes
+  watermarks  – _WATERMARK_SQL
+
+Both engines must agree on the full load. Every timing is appended to
+--record as one JSON line (engine, rows, query, ms, result rows, …), so runs
+on different machines or revisions can be compared. Datasets are generated
+once into --data and reused.
+
+Usage (from vizcount-dashboard):
+    python bench/bench_sql.py --sizes 10k,1m,10m --engines duckdb,sqlite
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import duckdb  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+
+import data.loader as loader  # noqa: E402
+from bench.local_warehouse import SETUP_SQL, LocalWarehouse, _statements  # noqa: E402
+from bench.synth import Spec, generate  # noqa: E402
+from config.settings import PRODUCTS  # noqa: E402
+
+_NOW_MS = 1_790_000_000_000     # fixed, so datasets and delta windows are reproducible
+_HOUR_MS = 3_600_000
+_FACTS = ("scanned_items", "sales_floor")
+
+
+def _rows(text: str) -> int:
+    m = re.fullmatch(r"(\d+)([km]?)", text.strip().lower())
+    if not m:
+        raise argparse.ArgumentTypeError(f"bad size {text!r} (e.g. 10k, 1m, 250000)")
+    return int(m.group(1)) * {"": 1, "k": 1_000, "m": 1_000_000}[m.group(2)]
+
+
+def _dataset(data_dir: str, rows: int, seed: int) -> dict[str, str]:
+    out = os.path.join(data_dir, f"rows_{rows}_seed_{seed}")
+    paths = {t: os.path.join(out, f"{t}.parquet") for t in _FACTS}
+    if not all(os.path.exists(p) for p in paths.values()):
+        t0 = time.perf_counter()
+        generate(Spec(rows, seed=seed, now_ms=_NOW_MS), out)
+        print(f"  generated {rows:,} rows in {time.perf_counter() - t0:.1f} s → {out}")
+    return paths
+
+
+# ── Engines ───────────────────────────────────────────────────────────────────
+
+class _DuckDB:
+    name = "duckdb"
+
+    def __init__(self, paths: dict[str, str]):
+        self.wh = LocalWarehouse(sample_rows=False)
+        for table, path in paths.items():
+            self.wh.execute(f"INSERT INTO {table} BY NAME SELECT * FROM read_parquet(?)", [path])
+
+    def run(self, sql: str) -> list[tuple]:
+        return self.wh.execute(sql).fetchall()
+
+
+class _SQLite:
+    name = "sqlite"
+    _QUALIFIED = re.compile(rf"\b{loader._DB}\.{loader._SCH}\.")
+
+    def __init__(self, paths: dict[str, str]):
+        self.db = sqlite3.connect(":memory:")
+        self.db.create_function("GREATEST", -1, lambda *v: max(x for x in v if x is not None), deterministic=True)
+        for stmt in _statements(SETUP_SQL):
+            head = stmt.split(None, 3)[:3]
+            if head[:2] == ["CREATE", "OR"]:
+                self.db.execute(stmt.replace("CREATE OR REPLACE TABLE", "CREATE TABLE", 1))
+            elif head[0] == "INSERT" and head[2] == "defined_products":
+                self.db.execute(stmt)
+        for table, path in paths.items():
+            pf = pq.ParquetFile(path)
+            cols = pf.schema_arrow.names
+            sql = f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+            for batch in pf.iter_batches(batch_size=100_000):
+                self.db.executemany(sql, zip(*(c.to_pylist() for c in batch.columns)))
+        self.db.commit()
+
+    def run(self, sql: str) -> list[tuple]:
+        return self.db.execute(self._QUALIFIED.sub("", sql)).fetchall()
+
+
+ENGINES = {e.name: e for e in (_DuckDB, _SQLite)}
+
+
+# ── Bench ─────────────────────────────────────────────────────────────────────
+
+def _queries() -> dict[str, str]:
+    since = _NOW_MS - _HOUR_MS
+    return {
+        "full":       loader._inventory_sql(PRODUCTS),
+        "delta":      loader._DELTA_SQL.format(
+            db=loader._DB, sch=loader._SCH,
+            cooler_from=since, cooler_to=_NOW_MS, floor_from=since - loader._LAG_MS,
+        ),
+        "watermarks": loader._WATERMARK_SQL.format(db=loader._DB, sch=loader._SCH),
+    }
+
+
+def _timed(fn, repeat: int) -> tuple[float, list]:
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000, result
+
+
+def _normalised(rows: list[tuple]) -> list[tuple]:
+    """Full-load rows in a fixed order with engine-neutral number types."""
+    return sorted(tuple(v if v is None or isinstance(v, str) else int(v) for v in row) for row in rows)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="10k,1m,10m", help="scanned_items rows per dataset")
+    ap.add_argument("--engines", default=",".join(ENGINES))
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--data", default=os.path.join(tempfile.gettempdir(), "vizcount-synth"))
+    ap.add_argument("--record", default=None, help="JSON-lines results file (default: <data>/bench_sql.jsonl)")
+    args = ap.parse_args()
+    logging.getLogger("vizcount").setLevel(logging.WARNING)
+
+    sizes = [_rows(s) for s in args.sizes.split(",")]
+    engines = [ENGINES[e.strip()] for e in args.engines.split(",")]
+    record = args.record or os.path.join(args.data, "bench_sql.jsonl")
+    os.makedirs(os.path.dirname(os.path.abspath(record)), exist_ok=True)
+    run_meta = {
+        "at": time.strftime("%Y-%m-%dT%H:%M:%S"), "host": platform.node(),
+        "python": platform.python_version(), "duckdb": duckdb.__version__, "sqlite": sqlite3.sqlite_version,
+    }
+
+    failures = 0
+    print(f"{'engine':8} {'rows':>12} {'load':>10} " + " ".join(f"{q:>12}" for q in _queries()))
+    with open(record, "a", encoding="utf-8") as out:
+        for rows in sizes:
+            paths = _dataset(args.data, rows, args.seed)
+            full_results = {}
+            for engine in engines:
+                t0 = time.perf_counter()
+                db = engine(paths)
+                load_ms = (time.perf_counter() - t0) * 1000
+                cells = []
+                for query, sql in _queries().items():
+                    ms, result = _timed(lambda db=db, sql=sql: db.run(sql), args.repeat)
+                    cells.append(f"{ms:9.1f} ms")
+                    if query == "full":
+                        full_results[engine.name] = _normalised(result)
+                    out.write(json.dumps({
+                        **run_meta, "engine": engine.name, "rows": rows, "seed": args.seed,
+                        "query": query, "ms": round(ms, 2), "result_rows": len(result),
+                        "load_ms": round(load_ms, 1), "repeat": args.repeat,
+                    }) + "\n")
+                print(f"{engine.name:8} {rows:12,} {load_ms:7.0f} ms " + " ".join(f"{c:>12}" for c in cells))
+                del db
+            if len(set(map(repr, full_results.values()))) > 1:
+                print(f"FAIL engines disagree on the full load at {rows:,} rows")
+                failures += 1
+
+    print(f"\nrecorded → {record}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
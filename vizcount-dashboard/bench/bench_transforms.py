@@ -0,0 +1,228 @@
+"""
+Per-row transforms before and after utils/transforms.py, at growing row
+counts, for the three render paths that ran Python per row:
+
+  dates   – Unix-ms expiry → date + days_to_expiry (loader)
+  buckets – days_to_expiry → expiry bucket + per-bucket totals (charts)
+  table   – the inventory table as handed to st.dataframe: status text + row
+            colours, through Styler._compute() (the part of st.dataframe's
+            styler marshalling that runs the style functions). After: the
+            component's _table() as it renders above TABLE_STYLE_MAX_ROWS,
+            i.e. unstyled
+
+The component's styled path (_table() with row colours, Styler._compute()
+included) is timed on its own at the same sizes, with styling forced on, so
+neither curve hides the switch between the two.
+
+Checks that the vectorized path matches the old one; that the after paths
+and the styled path each scale linearly (cost per row at the largest size
+within --linear-slack of the smallest); that the after paths stay under
+--budget-ms in total at --rows; and that styling TABLE_STYLE_MAX_ROWS rows
+stays under --budget-ms too (the report gives the row count that would).
+
+Usage (from vizcount-dashboard):
+    python bench/bench_transforms.py --rows 50000 --budget-ms 150
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from pandas.io.formats.style import Styler  # noqa: E402
+
+from components.inventory_table import _table  # noqa: E402
+from config.settings import BUCKET_ORDER, TABLE_STYLE_MAX_ROWS  # noqa: E402
+from utils.transforms import days_until, expiry_bucket, to_day  # noqa: E402
+
+
+# ── Previous per-row helpers (verbatim apart from names) ──────────────────────
+
+def _ms_to_date(ms_val) -> date:
+    if ms_val is None or pd.isna(ms_val):
+        return date.today()
+    return datetime.utcfromtimestamp(int(ms_val) / 1000).date()
+
+
+def _expiry_bucket(days: int) -> str:
+    if days < 0:  return "Expired"
+    if days == 0: return "Today"
+    if days == 1: return "1 Day"
+    if days == 2: return "2 Days"
+    return "5+ Days"
+
+
+def _fmt_status(days: int) -> str:
+    if days < 0:  return f"Expired {abs(days)}d ago"
+    if days == 0: return "Expires Today"
+    if days == 1: return "Tomorrow"
+    return f"In {days} days"
+
+
+def _row_color_renamed(row: pd.Series) -> list[str]:
+    days = row["Days"]
+    if days < 0:
+        bg = "background-color: #fee2e2; color: #991b1b"
+    elif days == 0:
+        bg = "background-color: #fef9c3; color: #854d0e"
+    elif days <= 2:
+        bg = "background-color: #dbeafe; color: #1e40af"
+    else:
+        bg = ""
+    return [bg] * len(row)
+
+
+# ── Paths ─────────────────────────────────────────────────────────────────────
+
+def dates_before(ms: pd.Series):
+    today = date.today()
+    d = ms.apply(_ms_to_date)
+    return d, d.map(lambda x: (x - today).days)
+
+
+def dates_after(ms: pd.Series):
+    day = to_day(ms)
+    return day, days_until(day)
+
+
+def buckets_before(df: pd.DataFrame):
+    df = df.copy()
+    df["bucket"] = df["days_to_expiry"].apply(_expiry_bucket)
+    return df.groupby("bucket")["total_count"].sum().reindex(BUCKET_ORDER, fill_value=0)
+
+
+def buckets_after(df: pd.DataFrame):
+    return (
+        df["total_count"]
+        .groupby(expiry_bucket(df["days_to_expiry"]), observed=False)
+        .sum()
+        .reindex(BUCKET_ORDER, fill_value=0)
+    )
+
+
+def table_before(df: pd.DataFrame):
+    out = df[["product", "cooler_count", "floor_count", "expiry_ms", "days_to_expiry"]].copy()
+    out["expiry_ms"] = out["expiry_ms"].apply(_ms_to_date).astype(str)
+    out["status"] = out["days_to_expiry"].apply(_fmt_status)
+    out = out.rename(columns={"days_to_expiry": "Days"})
+    styler = out.style.apply(_row_color_renamed, axis=1)
+    styler._compute()
+    return styler.ctx
+
+
+def table_after(df: pd.DataFrame):
+    return _table(df.assign(expiry_date=to_day(df["expiry_ms"])), style_max_rows=0)
+
+
+def table_styled(df: pd.DataFrame):
+    styler = _table(df.assign(expiry_date=to_day(df["expiry_ms"])), style_max_rows=len(df))
+    assert isinstance(styler, Styler)
+    styler._compute()
+    return styler.ctx
+
+
+# ── Bench ─────────────────────────────────────────────────────────────────────
+
+def _frame(n: int, rng: np.random.Generator) -> pd.DataFrame:
+    ms = 1_778_000_000_000 + rng.integers(-10, 15, n) * 86_400_000 + rng.integers(0, 86_400_000, n)
+    df = pd.DataFrame({
+        "product":      pd.Categorical([f"PRODUCT {i:07d}" for i in range(n)]),
+        "cooler_count": rng.integers(0, 80, n, dtype=np.int32),
+        "floor_count":  rng.integers(0, 25, n, dtype=np.int32),
+        "expiry_ms":    ms,
+    })
+    df["total_count"] = df["cooler_count"] + df["floor_count"]
+    df["days_to_expiry"] = days_until(to_day(df["expiry_ms"])).astype("int32")
+    return df
+
+
+def _timed(fn, arg, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=50_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--budget-ms", type=float, default=150.0, help="after-path total at --rows")
+    ap.add_argument("--linear-slack", type=float, default=2.0,
+                    help="max ratio of per-row cost at --rows vs the smallest size")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+    logging.getLogger("vizcount").setLevel(logging.WARNING)
+
+    rng = np.random.default_rng(args.seed)
+    paths = {
+        "dates":   (dates_before, dates_after, "expiry_ms"),
+        "buckets": (buckets_before, buckets_after, None),
+        "table":   (table_before, table_after, None),
+    }
+    sizes = sorted({args.rows // 50, args.rows // 10, args.rows // 2, args.rows})
+    failures = 0
+
+    # Same answers first
+    df = _frame(TABLE_STYLE_MAX_ROWS, rng)
+    b, a = dates_before(df["expiry_ms"]), dates_after(df["expiry_ms"])
+    same = (pd.to_datetime(b[0]) == a[0]).all() and (b[1] == a[1]).all()
+    same &= buckets_before(df).equals(buckets_after(df).rename_axis("bucket").set_axis(BUCKET_ORDER))
+    same &= table_before(df) == table_styled(df)
+    print(f"outputs identical: {bool(same)}")
+    failures += not same
+
+    print(f"\n{'rows':>8} " + " ".join(f"{p + ' before':>15} {p + ' after':>13}" for p in paths)
+          + f" {'after total':>12} {'µs/row':>7} {'styled':>12} {'µs/row':>7}")
+    per_row, styled_per_row = {}, {}
+    for n in sizes:
+        df = _frame(n, rng)
+        cells, total = [], 0.0
+        for before, after, col in paths.values():
+            arg = df[col] if col else df
+            tb = _timed(before, arg, max(1, args.repeat // 2))
+            ta = _timed(after, arg, args.repeat)
+            total += ta
+            cells.append(f"{tb:12.1f} ms {ta:10.1f} ms")
+        styled = _timed(table_styled, df, max(1, args.repeat // 2))
+        per_row[n] = total * 1000 / n
+        styled_per_row[n] = styled * 1000 / n
+        print(f"{n:8,} " + " ".join(cells) + f" {total:9.1f} ms {per_row[n]:7.2f}"
+              f" {styled:9.1f} ms {styled_per_row[n]:7.2f}")
+
+    ratio = per_row[sizes[-1]] / per_row[sizes[0]]
+    styled_ratio = styled_per_row[sizes[-1]] / styled_per_row[sizes[0]]
+    total_at_rows = per_row[sizes[-1]] * sizes[-1] / 1000
+    styled_at_cap = _timed(table_styled, _frame(TABLE_STYLE_MAX_ROWS, rng), args.repeat)
+    fits = int(args.budget_ms * 1000 / styled_per_row[sizes[-1]])
+    print(f"\nafter path: {total_at_rows:.1f} ms at {sizes[-1]:,} rows (budget {args.budget_ms:.0f} ms); "
+          f"per-row cost {sizes[-1]:,} vs {sizes[0]:,} rows: ×{ratio:.2f} (slack ×{args.linear_slack})")
+    print(f"styled path: {styled_at_cap:.1f} ms at TABLE_STYLE_MAX_ROWS = {TABLE_STYLE_MAX_ROWS:,} rows; "
+          f"per-row cost {sizes[-1]:,} vs {sizes[0]:,} rows: ×{styled_ratio:.2f}; "
+          f"~{fits:,} rows fit the budget styled")
+    if total_at_rows > args.budget_ms:
+        print("FAIL over budget")
+        failures += 1
+    if styled_at_cap > args.budget_ms:
+        print("FAIL TABLE_STYLE_MAX_ROWS styles more rows than fit the budget")
+        failures += 1
+    if ratio > args.linear_slack:
+        print("FAIL not linear")
+        failures += 1
+    if styled_ratio > args.linear_slack:
+        print("FAIL styled path not linear")
+        failures += 1
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
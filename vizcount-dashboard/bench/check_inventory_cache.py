@@ -0,0 +1,238 @@
+"""
+Checks the loader's stale-while-revalidate cache and incremental refresh
+(data/loader.py::_InventoryCache) against the local DuckDB stand-in.
+
+  1. stale-while-revalidate – with a slow warehouse, only the cold load
+     blocks; after the TTL, 20 concurrent sessions all get the stale entry
+     back immediately, flagged stale, and exactly one background refresh runs
+  2. incremental – an unchanged refresh issues only the watermark query;
+     new scans and floor updates are folded in and match a full reload; a
+     delete is picked up by the next full reconcile
+  3. budget – over CACHE_MAX_MB the per-PID state is dropped from memory
+     after a refresh and read back from the snapshot file, so the next
+     refresh is still incremental and matches a full reload
+  4. cost – time of a full reload vs an incremental refresh vs an unchanged
+     refresh with a large scanned_items table
+
+Exits non-zero on any failure.
+
+Usage (from vizcount-dashboard):
+    python bench/check_inventory_cache.py --rows 1000000
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pandas as pd  # noqa: E402
+import pyarrow as pa  # noqa: E402
+
+import data.loader as loader  # noqa: E402
+from bench.local_warehouse import LocalWarehouse  # noqa: E402
+
+failures = 0
+
+
+def _fail(msg: str) -> None:
+    global failures
+    failures += 1
+    print(f"FAIL {msg}")
+
+
+class _Conn:
+    """What _get_conn() returns: counts queries, optionally slow."""
+
+    def __init__(self, wh: LocalWarehouse, delay: float = 0.0):
+        self.wh, self.delay, self.queries = wh, delay, []
+
+    def query_arrow(self, sql: str) -> pa.Table:
+        kind = "watermarks" if "MAX(created_at)" in sql else "delta" if "'cooler'" in sql else "full"
+        self.queries.append(kind)
+        time.sleep(self.delay)
+        return self.wh.query_arrow(sql)
+
+
+def _fresh_cache(conn: _Conn) -> loader._InventoryCache:
+    """A new cache on *conn*; a snapshot at loader._SNAPSHOT_PATH is served on the first get()."""
+    loader._get_conn = lambda: conn
+    loader._CACHE = loader._InventoryCache()
+    return loader._CACHE
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _by_product(state) -> pd.DataFrame:
+    df = loader._aggregate(state).astype({"category": str, "product": str})
+    return df.sort_values("product", ignore_index=True)
+
+
+def _same_as_full(cache: loader._InventoryCache, conn: _Conn, label: str) -> None:
+    full = _by_product(loader._load_state(conn))
+    got  = _by_product(cache._state)
+    if not full.equals(got):
+        diff = full.merge(got, how="outer", indicator=True).query("_merge != 'both'")
+        _fail(f"{label}: incremental state differs from a full reload:\n{diff}")
+
+
+def check_swr() -> None:
+    delay = 0.5
+    conn  = _Conn(LocalWarehouse(), delay=delay)
+    _fresh_cache(conn)
+    ttl, loader._TTL_S = loader._TTL_S, 0.2
+
+    t0 = time.perf_counter()
+    loader.load_inventory()
+    cold = time.perf_counter() - t0
+    time.sleep(loader._TTL_S)
+    conn.queries.clear()
+
+    waits, stale = [], []
+
+    def session() -> None:
+        t = time.perf_counter()
+        loader.load_inventory()
+        waits.append(time.perf_counter() - t)
+        stale.append(loader.inventory_status().stale)
+
+    threads = [threading.Thread(target=session) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stale_at = loader._CACHE.snapshot.fetched_at
+    while loader._CACHE._refreshing:
+        time.sleep(0.01)
+
+    print(f"swr      cold load {cold * 1000:6.0f} ms; 20 sessions on a stale entry: "
+          f"max wait {max(waits) * 1000:5.1f} ms, {sum(stale)} saw stale, "
+          f"{conn.queries.count('watermarks')} refresh(es) ran")
+    if cold < delay:
+        _fail("the cold load did not wait for the warehouse")
+    if max(waits) >= delay:
+        _fail(f"a session blocked on the refresh ({max(waits):.3f}s)")
+    if not all(stale):
+        _fail("an expired entry was not flagged stale")
+    if conn.queries.count("watermarks") != 1:
+        _fail(f"{conn.queries.count('watermarks')} refreshes ran for 20 sessions, want 1")
+    if loader._CACHE.snapshot.fetched_at <= stale_at:
+        _fail("the background refresh did not replace the stale entry")
+    loader._TTL_S = ttl
+
+
+def check_incremental() -> None:
+    wh    = LocalWarehouse()
+    conn  = _Conn(wh)
+    cache = _fresh_cache(conn)
+    cache._refresh()
+
+    conn.queries.clear()
+    cache._refresh()
+    print(f"unchanged refresh: {conn.queries}")
+    if conn.queries != ["watermarks"]:
+        _fail(f"an unchanged refresh ran {conn.queries}")
+
+    now = _now_ms()
+    wh.execute("INSERT INTO scanned_items (pid, sn, name, best_before_date, count, created_at, updated_at) "
+               "SELECT pid, 'NEW' || pid, name, ?, 7, ?, ? FROM defined_products "
+               "WHERE type = 'Pork' LIMIT 3", [now + 86_400_000, now, now])
+    conn.queries.clear()
+    cache._refresh()
+    print(f"new scans:         {conn.queries}")
+    if conn.queries != ["watermarks", "delta"]:
+        _fail(f"a refresh after new scans ran {conn.queries}")
+    _same_as_full(cache, conn, "new scans")
+
+    wh.execute("UPDATE sales_floor SET count = count + 5, updated_at = ? "
+               "WHERE pid = (SELECT MIN(pid) FROM sales_floor)", [now + 1])
+    cache._refresh()
+    _same_as_full(cache, conn, "floor update")
+
+    wh.execute("DELETE FROM scanned_items WHERE sn LIKE 'NEW%'")
+    cache._refresh()
+    reconcile, loader._RECONCILE_S = loader._RECONCILE_S, 0
+    cache._refresh()
+    loader._RECONCILE_S = reconcile
+    _same_as_full(cache, conn, "delete after reconcile")
+    print("incremental       new scans / floor update / delete+reconcile match a full reload")
+
+
+def check_budget(save) -> None:
+    wh    = LocalWarehouse()
+    conn  = _Conn(wh)
+    cache = _fresh_cache(conn)
+    budget, no_save = loader._MAX_BYTES, loader._save_snapshot
+    loader._MAX_BYTES, loader._save_snapshot = 0, save
+    try:
+        cache._refresh()
+        if cache._state is not None:
+            _fail("the per-PID state stayed in memory over the budget")
+
+        now = _now_ms()
+        wh.execute("INSERT INTO scanned_items (pid, sn, name, best_before_date, count, created_at, updated_at) "
+                   "SELECT pid, 'EVICT' || pid, name, ?, 4, ?, ? FROM defined_products "
+                   "WHERE type = 'Beef' LIMIT 3", [now + 86_400_000, now, now])
+        conn.queries.clear()
+        cache._refresh()
+        if conn.queries != ["watermarks", "delta"]:
+            _fail(f"a refresh after eviction ran {conn.queries}, want an incremental one")
+        if cache._state is not None:
+            _fail("the per-PID state was kept after the second refresh")
+        cache._state = loader._read_snapshot().state
+        _same_as_full(cache, conn, "evicted state")
+    finally:
+        loader._MAX_BYTES, loader._save_snapshot = budget, no_save
+        os.remove(loader._SNAPSHOT_PATH)
+    print("budget   over the budget the state stays on disk; refreshes stay incremental and match")
+
+
+def bench_cost(rows: int) -> None:
+    wh = LocalWarehouse()
+    wh.execute("INSERT INTO scanned_items (pid, sn, name, best_before_date, count, created_at, updated_at) "
+               "SELECT p.pid, 'B' || i, p.name, 1778000000000 + i, 1, 1777000000000, 1777000000000 "
+               "FROM range(?) t(i) JOIN (SELECT pid, name, row_number() OVER () - 1 AS k "
+               "FROM defined_products) p ON p.k = i % 86", [rows])
+    conn  = _Conn(wh)
+    cache = _fresh_cache(conn)
+
+    def timed(fn) -> float:
+        t = time.perf_counter()
+        fn()
+        return (time.perf_counter() - t) * 1000
+
+    full = min(timed(lambda: loader._aggregate(loader._load_state(conn))) for _ in range(3))
+    cache._refresh()
+    unchanged = min(timed(cache._refresh) for _ in range(3))
+    incremental = []
+    for k in range(3):
+        now = _now_ms() + k
+        wh.execute("INSERT INTO scanned_items (pid, sn, name, best_before_date, count, created_at, updated_at) "
+                   "SELECT pid, 'D' || ?, name, ?, 1, ?, ? FROM defined_products LIMIT 1",
+                   [now, now + 86_400_000, now, now])
+        incremental.append(timed(cache._refresh))
+    print(f"cost     {rows:,} scanned rows: full reload {full:6.1f} ms, "
+          f"incremental (1 new scan) {min(incremental):6.1f} ms, unchanged {unchanged:6.1f} ms")
+
+
+if __name__ == "__main__":
+    logging.getLogger("vizcount").setLevel(logging.WARNING)
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=1_000_000, help="scanned_items rows for the cost bench")
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Each check starts cold: no snapshot on disk to warm-start from
+        # (bench/check_snapshot.py covers it)
+        loader._SNAPSHOT_PATH = os.path.join(tmp, "inventory_state.parquet")
+        save, loader._save_snapshot = loader._save_snapshot, lambda saved: None
+        check_swr()
+        check_incremental()
+        check_budget(save)
+        bench_cost(args.rows)
+    print("OK" if not failures else f"{failures} FAILURE(S)")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,170 @@
+"""
+Regression check for the loader's inventory query (data/loader.py::_SQL,
+rolled up per product by _aggregate), run on the local DuckDB stand-in
+(bench/local_warehouse.py).
+
+  1. counts – for every category in snowflake_setup.sql's sample data, the
+     loader's cooler/floor/total counts and expiry date must equal a per-PID
+     aggregate computed in pandas from the raw tables
+  2. row growth – one PID with m cooler rows and n floor rows: the query's
+     largest join must stay linear (at most m + n + catalog rows, from the
+     PID filter over the raw tables), where joining the raw tables produces
+     m × n rows and inflates both counts
+  3. round trips – with the loader pointed at the stand-in, rendering the
+     sidebar badges, quick stats and every category's main view must issue
+     one watermark query and one inventory query on a cold cache
+
+The pre-CTE query is kept below as LEGACY_SQL to show the difference.
+Exits non-zero on any failure.
+
+Usage (from vizcount-dashboard):
+    python bench/check_inventory_sql.py
+"""
+import logging
+import os
+import sys
+import tempfile
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pandas as pd  # noqa: E402
+import pyarrow as pa  # noqa: E402
+
+from bench.local_warehouse import LocalWarehouse  # noqa: E402
+from config.settings import PRODUCTS  # noqa: E402
+import data.loader as loader  # noqa: E402
+from data.loader import _DB, _SCH, _inventory_sql  # noqa: E402
+
+LEGACY_SQL = """
+SELECT
+    p.name                                         AS product,
+    COALESCE(SUM(s.count), 0)                      AS cooler_count,
+    COALESCE(SUM(f.count), 0)                      AS floor_count,
+    COALESCE(MIN(f.expiry_date), MIN(s.best_before_date)) AS expiry_ts
+FROM   {db}.{sch}.defined_products  p
+LEFT JOIN {db}.{sch}.scanned_items  s ON p.pid = s.pid
+LEFT JOIN {db}.{sch}.sales_floor    f ON p.pid = f.pid
+WHERE  p.type = '{category}'
+GROUP  BY p.name
+"""
+
+failures = 0
+
+
+def _fail(msg: str) -> None:
+    global failures
+    failures += 1
+    print(f"FAIL {msg}")
+
+
+def _expected(wh: LocalWarehouse, category: str) -> pd.DataFrame:
+    """Per-product figures from the raw tables, aggregated in pandas."""
+    products = wh.query(f"SELECT name, pid FROM defined_products WHERE type = '{category}'")
+    cooler = wh.query("SELECT pid, count, best_before_date FROM scanned_items")
+    floor = wh.query("SELECT pid, count, expiry_date FROM sales_floor")
+    c = cooler.groupby("PID").agg(cooler_count=("COUNT", "sum"), bb=("BEST_BEFORE_DATE", "min"))
+    f = floor.groupby("PID").agg(floor_count=("COUNT", "sum"), ex=("EXPIRY_DATE", "min"))
+    per_pid = products.join(c, on="PID").join(f, on="PID")
+    out = per_pid.groupby("NAME").agg(
+        cooler_count=("cooler_count", "sum"), floor_count=("floor_count", "sum"),
+        ex=("ex", "min"), bb=("bb", "min"),
+    )
+    out["expiry_ts"] = out["ex"].fillna(out["bb"])
+    return out[["cooler_count", "floor_count", "expiry_ts"]]
+
+
+def check_counts() -> None:
+    wh = LocalWarehouse()
+    everything = loader._aggregate(loader._load_state(wh))
+    inflated = 0
+    for category in PRODUCTS:
+        got = everything[everything["category"] == category].astype({"product": str}).set_index("product")
+        want = _expected(wh, category)
+        if sorted(got.index) != sorted(want.index):
+            _fail(f"{category}: products {sorted(got.index)} != {sorted(want.index)}")
+            continue
+        for col in ("cooler_count", "floor_count"):
+            if not got[col].reindex(want.index).astype("int64").equals(want[col].fillna(0).astype("int64")):
+                _fail(f"{category}.{col}: {got[col].to_dict()} != {want[col].to_dict()}")
+        want_date = (pd.to_datetime(want["expiry_ts"], unit="ms").dt.floor("D")
+                     .fillna(pd.Timestamp(date.today())).astype("datetime64[ms]"))
+        if not got["expiry_date"].reindex(want.index).equals(want_date):
+            _fail(f"{category}.expiry_date differs")
+        if not (got["cooler_count"] + got["floor_count"]).equals(got["total_count"]):
+            _fail(f"{category}: total_count is not cooler + floor")
+        if list(got["days_to_expiry"]) != sorted(got["days_to_expiry"]):
+            _fail(f"{category}: not sorted by days_to_expiry")
+        legacy = wh.query(LEGACY_SQL.format(db=_DB, sch=_SCH, category=category)).set_index("PRODUCT")
+        inflated += int((pd.to_numeric(legacy["COOLER_COUNT"]).reindex(want.index)
+                         != want["cooler_count"].fillna(0)).sum())
+        print(f"counts   {category:20} {len(got):3} products match")
+    print(f"         (the legacy join gets {inflated} products' cooler counts wrong on the same data)")
+
+
+def check_row_growth() -> None:
+    pid, name = "90000001", "GROWTH TEST"
+    for m, n in ((1, 1), (10, 10), (100, 100), (400, 400)):
+        wh = LocalWarehouse(sample_rows=False)
+        wh.execute("INSERT INTO defined_products (name, pid, pack, type) VALUES (?, ?, 6, 'Beef')", [name, pid])
+        wh.execute("INSERT INTO scanned_items (pid, sn, name, best_before_date, count) "
+                   "SELECT ?, 'SN' || i, ?, 1778000000000 + i, 2 FROM range(?) t(i)", [pid, name, m])
+        wh.execute("INSERT INTO sales_floor (pid, name, count, expiry_date) "
+                   "SELECT ?, ?, 3, 1778000000000 + i FROM range(?) t(i)", [pid, name, n])
+        sql = _inventory_sql(["Beef"])
+        legacy = LEGACY_SQL.format(db=_DB, sch=_SCH, category="Beef")
+        row = wh.query(sql).set_index("PRODUCT").loc[name]
+        old = wh.query(legacy).set_index("PRODUCT").loc[name]
+        join_rows, legacy_rows = wh.max_join_rows(sql), wh.max_join_rows(legacy)
+        print(f"growth   m={m:<4} n={n:<4} largest join: {join_rows:5} rows (legacy {legacy_rows:7})  "
+              f"cooler={int(row.COOLER_COUNT)} floor={int(row.FLOOR_COUNT)} "
+              f"(legacy {int(old.COOLER_COUNT)} / {int(old.FLOOR_COUNT)})")
+        if int(row.COOLER_COUNT) != 2 * m or int(row.FLOOR_COUNT) != 3 * n:
+            _fail(f"m={m} n={n}: counts {row.COOLER_COUNT}/{row.FLOOR_COUNT}, want {2 * m}/{3 * n}")
+        catalog = int(wh.query("SELECT COUNT(*) AS N FROM defined_products").N[0])
+        if join_rows > m + n + catalog:
+            _fail(f"m={m} n={n}: largest join produced {join_rows} rows (> m + n + {catalog})")
+        if legacy_rows < m * n:
+            _fail(f"m={m} n={n}: the legacy query no longer shows the m x n join ({legacy_rows})")
+
+
+class _CountingConn:
+    """What _get_conn() returns, counting the queries that reach the DB."""
+
+    def __init__(self, wh: LocalWarehouse):
+        self.wh, self.queries = wh, 0
+
+    def query_arrow(self, sql: str) -> pa.Table:
+        self.queries += 1
+        return self.wh.query_arrow(sql)
+
+
+def check_round_trips() -> None:
+    conn = _CountingConn(LocalWarehouse())
+    loader._get_conn = lambda: conn
+    loader._CACHE = loader._InventoryCache()
+
+    snap = loader.current_snapshot()                        # once per rerun, as app.py
+    inventory = loader.load_inventory(snap)                 # sidebar badges
+    all_df = loader.load_all_data(snap)                     # quick stats
+    views = {cat: loader.load_category_data(cat, snap) for cat in PRODUCTS}   # main view
+    print(f"queries  {conn.queries} for {len(PRODUCTS)} badges + quick stats + "
+          f"{len(views)} category views ({len(all_df)} products)")
+    if conn.queries != 2:
+        _fail(f"a full render issued {conn.queries} queries, want 2 (watermarks + inventory)")
+    for cat, df in views.items():
+        if not df.equals(inventory[cat]) or "category" in df.columns:
+            _fail(f"{cat}: main view differs from the sidebar's frame")
+        if df.empty or list(df["days_to_expiry"]) != sorted(df["days_to_expiry"]):
+            _fail(f"{cat}: not sorted by days_to_expiry")
+
+
+if __name__ == "__main__":
+    logging.getLogger("vizcount").setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        loader._SNAPSHOT_PATH = os.path.join(tmp, "inventory_state.parquet")
+        check_counts()
+        check_row_growth()
+        check_round_trips()
+    print("OK" if not failures else f"{failures} FAILURE(S)")
+    sys.exit(1 if failures else 0)
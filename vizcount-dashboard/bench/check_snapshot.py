@@ -0,0 +1,207 @@
+"""
+Checks the loader's on-disk Parquet snapshot (data/loader.py, "Snapshot on
+disk") against the local DuckDB stand-in.
+
+  1. write     – a successful refresh writes the per-PID state with version,
+                 columns, watermarks and fetch time in the file metadata
+  2. warm boot – a new cache serves the file without waiting for a slow
+                 warehouse, flagged stale; the background refresh that follows
+                 only reads what changed and replaces it
+  3. outage    – with the warehouse down, a new cache serves the snapshot
+                 (live, offline, with its age) instead of mock data, and a
+                 running cache keeps its last good data the same way
+  4. rejects   – files from another version, with other columns or corrupt
+                 are ignored and the cold load goes to the warehouse
+  5. cost      – read / write time and file size with --products products
+
+Exits non-zero on any failure.
+
+Usage (from vizcount-dashboard):
+    python bench/check_snapshot.py --products 100000
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pyarrow.parquet as pq  # noqa: E402
+
+import data.loader as loader  # noqa: E402
+from bench.bench_arrow import _warehouse  # noqa: E402
+from bench.check_inventory_cache import _Conn, _by_product, _fresh_cache, _now_ms  # noqa: E402
+from bench.local_warehouse import LocalWarehouse  # noqa: E402
+
+failures = 0
+
+
+def _fail(msg: str) -> None:
+    global failures
+    failures += 1
+    print(f"FAIL {msg}")
+
+
+class _Down:
+    """A warehouse that is unreachable."""
+
+    def __init__(self):
+        self.queries = []
+
+    def query_arrow(self, sql: str):
+        self.queries.append(sql)
+        raise ConnectionError("warehouse unreachable")
+
+
+def _frames_equal(a: dict, b: dict) -> bool:
+    return all(
+        a[cat].astype({"product": str}).equals(b[cat].astype({"product": str})) for cat in a
+    )
+
+
+def _wait_refresh(cache: loader._InventoryCache) -> None:
+    while cache._refreshing:
+        time.sleep(0.01)
+
+
+def check_write(conn: _Conn) -> loader._InventoryCache:
+    cache = _fresh_cache(conn)
+    cache.get()
+    if not os.path.exists(loader._SNAPSHOT_PATH):
+        _fail("a successful load wrote no snapshot")
+        return cache
+    meta = json.loads(pq.read_schema(loader._SNAPSHOT_PATH).metadata[loader._SNAPSHOT_KEY])
+    print(f"write     version {meta['version']}, marks {meta['marks']}")
+    if meta["version"] != loader._SNAPSHOT_VERSION or meta["columns"] != loader._STATE_COLUMNS:
+        _fail(f"unexpected snapshot metadata {meta}")
+    if meta["marks"] != cache._marks or meta["fetched_at"] != cache.snapshot.fetched_at:
+        _fail("snapshot metadata does not match the cache")
+    return cache
+
+
+def check_warm_boot(wh: LocalWarehouse, written: loader._InventoryCache) -> None:
+    delay = 0.5
+    conn  = _Conn(wh, delay=delay)
+    cache = _fresh_cache(conn)
+    t0 = time.perf_counter()
+    snap = cache.get()
+    wait = time.perf_counter() - t0
+    status = loader.inventory_status()
+    if wait >= delay:
+        _fail(f"the warm boot waited for the warehouse ({wait:.3f}s)")
+    if not _frames_equal(snap.frames, written.snapshot.frames):
+        _fail("the warm boot served different frames than were written")
+    if not status.live or status.offline:
+        _fail(f"the warm boot is flagged {status}")
+
+    # Restored entry is older than the TTL → one background refresh
+    ttl, loader._TTL_S = loader._TTL_S, 0
+    now = _now_ms()
+    wh.execute("INSERT INTO scanned_items (pid, sn, name, best_before_date, count, created_at, updated_at) "
+               "SELECT pid, 'WARM' || pid, name, ?, 3, ?, ? FROM defined_products LIMIT 2",
+               [now + 86_400_000, now, now])
+    cache.get()
+    _wait_refresh(cache)
+    loader._TTL_S = ttl
+    print(f"warm boot served in {wait * 1000:.1f} ms (warehouse {delay * 1000:.0f} ms); "
+          f"background refresh ran {conn.queries}")
+    if conn.queries != ["watermarks", "delta"]:
+        _fail(f"the refresh after a warm boot ran {conn.queries}, want an incremental one")
+    if cache.snapshot.fetched_at <= snap.fetched_at:
+        _fail("the background refresh did not replace the restored snapshot")
+    if not _by_product(cache._state).equals(_by_product(loader._load_state(_Conn(wh)))):
+        _fail("state after the warm-boot refresh differs from a full reload")
+
+
+def check_outage() -> None:
+    down = _Down()
+
+    cache = _fresh_cache(down)
+    saved = loader._read_snapshot()
+    cache.get()
+    cache._refresh()
+    status = loader.inventory_status()
+    print(f"outage    new cache: live={status.live} offline={status.offline} age {status.age_s:.1f}s")
+    if not down.queries:
+        _fail("no refresh was attempted during the outage")
+    if not (status.live and status.offline):
+        _fail(f"an outage with a snapshot on disk is flagged {status}")
+    if not _by_product(cache._state).equals(_by_product(saved.state)):
+        _fail("the outage did not serve the snapshot")
+
+    running = _fresh_cache(_Conn(LocalWarehouse()))
+    running.get()
+    good = running.snapshot
+    loader._get_conn = lambda: down
+    running._refresh()
+    status = loader.inventory_status()
+    print(f"outage    running cache: live={status.live} offline={status.offline}")
+    if running.snapshot is not good or not (status.live and status.offline):
+        _fail("a running cache did not keep its last good data through the outage")
+
+
+def check_rejects(conn: _Conn) -> None:
+    good = open(loader._SNAPSHOT_PATH, "rb").read()
+    table = pq.read_table(loader._SNAPSHOT_PATH)
+    meta = json.loads(table.schema.metadata[loader._SNAPSHOT_KEY])
+
+    def bad_version():
+        meta2 = {**meta, "version": loader._SNAPSHOT_VERSION + 1}
+        pq.write_table(table.replace_schema_metadata(
+            {**table.schema.metadata, loader._SNAPSHOT_KEY: json.dumps(meta2).encode()}),
+            loader._SNAPSHOT_PATH)
+
+    def bad_columns():
+        pq.write_table(table.drop_columns(["min_expiry"]), loader._SNAPSHOT_PATH)
+
+    def corrupt():
+        with open(loader._SNAPSHOT_PATH, "wb") as f:
+            f.write(good[: len(good) // 2])
+
+    for label, spoil in (("version", bad_version), ("columns", bad_columns), ("corrupt", corrupt)):
+        spoil()
+        conn.queries.clear()
+        _fresh_cache(conn).get()
+        if conn.queries[-1:] != ["full"]:
+            _fail(f"a snapshot with a bad {label} was not rejected ({conn.queries})")
+    print("rejects   other version / other columns / corrupt file → cold load from the warehouse")
+
+
+def bench_cost(products: int) -> None:
+    wh = _warehouse(products, seed=7)
+    cache = _fresh_cache(_Conn(wh))
+    cache._refresh()
+    saved = loader._Saved(cache._state, cache._marks, cache.snapshot.fetched_at, cache._full_at)
+
+    def timed(fn) -> float:
+        t = time.perf_counter()
+        fn()
+        return (time.perf_counter() - t) * 1000
+
+    write = min(timed(lambda: loader._save_snapshot(saved)) for _ in range(3))
+    read  = min(timed(loader._read_snapshot) for _ in range(3))
+    warm  = min(timed(lambda: _fresh_cache(_Conn(wh))._restore()) for _ in range(3))
+    cold  = min(timed(lambda: _fresh_cache(_Conn(wh))._refresh()) for _ in range(3))
+    size  = os.path.getsize(loader._SNAPSHOT_PATH) / 2 ** 20
+    print(f"cost      {products:,} products: file {size:.1f} MB, write {write:.0f} ms, read {read:.0f} ms; "
+          f"first frames from snapshot {warm:.0f} ms vs warehouse load {cold:.0f} ms")
+
+
+if __name__ == "__main__":
+    logging.getLogger("vizcount").setLevel(logging.CRITICAL)
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--products", type=int, default=100_000, help="catalog size for the cost bench")
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        loader._SNAPSHOT_PATH = os.path.join(tmp, "inventory_state.parquet")
+        wh = LocalWarehouse()
+        written = check_write(_Conn(wh))
+        check_warm_boot(wh, written)
+        check_outage()
+        check_rejects(_Conn(wh))
+        bench_cost(args.products)
+    print("OK" if not failures else f"{failures} FAILURE(S)")
+    sys.exit(1 if failures else 0)
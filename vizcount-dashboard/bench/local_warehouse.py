@@ -0,0 +1,77 @@
+"""
+Local stand-in for the dashboard's Snowflake database, on DuckDB.
+
+Runs snowflake_setup.sql (tables, catalog and sample rows) into an in-memory
+VIZCOUNT_DB.INVENTORY_SCHEMA and adds the few Snowflake functions the
+loader's SQL uses (TO_TIMESTAMP_NTZ, TO_DATE), so data/loader.py queries run
+unchanged. `query_arrow(sql)` returns an Arrow table with upper-case column
+names, like the connector's fetch_arrow_all(), so a LocalWarehouse can stand
+in for the object `_get_conn()` returns; `query(sql)` is the pandas
+equivalent for checks.
+
+Not deployed — snowflake.yml lists the app's files explicitly.
+"""
+import json
+import os
+import re
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+
+SETUP_SQL = os.path.join(os.path.dirname(__file__), "..", "snowflake_setup.sql")
+
+_MACROS = (
+    # Unix seconds → TIMESTAMP, no session time zone involved.
+    "CREATE MACRO TO_TIMESTAMP_NTZ(s) AS make_timestamp(CAST(s * 1000000 AS BIGINT))",
+    "CREATE MACRO TO_DATE(t) AS CAST(t AS DATE)",
+)
+
+
+def _statements(path: str) -> list[str]:
+    with open(path, encoding="utf-8") as f:
+        sql = re.sub(r"--[^\n]*", "", f.read())
+    return [s.strip() for s in sql.split(";\n") if s.strip()]
+
+
+class LocalWarehouse:
+    def __init__(self, setup_sql: str = SETUP_SQL, sample_rows: bool = True):
+        self.db = duckdb.connect()
+        self.db.execute("ATTACH ':memory:' AS VIZCOUNT_DB")
+        self.db.execute("CREATE SCHEMA VIZCOUNT_DB.INVENTORY_SCHEMA")
+        self.db.execute("USE VIZCOUNT_DB.INVENTORY_SCHEMA")
+        for macro in _MACROS:
+            self.db.execute(macro)
+        for stmt in _statements(setup_sql):
+            head = stmt.split(None, 3)[:3]
+            if head[0] in ("CREATE", "TRUNCATE") and head[1] in ("OR", "TABLE"):
+                self.db.execute(stmt)
+            elif head[0] == "INSERT" and (sample_rows or head[2] == "defined_products"):
+                self.db.execute(stmt)
+
+    def query(self, sql: str) -> pd.DataFrame:
+        df = self.db.execute(sql).df()
+        df.columns = [c.upper() for c in df.columns]
+        return df
+
+    def query_arrow(self, sql: str) -> pa.Table:
+        table = self.db.execute(sql).to_arrow_table()
+        return table.rename_columns([c.upper() for c in table.column_names])
+
+    def execute(self, sql: str, params=None):
+        return self.db.execute(sql, params)
+
+    def max_join_rows(self, sql: str) -> int:
+        """Most rows any join operator produced while running *sql*."""
+        self.db.execute("PRAGMA enable_profiling = 'no_output'")
+        try:
+            self.db.execute(sql).fetchall()
+            tree = json.loads(self.db.get_profiling_information(format="json"))
+        finally:
+            self.db.execute("PRAGMA disable_profiling")
+
+        def walk(node) -> int:
+            rows = node.get("operator_cardinality", 0) if "JOIN" in node.get("operator_type", "") else 0
+            return max([rows, *(walk(child) for child in node.get("children", []))])
+
+        return walk(tree)
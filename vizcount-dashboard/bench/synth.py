@@ -0,0 +1,172 @@
+"""
+Synthetic scanned_items / sales_floor data for load tests, written to
+Parquet with the column names and types of snowflake_setup.sql.
+
+Rows are drawn against the catalog in snowflake_setup.sql
+(defined_products), loaded through bench/local_warehouse.py, the same file
+the sync function's synthetic payloads read. Rows are NumPy-vectorized and
+written in row groups of --chunk rows, so tens of millions of rows fit in a
+few hundred MB of memory:
+
+  skew      – product popularity follows 1 / rank**skew over a shuffled
+              ranking (0 = uniform; 1.1 ≈ a few products get most scans)
+  dates     – created_at rises through the last --days days, as the sync
+              function appends them; best_before_date is created_at plus the
+              product's shelf_life_days (DEFAULT_SHELF_LIFE_DAYS when unset)
+              ± a day. Floor rows expire within their product's shelf life.
+  dup-sn    – that fraction of scans reuses an earlier SN from the same row
+              group (re-scanned cases)
+  floor     – sales_floor rows per scanned_items row; about one in five is
+              updated some hours after it was created
+
+Usage (from vizcount-dashboard):
+    python bench/synth.py --rows 1000000 --out /tmp/vizcount-synth
+"""
+import argparse
+import os
+import sys
+import time
+from typing import NamedTuple, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np  # noqa: E402
+import pyarrow as pa  # noqa: E402
+import pyarrow.compute as pc  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+
+from bench.local_warehouse import LocalWarehouse  # noqa: E402
+
+DAY_MS = 86_400_000
+DEFAULT_SHELF_LIFE_DAYS = 10    # as backend/sync-stream/bench/payloads.py
+
+SCANNED_SCHEMA = pa.schema([
+    ("pid", pa.string()), ("sn", pa.string()), ("name", pa.string()),
+    ("best_before_date", pa.int64()), ("net_kg", pa.float64()), ("count", pa.int32()),
+    ("created_at", pa.int64()), ("updated_at", pa.int64()),
+])
+FLOOR_SCHEMA = pa.schema([
+    ("pid", pa.string()), ("name", pa.string()), ("count", pa.int32()),
+    ("weight", pa.float64()), ("expiry_date", pa.int64()),
+    ("created_at", pa.int64()), ("updated_at", pa.int64()),
+])
+
+
+class Spec(NamedTuple):
+    rows:     int                   # scanned_items rows
+    skew:     float = 1.1
+    days:     int   = 30
+    dup_sn:   float = 0.02
+    floor:    float = 0.1
+    seed:     int   = 7
+    now_ms:   Optional[int] = None  # newest created_at; default: now
+
+
+def catalog() -> pa.Table:
+    """defined_products from snowflake_setup.sql: pid, name, pack, shelf_life_days
+    (DEFAULT_SHELF_LIFE_DAYS where unset)."""
+    wh = LocalWarehouse(sample_rows=False)
+    return wh.execute(
+        "SELECT pid, name, CAST(pack AS BIGINT) AS pack, "
+        f"CAST(COALESCE(shelf_life_days, {DEFAULT_SHELF_LIFE_DAYS}) AS BIGINT) AS shelf_life_days "
+        "FROM defined_products ORDER BY pid"
+    ).to_arrow_table()
+
+
+def _weights(n: int, skew: float, rng: np.random.Generator) -> np.ndarray:
+    w = 1.0 / np.arange(1, n + 1) ** skew
+    return rng.permutation(w / w.sum())
+
+
+def _take(values: pa.Array, idx: np.ndarray) -> pa.Array:
+    return pc.take(values, pa.array(idx))
+
+
+def generate(spec: Spec, out_dir: str, chunk: int = 1_000_000) -> dict[str, str]:
+    """Write scanned_items.parquet and sales_floor.parquet for *spec* into *out_dir*."""
+    rng = np.random.default_rng(spec.seed)
+    cat = catalog()
+    pids, names = cat.column("pid").combine_chunks(), cat.column("name").combine_chunks()
+    pack = cat.column("pack").to_numpy()
+    shelf_ms = cat.column("shelf_life_days").to_numpy() * DAY_MS
+    weights = _weights(len(cat), spec.skew, rng)
+
+    now_ms = spec.now_ms or int(time.time() * 1000)
+    start_ms = now_ms - spec.days * DAY_MS
+    span_ms = spec.days * DAY_MS
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {
+        "scanned_items": os.path.join(out_dir, "scanned_items.parquet"),
+        "sales_floor":   os.path.join(out_dir, "sales_floor.parquet"),
+    }
+
+    with pq.ParquetWriter(paths["scanned_items"], SCANNED_SCHEMA) as w:
+        for lo in range(0, spec.rows, chunk):
+            n = min(chunk, spec.rows - lo)
+            p = rng.choice(len(cat), size=n, p=weights)
+            # Appended in time order: position in the file → created_at
+            created = start_ms + (np.arange(lo, lo + n) * span_ms) // max(spec.rows, 1)
+            created += rng.integers(0, max(span_ms // max(spec.rows, 1), 1), n)
+            best_before = created + shelf_ms[p] + rng.integers(-DAY_MS, DAY_MS, n)
+            count = rng.integers(1, 4 * pack[p] + 1).astype(np.int32)
+
+            sn = np.arange(lo, lo + n)
+            dup = rng.random(n) < spec.dup_sn
+            sn[dup] = lo + rng.integers(0, n, int(dup.sum()))
+            sn_str = pc.binary_join_element_wise("SN", pc.cast(pa.array(sn), pa.string()), "")
+
+            w.write_table(pa.table({
+                "pid":              _take(pids, p),
+                "sn":               sn_str,
+                "name":             _take(names, p),
+                "best_before_date": best_before,
+                "net_kg":           np.round(count * rng.uniform(0.2, 1.5, n), 2),
+                "count":            count,
+                "created_at":       created,
+                "updated_at":       created,
+            }, schema=SCANNED_SCHEMA))
+
+    floor_rows = int(spec.rows * spec.floor)
+    with pq.ParquetWriter(paths["sales_floor"], FLOOR_SCHEMA) as w:
+        for lo in range(0, floor_rows, chunk):
+            n = min(chunk, floor_rows - lo)
+            p = rng.choice(len(cat), size=n, p=weights)
+            created = np.sort(start_ms + rng.integers(0, span_ms, n))
+            updated = np.where(rng.random(n) < 0.2, created + rng.integers(0, 12 * 3_600_000, n), created)
+            count = rng.integers(1, 21, n).astype(np.int32)
+            w.write_table(pa.table({
+                "pid":         _take(pids, p),
+                "name":        _take(names, p),
+                "count":       count,
+                "weight":      np.round(count * rng.uniform(0.2, 1.5, n), 2),
+                "expiry_date": created + (rng.random(n) * shelf_ms[p]).astype(np.int64),
+                "created_at":  created,
+                "updated_at":  np.minimum(updated, now_ms),
+            }, schema=FLOOR_SCHEMA))
+    return paths
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=1_000_000, help="scanned_items rows")
+    ap.add_argument("--out", required=True, help="output directory")
+    ap.add_argument("--skew", type=float, default=Spec._field_defaults["skew"])
+    ap.add_argument("--days", type=int, default=Spec._field_defaults["days"])
+    ap.add_argument("--dup-sn", type=float, default=Spec._field_defaults["dup_sn"])
+    ap.add_argument("--floor", type=float, default=Spec._field_defaults["floor"])
+    ap.add_argument("--seed", type=int, default=Spec._field_defaults["seed"])
+    ap.add_argument("--chunk", type=int, default=1_000_000, help="rows per Parquet row group")
+    args = ap.parse_args()
+
+    spec = Spec(args.rows, args.skew, args.days, args.dup_sn, args.floor, args.seed)
+    t0 = time.perf_counter()
+    paths = generate(spec, args.out, args.chunk)
+    elapsed = time.perf_counter() - t0
+    for table, path in paths.items():
+        meta = pq.read_metadata(path)
+        print(f"{table:14} {meta.num_rows:>12,} rows  {os.path.getsize(path) / 2 ** 20:8.1f} MB  {path}")
+    print(f"generated in {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,14 +11,7 @@ import plotly.graph_objects as go
 import streamlit as st
 
 from config.settings import BUCKET_ORDER, BUCKET_COLORS, CHART_LAYOUT
-
-
-def _expiry_bucket(days: int) -> str:
-    if days < 0:  return "Expired"
-    if days == 0: return "Today"
-    if days == 1: return "1 Day"
-    if days == 2: return "2 Days"
-    return "5+ Days"
+from utils.transforms import expiry_bucket
 
 
 def render_charts_row(df: pd.DataFrame) -> None:
@@ -54,10 +47,9 @@ def render_charts_row(df: pd.DataFrame) -> None:
         st.markdown('<div class="section-title">Expiry Timeline</div>', unsafe_allow_html=True)
         st.markdown('<div class="section-sub">Item counts grouped by days until expiry</div>', unsafe_allow_html=True)
 
-        df = df.copy()
-        df["bucket"] = df["days_to_expiry"].apply(_expiry_bucket)
         bucket_df = (
-            df.groupby("bucket")["total_count"]
+            df["total_count"]
+            .groupby(expiry_bucket(df["days_to_expiry"]), observed=False)
             .sum()
             .reindex(BUCKET_ORDER, fill_value=0)
             .reset_index()
@@ -8,32 +8,22 @@ conditional background color based on expiry status:
   Expires Today  → amber (#fef9c3)
   1–2 Days       → blue  (#dbeafe)
   3+ Days        → white (default)
+
+Row colours go through pandas Styler, which handles every styled cell in
+Python (both in Styler and in st.dataframe's marshalling). Above
+TABLE_STYLE_MAX_ROWS rows (config/settings.py) the table renders unstyled —
+the Status column still carries the same information — so render time stays
+bounded.
 """
 
 import pandas as pd
 import streamlit as st
 
+from config.settings import TABLE_STYLE_MAX_ROWS
+from utils.logger import get_logger
+from utils.transforms import row_styles, status_text
 
-# ── Row color helper ──────────────────────────────────────────────────────────
-
-def _row_color(row: pd.Series) -> list[str]:
-    days = row["days_to_expiry"]
-    if days < 0:
-        bg = "background-color: #fee2e2; color: #991b1b"
-    elif days == 0:
-        bg = "background-color: #fef9c3; color: #854d0e"
-    elif days <= 2:
-        bg = "background-color: #dbeafe; color: #1e40af"
-    else:
-        bg = ""
-    return [bg] * len(row)
-
-
-def _fmt_status(days: int) -> str:
-    if days < 0:  return f"Expired {abs(days)}d ago"
-    if days == 0: return "Expires Today"
-    if days == 1: return "Tomorrow"
-    return f"In {days} days"
+log = get_logger("inventory_table")
 
 
 # ── Public render function ────────────────────────────────────────────────────
@@ -42,9 +32,14 @@ def render_inventory_table(df: pd.DataFrame) -> None:
     st.markdown('<div class="section-title">Product Inventory Detail</div>', unsafe_allow_html=True)
     st.markdown('<div class="section-sub">Full breakdown per product with expiry status</div>', unsafe_allow_html=True)
 
+    st.dataframe(_table(df), use_container_width=True, hide_index=True)
+
+
+def _table(df: pd.DataFrame, style_max_rows: int = TABLE_STYLE_MAX_ROWS):
+    """The table as st.dataframe takes it: a Styler, or a plain frame above *style_max_rows*."""
     display_df = df[["product", "cooler_count", "floor_count", "expiry_date", "days_to_expiry"]].copy()
     display_df["expiry_date"] = display_df["expiry_date"].astype(str)
-    display_df["status"]      = display_df["days_to_expiry"].apply(_fmt_status)
+    display_df["status"]      = status_text(display_df["days_to_expiry"])
 
     # Rename columns before styling so headers appear correctly
     display_df = display_df.rename(columns={
@@ -56,25 +51,15 @@ def render_inventory_table(df: pd.DataFrame) -> None:
         "status":         "Status",
     })
 
-    # Apply row coloring — use a version of _row_color adapted to renamed columns
-    def _row_color_renamed(row: pd.Series) -> list[str]:
-        days = row["Days"]
-        if days < 0:
-            bg = "background-color: #fee2e2; color: #991b1b"
-        elif days == 0:
-            bg = "background-color: #fef9c3; color: #854d0e"
-        elif days <= 2:
-            bg = "background-color: #dbeafe; color: #1e40af"
-        else:
-            bg = ""
-        return [bg] * len(row)
+    if len(display_df) > style_max_rows:
+        log.info("Inventory table has %d rows — rendering without row colours.", len(display_df))
+        return display_df
 
-    styled = (
+    # Row coloring from one precomputed CSS array (see utils/transforms.py)
+    return (
         display_df
         .style
-        .apply(_row_color_renamed, axis=1)
+        .apply(row_styles, axis=None, days_col="Days")
         .hide(axis="index")
         .format({"Cooler": "{:d}", "Floor": "{:d}"})
     )
-
-    st.dataframe(styled, use_container_width=True)
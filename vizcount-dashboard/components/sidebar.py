@@ -4,20 +4,18 @@ components/sidebar.py
 Left navigation: category selector + global quick stats + debug log panel.
 """
 
-from datetime import datetime
-
 import streamlit as st
 
 from config.settings import PRODUCTS
-from data.loader import load_all_data, load_category_data
+from data.loader import Snapshot, inventory_status, load_all_data, load_inventory
 from utils.icons import ICON_BRAND
 from utils.logger import LOG_RECORDS, get_logger
 
 log = get_logger("sidebar")
 
 
-def render_sidebar() -> str:
-    """Render the sidebar and return the selected category name."""
+def render_sidebar(snap: Snapshot) -> str:
+    """Render the sidebar from *snap* and return the selected category name."""
     with st.sidebar:
         # Brand header
         st.markdown(
@@ -42,11 +40,12 @@ def render_sidebar() -> str:
             unsafe_allow_html=True,
         )
 
-        # Per-category expiry badge counts
-        expiry_counts: dict[str, int] = {}
-        for cat in PRODUCTS:
-            df_tmp = load_category_data(cat)
-            expiry_counts[cat] = int(df_tmp[df_tmp["days_to_expiry"] <= 1].shape[0])
+        # Per-category expiry badge counts — one cached query covers them all
+        inventory = load_inventory(snap)
+        expiry_counts: dict[str, int] = {
+            cat: int((df_tmp["days_to_expiry"] <= 1).sum())
+            for cat, df_tmp in inventory.items()
+        }
 
         selected_category = st.radio(
             label="Category",
@@ -64,7 +63,7 @@ def render_sidebar() -> str:
             unsafe_allow_html=True,
         )
 
-        all_df = load_all_data()
+        all_df = load_all_data(snap)
         expiring_today  = int(all_df[all_df["days_to_expiry"] == 0].shape[0])
         already_expired = int(all_df[all_df["days_to_expiry"] < 0].shape[0])
 
@@ -87,7 +86,7 @@ def render_sidebar() -> str:
         st.divider()
         st.markdown(
             f'<div style="font-size:10px;color:#475569">Last updated: '
-            f'{datetime.now().strftime("%I:%M:%S %p")}</div>',
+            f'{inventory_status(snap).fetched_at.strftime("%I:%M:%S %p")}</div>',
             unsafe_allow_html=True,
         )
 
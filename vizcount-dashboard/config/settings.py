@@ -4,6 +4,9 @@ config/settings.py
 Central configuration: page setup, product catalogue, chart theme.
 """
 
+import os
+import tempfile
+
 PAGE_CONFIG = dict(
     page_title="VizCount · Meat Department",
     page_icon="🗃️",
@@ -71,6 +74,28 @@ BUCKET_COLORS: dict[str, str] = {
     "5+ Days": "#22c55e",
 }
 
+# ── Inventory table ───────────────────────────────────────────────────────────
+# Row colours go through pandas Styler, which costs ~70 µs per row (every cell
+# is styled in Python); above this many rows the table renders unstyled.
+# bench/bench_transforms.py reports how many rows fit its budget styled.
+TABLE_STYLE_MAX_ROWS = 1_500
+
+# ── Inventory snapshot ────────────────────────────────────────────────────────
+# Last good per-PID state on disk, for warm starts and outages (data/loader.py).
+# Warm starts need the file to outlive a container restart: set
+# VIZCOUNT_SNAPSHOT_PATH to a file on a persistent volume where the runtime has
+# one. Without it the file goes under the temp dir, which a restart may wipe.
+SNAPSHOT_PATH = os.environ.get("VIZCOUNT_SNAPSHOT_PATH") or os.path.join(
+    tempfile.gettempdir(), "vizcount", "inventory_state.parquet",
+)
+
+# ── Inventory cache ───────────────────────────────────────────────────────────
+# Memory budget for the loader's process-wide cache (data/loader.py). Above it
+# the per-PID state kept for incremental refreshes is dropped from memory and
+# read back from the snapshot file on the next refresh; the frames being
+# served stay. VIZCOUNT_CACHE_MAX_MB overrides the default.
+CACHE_MAX_MB = float(os.environ.get("VIZCOUNT_CACHE_MAX_MB") or 256)
+
 # ── Shared Plotly layout ──────────────────────────────────────────────────────
 CHART_LAYOUT = dict(
     paper_bgcolor="white",
@@ -12,8 +12,61 @@ Connection strategy (tried in order)
 2. st.connection("vizcount_dashboard", type="snowflake")
    → Local dev: reads .streamlit/secrets.toml.
 
-If both fail the loader falls back to reproducible mock data so the dashboard
-stays functional while the DB is being set up.
+If both fail the loader serves the last-known-good snapshot (see below) and,
+when there is none, reproducible mock data so the dashboard stays functional
+while the DB is being set up.
+
+Caching (stale-while-revalidate)
+────────────────────────────────
+One process-wide _InventoryCache serves every session. An entry older than
+_TTL_S is still returned immediately — flagged stale via inventory_status() —
+while a single background thread refreshes it; concurrent sessions never
+start a second refresh. Only a first load with no snapshot on disk blocks.
+
+A refresh can land mid-rerun, so a page that reads the cache several times
+could mix two refreshes. app.py takes one Snapshot per rerun with
+current_snapshot() and passes it to every public function below.
+
+Refreshes are incremental. The cache keeps per-PID totals; a watermark
+query (MAX created_at / updated_at per table, answered from metadata)
+decides whether anything changed, and if so only scanned_items rows created
+since the last watermark and the sales_floor PIDs touched since then are
+read and folded in (see _DELTA_SQL). Per-product figures are rolled up in
+pandas. A full reload runs on a cold start, when defined_products changes and
+every _RECONCILE_S — it catches deletes and rows synced late with old
+created_at timestamps.
+
+Frames
+──────
+Results are fetched as Arrow tables (cursor.fetch_arrow_all) and converted
+to pandas once, with compact dtypes: product/category categorical, counts
+int32, timestamps datetime64[ms]. See _frame().
+
+Every session reads the same snapshot frames, including the all-category
+frame built once per refresh. Nothing is pickled or deep-copied per rerun:
+the public functions return shallow views, and Copy-on-Write (always on from
+pandas 3, switched on by app.py for pandas 2) means a write through a view
+copies the touched column first, so it never reaches the shared data. Each
+refresh swaps in a new snapshot; the old one is freed once the last rerun
+that holds it finishes, so memory stays at about one snapshot however many
+sessions are open.
+
+The cache holds that snapshot plus the per-PID state incremental refreshes
+fold into. When the two together exceed CACHE_MAX_MB (settings.py), the
+state is dropped from memory once it is safely in the snapshot file and read
+back from there by the next refresh.
+
+Snapshot on disk
+────────────────
+Every successful refresh also writes the per-PID state, its watermarks and
+fetch time to a Parquet file at _SNAPSHOT_PATH (settings.SNAPSHOT_PATH,
+set by VIZCOUNT_SNAPSHOT_PATH, else under the temp dir), tagged with
+_SNAPSHOT_VERSION. A cold start serves that file straight away (flagged
+stale, refreshed in the background — incrementally when the watermarks still
+apply). If Snowflake is unreachable the cache keeps serving the last good
+data, on disk or in memory, with inventory_status().offline set and its age,
+instead of mock data. A file from another version or with other columns is
+ignored.
 
 Schema notes
 ────────────
@@ -22,15 +75,24 @@ Schema notes
 • defined_products.type           – VARCHAR matching PRODUCTS keys in settings.py
 """
 
+import json
+import os
 import random
+import threading
+import time
 import traceback
 from datetime import datetime, date, timedelta
+from typing import NamedTuple, Optional
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import streamlit as st
 
-from config.settings import PRODUCTS, EXPIRY_OFFSETS
+from config.settings import CACHE_MAX_MB, EXPIRY_OFFSETS, PRODUCTS, SNAPSHOT_PATH
 from utils.logger import get_logger
+from utils.transforms import days_until, to_day
 
 log = get_logger("loader")
 
@@ -39,6 +101,28 @@ log = get_logger("loader")
 _DB  = "VIZCOUNT_DB"
 _SCH = "INVENTORY_SCHEMA"
 
+_TTL_S        = 60              # age at which cached data is served stale + refreshed
+_RECONCILE_S  = 10 * 60         # full reload interval (catches deletes / late syncs)
+_LAG_MS       = 5 * 60 * 1000   # sales_floor re-read overlap behind the watermark
+_MAX_BYTES    = int(CACHE_MAX_MB * 2 ** 20)   # snapshot + per-PID state kept in memory
+
+# Last good per-PID state, for warm starts and outages. Bump the version
+# whenever the state's columns or dtypes change; older files are then ignored.
+# The path is configured in settings.py (VIZCOUNT_SNAPSHOT_PATH).
+_SNAPSHOT_PATH    = SNAPSHOT_PATH
+_SNAPSHOT_VERSION = 1
+_SNAPSHOT_KEY     = b"vizcount.snapshot"
+
+_COLUMNS = [
+    "product", "cooler_count", "floor_count",
+    "total_count", "expiry_date", "days_to_expiry",
+]
+_COUNT_COLUMNS = ("cooler_count", "floor_count", "total_count", "days_to_expiry")
+_STATE_COLUMNS = [
+    "category", "product", "pid",
+    "cooler_count", "min_best_before", "floor_count", "min_expiry",
+]
+
 # ── Mock fallback ─────────────────────────────────────────────────────────────
 
 _SEED  = 42
@@ -46,43 +130,57 @@ _today = datetime.today().date()
 
 
 def _mock_data(category: str) -> pd.DataFrame:
-    """Reproducible mock inventory data — used when Snowflake is unreachable."""
-    random.seed(_SEED)
+    """Reproducible mock inventory data — used when Snowflake is unreachable.
+
+    Uses its own seeded generator, leaving the global `random` state alone.
+    For load-testing volumes see bench/synth.py.
+    """
+    rng  = random.Random(_SEED)
     rows = []
     for product in PRODUCTS[category]:
-        offset = random.choice(EXPIRY_OFFSETS)
+        offset = rng.choice(EXPIRY_OFFSETS)
         expiry = _today + timedelta(days=offset)
         rows.append({
             "product":        product,
-            "cooler_count":   random.randint(8, 80),
-            "floor_count":    random.randint(2, 25),
+            "cooler_count":   rng.randint(8, 80),
+            "floor_count":    rng.randint(2, 25),
             "expiry_date":    expiry,
             "days_to_expiry": (expiry - _today).days,
         })
     df = pd.DataFrame(rows)
     df["total_count"] = df["cooler_count"] + df["floor_count"]
-    return df
+    df["expiry_date"] = pd.to_datetime(df["expiry_date"]).astype("datetime64[ms]")
+    df["product"] = df["product"].astype("category")
+    for col in _COUNT_COLUMNS:
+        df[col] = df[col].astype("int32")
+    return df[_COLUMNS]
 
 
 # ── Snowflake connection ──────────────────────────────────────────────────────
 
 
-class _SnowparkConn:
+class _ArrowConn:
     """
-    Thin wrapper around a Snowpark Session so callers can use conn.query(sql)
-    uniformly whether the underlying object is a Snowpark Session or a
-    Streamlit st.connection object.
+    Thin wrapper around a snowflake-connector connection so callers can use
+    conn.query_arrow(sql) uniformly whether the underlying object came from a
+    Snowpark Session or a Streamlit st.connection object.
+
+    fetch_arrow_all() hands back the result batches Snowflake already sends
+    in Arrow format — no per-row Python objects, unlike to_pandas() via
+    Snowpark or st.connection.query().
     """
-    def __init__(self, session):
-        self._session = session
+    def __init__(self, raw_connection):
+        self._raw = raw_connection
 
-    def query(self, sql: str) -> "pd.DataFrame":
-        return self._session.sql(sql).to_pandas()
+    def query_arrow(self, sql: str) -> pa.Table:
+        with self._raw.cursor() as cur:
+            cur.execute(sql)
+            return cur.fetch_arrow_all(force_return_table=True)
 
 
 def _get_conn():
     """
-    Return a connection object that exposes a .query(sql) method.
+    Return a connection object that exposes a .query_arrow(sql) method.
 
     Connection strategy (tried in order):
 
@@ -104,7 +202,7 @@ def _get_conn():
         from snowflake.snowpark.context import get_active_session
         session = get_active_session()
         log.info("Connected via Snowpark get_active_session() (SiS native)")
-        return _SnowparkConn(session)
+        return _ArrowConn(session.connection)
     except Exception as e:
         log.warning(
             "SiS Snowpark session unavailable (%s: %s) — trying st.connection.",
@@ -117,7 +215,7 @@ def _get_conn():
         try:
             conn = st_connection("vizcount_dashboard", type="snowflake")
             log.info("Connected via st.connection ('vizcount_dashboard')")
-            return conn
+            return _ArrowConn(conn.raw_connection)
         except Exception as e:
             log.error("st.connection failed: %s", e)
     else:
@@ -133,130 +231,478 @@ def _get_conn():
     )
 
 
-# ── SQL query ─────────────────────────────────────────────────────────────────
-
-# {db} / {sch} substituted first; {{category}} survives as {category} then
-# replaced with the actual value — avoids f-string injection issues.
+# ── SQL queries ───────────────────────────────────────────────────────────────
+
+# {db} / {sch} substituted first; {{categories}} survives as {categories}
+# then replaced with the quoted category list — avoids f-string injection
+# issues.
+#
+# One query covers every category and returns one row per PID: the per-PID
+# state that incremental refreshes fold into. _aggregate() rolls it up per
+# product and _partition() splits it per category in pandas, so the sidebar
+# badges, quick stats and main view all come from a single round trip.
+#
+# Each source is aggregated per PID in its own CTE *before* the join. Joining
+# the raw tables instead gives m × n rows for a PID with m cooler rows and n
+# floor rows — SUM(s.count) is then counted n times, SUM(f.count) m times,
+# and the join grows quadratically as cases pile up. Both CTEs only read the
+# requested categories' PIDs.
 _SQL = """
+WITH products AS (
+    SELECT type, name, pid
+    FROM   {db}.{sch}.defined_products
+    WHERE  type IN ({{categories}})
+),
+cooler AS (
+    SELECT s.pid,
+           SUM(s.count)            AS cooler_count,
+           MIN(s.best_before_date) AS min_best_before
+    FROM   {db}.{sch}.scanned_items s
+    WHERE  s.pid IN (SELECT pid FROM products)
+    GROUP  BY s.pid
+),
+floor AS (
+    SELECT f.pid,
+           SUM(f.count)            AS floor_count,
+           MIN(f.expiry_date)      AS min_expiry
+    FROM   {db}.{sch}.sales_floor f
+    WHERE  f.pid IN (SELECT pid FROM products)
+    GROUP  BY f.pid
+)
 SELECT
+    p.type                                         AS category,
     p.name                                         AS product,
-    COALESCE(SUM(s.count), 0)                      AS cooler_count,
-    COALESCE(SUM(f.count), 0)                      AS floor_count,
-    COALESCE(SUM(s.count), 0)
-        + COALESCE(SUM(f.count), 0)                AS total_count,
-    COALESCE(
-        MIN(f.expiry_date),
-        MIN(s.best_before_date)
-    )                                              AS expiry_ts,
-    DATEDIFF(
-        'day',
-        CURRENT_DATE(),
-        TO_DATE(
-            TO_TIMESTAMP_NTZ(
-                COALESCE(MIN(f.expiry_date), MIN(s.best_before_date)) / 1000
-            )
-        )
-    )                                              AS days_to_expiry
-FROM   {db}.{sch}.defined_products  p
-LEFT JOIN {db}.{sch}.scanned_items  s ON p.pid = s.pid
-LEFT JOIN {db}.{sch}.sales_floor    f ON p.pid = f.pid
-WHERE  p.type = '{{category}}'
-GROUP  BY p.name
-ORDER  BY days_to_expiry ASC NULLS LAST
+    p.pid,
+    COALESCE(c.cooler_count, 0)                    AS cooler_count,
+    c.min_best_before,
+    COALESCE(f.floor_count, 0)                     AS floor_count,
+    f.min_expiry
+FROM   products p
+LEFT JOIN cooler c ON p.pid = c.pid
+LEFT JOIN floor  f ON p.pid = f.pid
 """
 
+# Incremental refresh, one row per PID that changed since the last refresh.
+#   cooler – scanned_items is append-only (the sync function only INSERTs),
+#            so rows created in (previous, current] watermark are *added* to
+#            the state. The range only touches the newest micro-partitions.
+#   floor  – sales_floor is upserted per PID, so every PID with a row created
+#            or updated after the watermark is re-aggregated and replaces its
+#            state. Idempotent, hence the _LAG_MS overlap for commit races.
+_DELTA_SQL = """
+SELECT 'cooler'                AS source,
+       pid,
+       SUM(count)              AS n,
+       MIN(best_before_date)   AS min_ts
+FROM   {db}.{sch}.scanned_items
+WHERE  created_at > {cooler_from} AND created_at <= {cooler_to}
+GROUP  BY pid
+UNION ALL
+SELECT 'floor'                 AS source,
+       pid,
+       SUM(count)              AS n,
+       MIN(expiry_date)        AS min_ts
+FROM   {db}.{sch}.sales_floor
+WHERE  pid IN (
+       SELECT pid FROM {db}.{sch}.sales_floor
+       WHERE  created_at > {floor_from} OR updated_at > {floor_from}
+)
+GROUP  BY pid
+"""
 
-def _ms_to_date(ms_val) -> date:
-    """Convert a Unix-ms BIGINT from Snowflake to a Python date.
+# Newest timestamps per table. Plain MAX over a column is answered from
+# micro-partition metadata, so this costs next to nothing.
+_WATERMARK_SQL = """
+SELECT (SELECT MAX(created_at) FROM {db}.{sch}.scanned_items)    AS scanned_items,
+       (SELECT GREATEST(COALESCE(MAX(created_at), 0), COALESCE(MAX(updated_at), 0))
+        FROM   {db}.{sch}.sales_floor)                           AS sales_floor,
+       (SELECT GREATEST(COALESCE(MAX(created_at), 0), COALESCE(MAX(updated_at), 0))
+        FROM   {db}.{sch}.defined_products)                      AS defined_products
+"""
 
-    Snowflake NULL values arrive as float NaN in pandas (not Python None),
-    so we guard against both None and NaN before calling int().
-    """
-    if ms_val is None or pd.isna(ms_val):
-        return date.today()
-    return datetime.utcfromtimestamp(int(ms_val) / 1000).date()
+def _inventory_sql(categories) -> str:
+    """The per-PID state query for *categories*, ready to run."""
+    quoted = ", ".join("'" + c.replace("'", "''") + "'" for c in categories)
+    return _SQL.format(db=_DB, sch=_SCH).replace("{categories}", quoted)
 
 
-def _load_from_snowflake(category: str) -> pd.DataFrame:
-    """
-    Execute the aggregation query for one category and return a clean DataFrame.
+def _fetch(conn, sql: str) -> pa.Table:
+    """Run *sql*; Snowflake returns uppercase column names — normalise to lowercase."""
+    log.debug("SQL:\n%s", sql)
+    table = conn.query_arrow(sql)
+    return table.rename_columns([c.lower() for c in table.column_names])
 
-    Not cached with @st.cache_data here — caching is applied at the public API
-    layer (load_category_data) so that both live and fallback paths share the
-    same TTL, and the connection object never leaks into cache storage.
+
+def _frame(table: pa.Table, counts=(), timestamps=(), categories=()) -> pd.DataFrame:
+    """
+    Convert an Arrow result to pandas in one pass with compact dtypes:
+    *counts* → int32 (NULL → 0), Unix-ms *timestamps* → datetime64[ms] (NULL
+    → NaT), *categories* → categorical. Casts happen column-wise in Arrow;
+    self_destruct releases each Arrow column as it is converted.
+    """
+    for name in counts:
+        i = table.schema.get_field_index(name)
+        col = pc.fill_null(pc.cast(table.column(i), pa.int64()), 0)
+        table = table.set_column(i, name, pc.cast(col, pa.int32()))
+    for name in timestamps:
+        i = table.schema.get_field_index(name)
+        col = pc.cast(pc.cast(table.column(i), pa.int64()), pa.timestamp("ms"))
+        table = table.set_column(i, name, col)
+    for name in categories:
+        i = table.schema.get_field_index(name)
+        table = table.set_column(i, name, pc.dictionary_encode(table.column(i)))
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def _watermarks(conn) -> dict[str, int]:
+    """Newest timestamp (Unix ms) per table, 0 for an empty table."""
+    row = _fetch(conn, _WATERMARK_SQL.format(db=_DB, sch=_SCH)).to_pylist()[0]
+    return {table: 0 if v is None else int(v) for table, v in row.items()}
+
+
+def _load_state(conn) -> pd.DataFrame:
     """
-    log.info("Querying Snowflake for category='%s'", category)
+    Full load: the per-PID state for every category in PRODUCTS, indexed by
+    pid. Missing min_* timestamps are NaT.
+    """
+    log.info("Querying Snowflake for %d categories (full)", len(PRODUCTS))
+    table = _fetch(conn, _inventory_sql(PRODUCTS))
+    log.info("Query returned %d PID row(s)", table.num_rows)
+    df = _frame(
+        table,
+        counts=("cooler_count", "floor_count"),
+        timestamps=("min_best_before", "min_expiry"),
+        categories=("category", "product"),
+    )
+    return df.set_index("pid")
 
-    conn  = _get_conn()
-    query = _SQL.format(db=_DB, sch=_SCH).replace("{category}", category)
 
-    log.debug("SQL:\n%s", query)
+def _load_delta(conn, since: dict[str, int], until: dict[str, int]) -> pd.DataFrame:
+    """The _DELTA_SQL rows (source, n, min_ts) between two watermarks, indexed by pid."""
+    table = _fetch(conn, _DELTA_SQL.format(
+        db=_DB, sch=_SCH,
+        cooler_from=since["scanned_items"],
+        cooler_to=until["scanned_items"],
+        floor_from=since["sales_floor"] - _LAG_MS,
+    ))
+    log.info("Incremental refresh: %d changed PID row(s)", table.num_rows)
+    return _frame(table, counts=("n",), timestamps=("min_ts",)).set_index("pid")
 
-    # DO NOT pass ttl= here — conn.query(ttl=...) is Streamlit's own cache
-    # layer and conflicts with @st.cache_data on the caller.
-    df = conn.query(query)
-    log.info("Query returned %d row(s) for '%s'", len(df), category)
 
-    if df.empty:
-        log.warning("Empty result for '%s' — no matching products in DB.", category)
-        return pd.DataFrame(columns=[
-            "product", "cooler_count", "floor_count",
-            "total_count", "expiry_date", "days_to_expiry",
-        ])
+def _fold(state: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """Apply a _load_delta() result to *state*; PIDs outside the state are ignored."""
+    state = state.copy()
 
-    # Snowflake returns uppercase column names — normalise to lowercase
-    df.columns = [c.lower() for c in df.columns]
+    cooler = delta[(delta["source"] == "cooler") & delta.index.isin(state.index)]
+    state.loc[cooler.index, "cooler_count"] += cooler["n"]
+    state.loc[cooler.index, "min_best_before"] = pd.concat(
+        [state.loc[cooler.index, "min_best_before"], cooler["min_ts"]], axis=1,
+    ).min(axis=1)
 
-    # Convert raw BIGINT Unix-ms → Python date
-    df["expiry_date"] = df["expiry_ts"].apply(_ms_to_date)
-    df = df.drop(columns=["expiry_ts"], errors="ignore")
+    floor = delta[(delta["source"] == "floor") & delta.index.isin(state.index)]
+    state.loc[floor.index, "floor_count"] = floor["n"]
+    state.loc[floor.index, "min_expiry"]  = floor["min_ts"]
+    return state
 
-    # Enforce correct dtypes
-    for col in ("cooler_count", "floor_count", "total_count", "days_to_expiry"):
-        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
 
-    log.debug("Processed DataFrame columns: %s", list(df.columns))
-    return df
+def _aggregate(state: pd.DataFrame) -> pd.DataFrame:
+    """
+    Roll the per-PID state up to one row per product, soonest expiry first,
+    with a `category` column. Floor expiry wins over cooler best-before; a
+    product with neither gets today's date and sorts last.
+    """
+    if state.empty:
+        return pd.DataFrame(columns=["category", *_COLUMNS])
+    df = state.groupby(["category", "product"], as_index=False, sort=False, observed=True).agg(
+        cooler_count=("cooler_count", "sum"),
+        floor_count=("floor_count", "sum"),
+        min_best_before=("min_best_before", "min"),
+        min_expiry=("min_expiry", "min"),
+    )
+    df["total_count"] = df["cooler_count"] + df["floor_count"]
 
+    # Timestamps are UTC → calendar date, days counted from today
+    today = date.today()
+    expiry_date = to_day(df["min_expiry"].fillna(df["min_best_before"]))
+    df["days_to_expiry"] = days_until(expiry_date, today)
+    df["expiry_date"] = expiry_date.fillna(pd.Timestamp(today))
 
-# ── Public API ────────────────────────────────────────────────────────────────
+    df = df.sort_values("days_to_expiry", na_position="last", kind="stable", ignore_index=True)
+    df = df.drop(columns=["min_best_before", "min_expiry"])
 
-@st.cache_data(ttl=60)
-def load_category_data(category: str) -> pd.DataFrame:
-    """Return aggregated inventory DataFrame for *category*.
+    # Enforce compact dtypes (a sum of int32 comes back as int64)
+    for col in _COUNT_COLUMNS:
+        df[col] = df[col].fillna(0).astype("int32")
+    return df
+
+
+def _partition(df: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """Split the all-category result into one frame per PRODUCTS key.
 
-    Tries Snowflake first; on any failure logs the full traceback and falls
-    back to reproducible mock data so the dashboard stays functional.
+    Row order (soonest expiry first) is kept within each category.
     """
+    groups = {
+        cat: g.drop(columns="category").reset_index(drop=True)
+        for cat, g in df.groupby("category", sort=False, observed=True)
+    }
+    for g in groups.values():
+        # Each frame keeps only its own product names, not the whole catalog's
+        g["product"] = g["product"].cat.remove_unused_categories()
+    return {cat: groups.get(cat, pd.DataFrame(columns=_COLUMNS)) for cat in PRODUCTS}
+
+
+# ── Snapshot on disk ──────────────────────────────────────────────────────────
+
+class _Saved(NamedTuple):
+    state:      pd.DataFrame    # per-PID state, indexed by pid
+    marks:      dict            # watermarks the state covers
+    fetched_at: float
+    full_at:    float
+
+
+def _save_snapshot(saved: _Saved) -> None:
+    """Write *saved* to _SNAPSHOT_PATH atomically (temp file + rename)."""
+    path = _SNAPSHOT_PATH
+    table = pa.Table.from_pandas(saved.state.reset_index()[_STATE_COLUMNS], preserve_index=False)
+    meta = {
+        "version":    _SNAPSHOT_VERSION,
+        "columns":    _STATE_COLUMNS,
+        "marks":      saved.marks,
+        "fetched_at": saved.fetched_at,
+        "full_at":    saved.full_at,
+    }
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}), _SNAPSHOT_KEY: json.dumps(meta).encode(),
+    })
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+def _read_snapshot() -> Optional[_Saved]:
+    """The snapshot at _SNAPSHOT_PATH, or None if missing, unreadable or from another version."""
+    path = _SNAPSHOT_PATH
+    if not os.path.exists(path):
+        return None
     try:
-        df = _load_from_snowflake(category)
-        if not df.empty:
-            log.info("'%s' loaded from Snowflake (%d products)", category, len(df))
-            return df
-        log.warning("'%s' returned 0 rows from Snowflake — showing mock data.", category)
+        table = pq.read_table(path)
+        meta = json.loads((table.schema.metadata or {})[_SNAPSHOT_KEY])
+        if meta["version"] != _SNAPSHOT_VERSION or table.column_names != _STATE_COLUMNS:
+            log.warning("Ignoring snapshot %s: version %s, columns %s.",
+                        path, meta["version"], table.column_names)
+            return None
+        return _Saved(_frame(table).set_index("pid"), meta["marks"],
+                      meta["fetched_at"], meta["full_at"])
     except Exception as exc:
-        tb = traceback.format_exc()
-        log.error(
-            "Snowflake query FAILED for '%s': %s\n%s",
-            category, exc, tb,
-        )
-        st.warning(
-            f"⚠️ Could not load live data for **{category}** from Snowflake — "
-            "showing demo data.  Check the **🪲 Debug Logs** panel in the sidebar.",
-            icon="🔌",
-        )
+        log.warning("Ignoring unreadable snapshot %s: %s: %s", path, type(exc).__name__, exc)
+        return None
+
+
+# ── Stale-while-revalidate cache ──────────────────────────────────────────────
+
+
+class Snapshot(NamedTuple):
+    """One refresh's data; see current_snapshot()."""
+    frames:     dict            # category → DataFrame
+    combined:   pd.DataFrame    # every category's rows (sidebar quick stats)
+    fetched_at: float           # time.time() of the refresh that produced it
+    live:       bool            # False → mock data (Snowflake unreachable)
+
+
+def _nbytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _snapshot(frames: dict[str, pd.DataFrame], fetched_at: float, live: bool) -> Snapshot:
+    non_empty = [f for f in frames.values() if not f.empty]
+    combined = pd.concat(non_empty, ignore_index=True) if non_empty else pd.DataFrame(columns=_COLUMNS)
+    return Snapshot(frames, combined, fetched_at, live)
+
+
+class InventoryStatus(NamedTuple):
+    fetched_at: datetime
+    age_s:      float
+    stale:      bool            # older than the TTL; a refresh is under way
+    live:       bool            # False → mock data
+    offline:    bool            # last refresh failed → last-known-good data
+
+
+class _InventoryCache:
+    """Process-wide inventory cache shared by all sessions (see module docs)."""
+
+    def __init__(self):
+        self.snapshot: Optional[Snapshot] = None
+        self.offline     = False                # last refresh failed
+        self._lock       = threading.Lock()     # guards _refreshing
+        self._load_lock  = threading.Lock()     # one refresh at a time
+        self._refreshing = False
+        self._next_try   = 0.0
+        # Incremental state: per-PID totals and the watermarks they cover.
+        self._state: Optional[pd.DataFrame] = None
+        self._marks: Optional[dict[str, int]] = None
+        self._full_at    = 0.0
+        self._state_on_disk = False             # state evicted; read back on refresh
+
+    def get(self) -> Snapshot:
+        snap = self.snapshot
+        if snap is None:
+            with self._load_lock:               # cold start: disk snapshot, else block once
+                if self.snapshot is None and not self._restore():
+                    self._refresh()
+                    return self.snapshot
+            snap = self.snapshot                # restored: refreshed below if stale
+        now = time.time()
+        if now - snap.fetched_at >= _TTL_S and now >= self._next_try:
+            self._start_refresh()
+        return snap
+
+    def _start_refresh(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background, name="inventory-refresh", daemon=True).start()
+
+    def _background(self) -> None:
+        try:
+            with self._load_lock:
+                self._refresh()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _restore(self) -> bool:
+        saved = _read_snapshot()
+        if saved is None:
+            return False
+        log.info("Serving the inventory snapshot from %s (%.0fs old) until the first refresh.",
+                 _SNAPSHOT_PATH, time.time() - saved.fetched_at)
+        self._state, self._marks, self._full_at = saved.state, saved.marks, saved.full_at
+        self.snapshot = _snapshot(self._frames(_aggregate(saved.state)), saved.fetched_at, live=True)
+        self._enforce_budget()
+        return True
+
+    def _enforce_budget(self) -> None:
+        """Drop the per-PID state from memory if the cache is over _MAX_BYTES.
+
+        Only called once the state is in the snapshot file, which the next
+        refresh reads it back from. The snapshot being served is never dropped.
+        """
+        snap = self.snapshot
+        served = sum(_nbytes(f) for f in snap.frames.values()) + _nbytes(snap.combined)
+        if self._state is None or served + _nbytes(self._state) <= _MAX_BYTES:
+            return
+        log.info("Inventory cache over %.0f MB — keeping the per-PID state on disk only.", CACHE_MAX_MB)
+        self._state, self._state_on_disk = None, True
+        if served > _MAX_BYTES:
+            log.warning("The inventory snapshot alone (%.0f MB) exceeds CACHE_MAX_MB.", served / 2 ** 20)
+
+    def _reload_state(self) -> None:
+        """Read an evicted per-PID state back; without it the refresh is a full load."""
+        self._state_on_disk = False
+        saved = _read_snapshot()
+        if saved is not None and saved.marks == self._marks:
+            self._state = saved.state
+        else:
+            log.warning("Evicted inventory state is gone from %s — reloading in full.", _SNAPSHOT_PATH)
+
+    def _refresh(self) -> None:
+        started = time.time()
+        try:
+            if self._state is None and self._state_on_disk:
+                self._reload_state()
+            conn  = _get_conn()
+            marks = _watermarks(conn)
+            if (
+                self._state is None
+                or started - self._full_at >= _RECONCILE_S
+                or marks["defined_products"] != self._marks["defined_products"]
+            ):
+                state = _load_state(conn)
+                self._full_at = started
+            elif marks == self._marks:
+                log.info("No changes since the last refresh — skipping the inventory query.")
+                state = self._state
+            else:
+                state = _fold(self._state, _load_delta(conn, self._marks, marks))
+            self._state, self._marks = state, marks
+            # Rebuilt every refresh: days_to_expiry is relative to today.
+            self.snapshot = _snapshot(self._frames(_aggregate(state)), started, live=True)
+            self.offline = False
+        except Exception as exc:
+            tb = traceback.format_exc()
+            log.error("Snowflake query FAILED: %s\n%s", exc, tb)
+            self._next_try = time.time() + _TTL_S
+            self.offline = True
+            if self.snapshot is None:
+                frames = {category: _mock_data(category) for category in PRODUCTS}
+                self.snapshot = _snapshot(frames, started, live=False)
+            # otherwise keep serving the last good snapshot; its age keeps growing
+            return
+        try:
+            _save_snapshot(_Saved(state, marks, started, self._full_at))
+        except Exception as exc:
+            log.warning("Could not write the inventory snapshot: %s: %s", type(exc).__name__, exc)
+            return                              # the state is not on disk; keep it
+        self._enforce_budget()
+
+    @staticmethod
+    def _frames(state: pd.DataFrame) -> dict[str, pd.DataFrame]:
+        frames = _partition(state)
+        for category, df in frames.items():
+            if df.empty:
+                log.warning("'%s' returned 0 rows from Snowflake — showing mock data.", category)
+                frames[category] = _mock_data(category)
+            else:
+                log.info("'%s' loaded from Snowflake (%d products)", category, len(df))
+        return frames
+
+
+_CACHE = _InventoryCache()
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+# Each function reads *snap* when given one, else the cache's current snapshot.
+
+def current_snapshot() -> Snapshot:
+    """The snapshot the cache is serving now. Take it once per rerun and pass it
+    to the functions below, so the whole page renders from one refresh."""
+    return _CACHE.get()
+
+
+def load_inventory(snap: Optional[Snapshot] = None) -> dict[str, pd.DataFrame]:
+    """Return aggregated inventory for every category, keyed by category.
+
+    Served from the shared stale-while-revalidate cache: never blocks on
+    Snowflake except for a first load with no snapshot on disk. When
+    Snowflake is unreachable it keeps serving the last good data (see
+    inventory_status().offline), or reproducible mock data if there has
+    never been any (inventory_status().live is False).
+    Frames are shallow views of the shared snapshot; writes copy on write.
+    """
+    snap = snap or _CACHE.get()
+    return {category: df.copy(deep=False) for category, df in snap.frames.items()}
+
+
+def inventory_status(snap: Optional[Snapshot] = None) -> InventoryStatus:
+    """Age and origin of the data load_inventory() is serving."""
+    snap = snap or _CACHE.get()
+    age  = time.time() - snap.fetched_at
+    return InventoryStatus(
+        fetched_at=datetime.fromtimestamp(snap.fetched_at),
+        age_s=age,
+        stale=age >= _TTL_S,
+        live=snap.live,
+        offline=_CACHE.offline and snap.live,
+    )
+
 
-    return _mock_data(category)
+def load_category_data(category: str, snap: Optional[Snapshot] = None) -> pd.DataFrame:
+    """Return aggregated inventory DataFrame for *category* (from load_inventory)."""
+    return (snap or _CACHE.get()).frames[category].copy(deep=False)
 
 
-@st.cache_data(ttl=60)
-def load_all_data() -> pd.DataFrame:
+def load_all_data(snap: Optional[Snapshot] = None) -> pd.DataFrame:
     """Return combined inventory for all categories (used by sidebar quick stats)."""
-    frames    = [load_category_data(cat) for cat in PRODUCTS]
-    non_empty = [f for f in frames if not f.empty]
-    if not non_empty:
-        return pd.DataFrame(columns=[
-            "product", "cooler_count", "floor_count",
-            "total_count", "expiry_date", "days_to_expiry",
-        ])
-    return pd.concat(non_empty, ignore_index=True)
+    return (snap or _CACHE.get()).combined.copy(deep=False)
@@ -0,0 +1,87 @@
+"""
+utils/transforms.py
+───────────────────
+Vectorized column transforms shared by the loader and the components.
+
+Everything here takes and returns whole columns (pandas Series / NumPy
+arrays) — no per-row Python — so rendering cost stays linear in the number
+of products with a small constant. Behaviour matches the per-row helpers
+these replace:
+
+  to_day / days_until   ← loader._ms_to_date + (date - today).days
+  expiry_bucket         ← charts._expiry_bucket
+  status_text           ← inventory_table._fmt_status
+  row_styles            ← inventory_table._row_color / _row_color_renamed
+"""
+
+from datetime import date
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config.settings import BUCKET_ORDER
+
+
+# ── Dates ─────────────────────────────────────────────────────────────────────
+
+def to_day(ts: pd.Series) -> pd.Series:
+    """UTC calendar day (midnight, datetime64[ms]) of *ts*.
+
+    *ts* may be datetime64 or Unix-ms integers/floats; missing values → NaT.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(ts):
+        ts = pd.to_datetime(ts, unit="ms")
+    return ts.dt.floor("D").astype("datetime64[ms]")
+
+
+def days_until(day: pd.Series, today: Optional[date] = None) -> pd.Series:
+    """Whole days from *today* (default: date.today()) to *day*; NaT → NaN."""
+    return (day - pd.Timestamp(today or date.today())).dt.days
+
+
+# ── Expiry status ─────────────────────────────────────────────────────────────
+
+# Upper bucket edges, inclusive: ≤ -1 Expired, 0 Today, 1, 2, then the rest.
+_BUCKET_BINS = [-np.inf, -1, 0, 1, 2, np.inf]
+
+
+def expiry_bucket(days: pd.Series) -> pd.Series:
+    """BUCKET_ORDER label per row, as an ordered categorical (3–4 days → "5+ Days")."""
+    return pd.cut(days, bins=_BUCKET_BINS, labels=BUCKET_ORDER, ordered=True)
+
+
+def _levels(days) -> np.ndarray:
+    """0 expired · 1 today · 2 within 2 days · 3 later."""
+    d = np.asarray(days)
+    return np.select([d < 0, d == 0, d <= 2], [0, 1, 2], default=3)
+
+
+def status_text(days: pd.Series) -> pd.Series:
+    """"Expired Nd ago" / "Expires Today" / "Tomorrow" / "In N days" per row."""
+    d = days.to_numpy()
+    n = np.abs(d).astype(str)                       # fixed-width unicode, C loops below
+    text = np.select(
+        [d < 0, d == 0, d == 1],
+        [np.char.add(np.char.add("Expired ", n), "d ago"), "Expires Today", "Tomorrow"],
+        default=np.char.add(np.char.add("In ", n), " days"),
+    )
+    return pd.Series(text, index=days.index, dtype=object)
+
+
+# Row CSS per _levels() code, precomputed once.
+_ROW_CSS = np.array([
+    "background-color: #fee2e2; color: #991b1b",    # expired
+    "background-color: #fef9c3; color: #854d0e",    # today
+    "background-color: #dbeafe; color: #1e40af",    # 1–2 days
+    "",                                             # 3+ days
+], dtype=object)
+
+
+def row_styles(df: pd.DataFrame, days_col: str) -> pd.DataFrame:
+    """Per-cell CSS for Styler.apply(..., axis=None): each row coloured by *days_col*."""
+    css = _ROW_CSS[_levels(df[days_col])]
+    return pd.DataFrame(
+        np.repeat(css[:, None], df.shape[1], axis=1),
+        index=df.index, columns=df.columns,
+    )